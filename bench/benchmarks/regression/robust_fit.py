@@ -1,6 +1,8 @@
 """ Benchmark for ``yatsm.regresion.robust_fit``
 """
-from yatsm.regression.robust_fit import RLM
+import numpy as np
+
+from yatsm.regression.robust_fit import RLM, _mad_rows, mad, rlm_batch
 
 from ..bench_utils.example_timeseries import PixelTimeseries
 
@@ -14,3 +16,44 @@ class BenchRLM(PixelTimeseries):
         for y in setup['Y'][:-1, :]:
             for i in range(500):
                 RLM().fit(setup['X'], y)
+
+    def time_rlm_batch(self, setup):
+        """ Time robust linear model for all 7 series at once 500 times
+        """
+        for i in range(500):
+            rlm_batch(setup['X'], setup['Y'][:-1, :])
+
+
+class BenchMAD(object):
+    """ Benchmark median absolute deviation by selection against sorting
+    """
+    params = [50, 500, 5000]
+    param_names = ['n_obs']
+
+    def setup(self, n_obs):
+        self.x = np.random.RandomState(0).standard_normal(n_obs)
+        self.X = np.random.RandomState(0).standard_normal((100, n_obs))
+        mad(self.x)  # compile
+        _mad_rows(self.X)
+
+    def time_mad(self, n_obs):
+        """ Time MAD using quickselect 500 times
+        """
+        for i in range(500):
+            mad(self.x)
+
+    def time_mad_numpy(self, n_obs):
+        """ Time MAD using ``numpy.median`` 500 times
+        """
+        for i in range(500):
+            np.median(np.fabs(self.x)) / 0.6745
+
+    def time_mad_rows(self, n_obs):
+        """ Time MAD of 100 rows using quickselect
+        """
+        _mad_rows(self.X)
+
+    def time_mad_rows_numpy(self, n_obs):
+        """ Time MAD of 100 rows using ``numpy.median``
+        """
+        np.median(np.fabs(self.X), axis=1) / 0.6745
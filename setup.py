@@ -77,15 +77,18 @@ entry_points = '''
     batch=yatsm.cli.batch:batch
     changemap=yatsm.cli.changemap:changemap
     map=yatsm.cli.map:map
+    refit=yatsm.cli.refit:refit
 
     [yatsm.algorithms.change]
     CCDCesque=yatsm.algorithms.ccdc:CCDCesque
+    CCDCesqueBlock=yatsm.algorithms.ccdc_block:CCDCesqueBlock
 
     [yatsm.pipeline.tasks.tasks]
     norm_diff = yatsm.pipeline.tasks.preprocess:norm_diff
 
     [yatsm.pipeline.tasks.segment]
     pixel_CCDCesque = yatsm.pipeline.tasks.change:pixel_CCDCesque
+    block_CCDCesque = yatsm.pipeline.tasks.change:block_CCDCesque
 '''
 
 desc = ('Algorithms for remote sensing land cover and condition monitoring '
@@ -0,0 +1,97 @@
+""" Tests for yatsm.algorithms.ccdc_block
+
+Records from the batched engine should match those from running
+:class:`CCDCesque` with an OLS estimator on each pixel separately.
+"""
+import numpy as np
+import pytest
+import sklearn.linear_model
+
+from yatsm.algorithms.ccdc import CCDCesque
+from yatsm.algorithms.ccdc_block import CCDCesqueBlock
+
+
+@pytest.fixture(scope='function',
+                params=[{},
+                        {'dynamic_rmse': False, 'slope_test': False},
+                        {'remove_noise': False,
+                         'min_rmse': np.array([100] * 7)}])
+def init(request):
+    init = dict(
+        test_indices=np.array([2, 3, 4, 5]),
+        consecutive=6,
+        threshold=3.5,
+        min_obs=24,
+        min_rmse=100,
+        retrain_time=365.25,
+        screening='RLM',
+        screening_crit=400.0,
+        green_band=1,
+        swir1_band=4,
+        remove_noise=True,
+        dynamic_rmse=True,
+        slope_test=True,
+        idx_slope=1,
+    )
+    init.update(request.param)
+    return init
+
+
+@pytest.fixture(scope='module')
+def block(masked_ts):
+    """ Six pixels made from the masked example time series, some with
+    additional missing observations and one with an extra change
+    """
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    prng = np.random.RandomState(123456789)
+    Ys = []
+    for i in range(6):
+        _Y = Y * (1 + 0.05 * i) + prng.normal(0, 20 * (i % 3), Y.shape)
+        if i % 2:
+            _Y[:, prng.rand(Y.shape[1]) < 0.1] = np.nan
+        if i == 4:
+            _Y[:, 200:] += 800
+        Ys.append(_Y)
+    return X, np.array(Ys), dates
+
+
+def test_CCDCesqueBlock_vs_CCDCesque(block, init):
+    X, Y, dates = block
+    model = CCDCesqueBlock(**init).fit(X, Y, dates)
+
+    ols = sklearn.linear_model.LinearRegression(fit_intercept=False)
+    for _Y, record in zip(Y, model.records):
+        valid = np.all(np.isfinite(_Y), axis=0)
+        truth = CCDCesque(estimator={'object': ols, 'fit': {}}, **init)
+        truth = truth.fit(X[valid, :], _Y[:, valid], dates[valid]).record
+
+        assert len(truth) == len(record)
+        for name in ('start', 'end', 'break'):
+            np.testing.assert_equal(truth[name], record[name])
+        for name in ('coef', 'rmse', 'magnitude'):
+            np.testing.assert_allclose(truth[name], record[name],
+                                       rtol=1e-4, atol=1e-2)
+
+
+def test_CCDCesqueBlock_too_short(block, init):
+    X, Y, dates = block
+    Y = Y[:2].copy()
+    Y[1, :, 20:] = np.nan
+    model = CCDCesqueBlock(**init).fit(X, Y, dates)
+
+    np.testing.assert_equal(model.failed, [False, True])
+    assert np.all(model.record_pixel == 0)
+    assert len(model.records[1]) == 0
+
+
+def test_CCDCesqueBlock_float32(block, init):
+    X, Y, dates = block
+    records = [CCDCesqueBlock(dtype=dtype, **init).fit(X, Y, dates).record
+               for dtype in (np.float64, np.float32)]
+
+    assert len(records[0]) == len(records[1])
+    for name in ('start', 'end', 'break', 'px', 'py'):
+        np.testing.assert_equal(records[0][name], records[1][name])
+    for name in ('coef', 'rmse'):
+        np.testing.assert_allclose(records[0][name], records[1][name],
+                                   rtol=1e-3, atol=1e-3)
@@ -11,6 +11,7 @@ import pytest
 import sklearn.linear_model
 
 from yatsm.algorithms.ccdc import CCDCesque
+from yatsm.masking import smooth_mask
 
 
 @pytest.fixture(scope='function',
@@ -69,3 +70,216 @@ def test_CCDCesque_coef(record):
 def test_CCDCesque_rmse(record):
     swir1_rmse = 77.21417999
     np.testing.assert_allclose(record[0]['rmse'][4], swir1_rmse)
+
+
+@pytest.mark.parametrize('estimator', [
+    sklearn.linear_model.Lasso(alpha=20),
+    sklearn.linear_model.LinearRegression()
+])
+def test_CCDCesque_fit_models_multioutput(masked_ts, estimator):
+    X, Y = masked_ts['X'][:100, :], masked_ts['Y'][:-1, :100]
+    model = CCDCesque(estimator={'object': estimator, 'fit': {}})
+    assert model.multioutput
+    model.fit(masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates'])
+
+    bands = np.array([1, 4])
+    model.fit_models(X, Y, bands=bands)
+    for b in bands:
+        m = sklearn.clone(estimator).fit(X, Y[b, :])
+        coef = m.coef_.copy()
+        coef[0] += m.intercept_
+        np.testing.assert_allclose(model.models[b].coef, coef)
+        np.testing.assert_allclose(model.models[b].predict(X), m.predict(X))
+        np.testing.assert_allclose(
+            model.models[b].rmse,
+            np.mean((Y[b, :] - m.predict(X)) ** 2) ** 0.5)
+
+
+@pytest.mark.parametrize('fit_intercept', [True, False])
+def test_CCDCesque_incremental(masked_ts, fit_intercept):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    estimator = sklearn.linear_model.LinearRegression(
+        fit_intercept=fit_intercept)
+    records = []
+    for incremental in (True, False):
+        model = CCDCesque(estimator={'object': estimator, 'fit': {}},
+                          test_indices=np.array([2, 3, 4, 5]),
+                          consecutive=6, threshold=3.0, min_obs=24,
+                          retrain_time=90, remove_noise=True)
+        assert model.incremental
+        model.incremental = incremental
+        model.nopython = False
+        records.append(model.fit(X, Y, dates).record)
+
+    assert len(records[0]) == len(records[1])
+    for name in ('start', 'end', 'break'):
+        np.testing.assert_equal(records[0][name], records[1][name])
+    for name in ('coef', 'rmse'):
+        np.testing.assert_allclose(records[0][name], records[1][name],
+                                   rtol=1e-4, atol=1e-3)
+
+
+def test_CCDCesque_record_capacity(masked_ts, model):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    record = model.fit(X, Y, dates).record
+    assert len(record) > 1
+    assert record.dtype == model.record_template.dtype
+
+    # Start without spare space to force the record to grow on every break
+    model.record_capacity = 1
+    record_grown = model.fit(X, Y, dates).record
+    assert len(record_grown) == len(record)
+    for name in record.dtype.names:
+        np.testing.assert_equal(record_grown[name], record[name])
+
+
+def test_CCDCesque_remove_noise_obs(masked_ts, model):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    X_copy, Y_copy, dates_copy = X.copy(), Y.copy(), dates.copy()
+    model.fit(X, Y, dates)
+
+    # Noise is removed from the model's data, not the input data
+    np.testing.assert_equal(X, X_copy)
+    np.testing.assert_equal(Y, Y_copy)
+    np.testing.assert_equal(dates, dates_copy)
+
+    assert model.X.shape[0] == model.Y.shape[1] == len(model.dates)
+    assert len(model.dates) < len(dates)
+    idx = np.searchsorted(dates, model.dates)
+    np.testing.assert_equal(model.dates, dates[idx])
+    np.testing.assert_equal(model.X, X[idx, :])
+    np.testing.assert_equal(model.Y, Y[:, idx])
+
+
+def test_CCDCesque_LOWESS(masked_ts):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    model = CCDCesque(test_indices=np.array([2, 3, 4, 5]), consecutive=6,
+                      threshold=3.5, min_obs=24, min_rmse=100,
+                      screening='LOWESS', screening_crit=400.0)
+    record = model.fit(X, Y, dates).record
+    assert len(record) > 1
+
+    # The entire time series is screened once, before fitting
+    mask = smooth_mask(dates, Y, 13, crit=400.0, green=1, swir1=4)
+    assert not mask.all()
+    assert not np.in1d(model.dates, dates[~mask]).any()
+
+    # ... and again for each time series fit
+    record_refit = model.fit(X, Y, dates).record
+    for name in record.dtype.names:
+        np.testing.assert_equal(record_refit[name], record[name])
+
+
+@pytest.mark.parametrize('kwargs', [
+    {},
+    {'dynamic_rmse': False, 'slope_test': False},
+    {'remove_noise': False, 'retrain_time': 90},
+    {'estimator': {'object': sklearn.linear_model.LinearRegression(
+        fit_intercept=False), 'fit': {}}}
+])
+@pytest.mark.parametrize('noise', [0, 100])
+def test_CCDCesque_nopython(masked_ts, kwargs, noise):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    Y = Y + np.random.RandomState(0).normal(0, noise, Y.shape)
+    init = dict(
+        test_indices=np.array([2, 3, 4, 5]),
+        estimator={'object': sklearn.linear_model.LinearRegression(),
+                   'fit': {}},
+        consecutive=6, threshold=3.0, min_obs=24, min_rmse=100,
+        remove_noise=True, dynamic_rmse=True, slope_test=True
+    )
+    init.update(kwargs)
+
+    models = []
+    for nopython in (True, False):
+        model = CCDCesque(**init)
+        model.nopython = nopython
+        models.append(model.fit(X, Y, dates))
+    jit, py = models
+
+    assert len(jit.record) == len(py.record)
+    for name in ('start', 'end', 'break'):
+        np.testing.assert_equal(jit.record[name], py.record[name])
+    for name in ('coef', 'rmse', 'magnitude'):
+        np.testing.assert_allclose(jit.record[name], py.record[name],
+                                   rtol=1e-4, atol=1e-2)
+    np.testing.assert_equal(jit.dates, py.dates)
+    np.testing.assert_equal(jit.Y, py.Y)
+    for m_jit, m_py in zip(jit.models, py.models):
+        np.testing.assert_allclose(m_jit.coef, m_py.coef, rtol=1e-4, atol=1e-2)
+
+
+def test_CCDCesque_nearest_doy(masked_ts):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    model = CCDCesque(test_indices=np.array([2, 3, 4, 5]), consecutive=6,
+                      min_obs=24)
+    model.X, model.Y, model.dates = X, Y, dates
+    model.reset()
+
+    # Move forward, with a new training period part way through
+    for start, here in ((0, 30), (0, 31), (0, 60), (40, 90), (40, 200)):
+        model.start, model.here = start, here
+        doy = np.mod(dates[start:here] - dates[here + model.consecutive],
+                     model.ndays)
+        expected = np.argsort(doy, kind='mergesort')[:model.min_obs]
+        np.testing.assert_equal(model._get_nearest_doy(), expected)
+
+
+def test_CCDCesque_stacked_models(masked_ts, model):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    model.fit(X, Y, dates)
+    for b, m in enumerate(model.models):
+        np.testing.assert_equal(model.coef_[b, :], m.coef_)
+        assert model.intercept_[b] == m.intercept_
+        assert model.rmse_[b] == m.rmse
+
+
+@pytest.mark.parametrize('estimator', [
+    sklearn.linear_model.Lasso(alpha=20),
+    sklearn.linear_model.LinearRegression()
+])
+def test_CCDCesque_float32(masked_ts, estimator):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    records = []
+    for dtype in (np.float64, np.float32):
+        model = CCDCesque(estimator={'object': estimator, 'fit': {}},
+                          test_indices=np.array([2, 3, 4, 5]),
+                          consecutive=6, threshold=3.0, min_obs=24,
+                          dynamic_rmse=True, dtype=dtype)
+        records.append(model.fit(X, Y, dates).record)
+        assert model.X.dtype == model.Y.dtype == dtype
+
+    assert len(records[0]) == len(records[1])
+    for name in ('start', 'end', 'break'):
+        np.testing.assert_equal(records[0][name], records[1][name])
+    for name in ('coef', 'rmse'):
+        np.testing.assert_allclose(records[0][name], records[1][name],
+                                   rtol=1e-3, atol=1e-3)
+
+
+def test_CCDCesque_stable_test(masked_ts, model):
+    X, Y, dates = masked_ts['X'], masked_ts['Y'][:-1, :], masked_ts['dates']
+    record = model.fit(X, Y, dates).record
+
+    # Time series with changes take the full path with the same results
+    model.stable_test = 0.05
+    stable_record = model.fit(X, Y, dates).record
+    assert model.fit_path == 'full'
+    np.testing.assert_equal(record, stable_record)
+
+    # Simulate a stable time series from the first segment
+    np.random.seed(123456789)
+    Y_stable = (np.dot(X, record[0]['coef']).T +
+                np.random.normal(0, 25, Y.shape))
+    model.stable_test = 0.01
+    stable_record = model.fit(X, Y_stable, dates).record
+    assert model.fit_path == 'stable'
+    assert len(stable_record) == 1
+    assert stable_record[0]['start'] == dates[0]
+    assert stable_record[0]['end'] == dates[-1]
+    assert stable_record[0]['break'] == 0
+
+
+def test_CCDCesque_stable_test_alpha():
+    with pytest.raises(ValueError):
+        CCDCesque(stable_test=0.2)
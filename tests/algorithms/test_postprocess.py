@@ -2,7 +2,9 @@
 """
 import numpy as np
 
-from yatsm.algorithms.postprocess import commission_test, refit_record
+from yatsm.algorithms.postprocess import (commission_test, omission_test,
+                                          omission_test_block, refit_block,
+                                          refit_record, refit_segments)
 
 
 # COMMISSION TEST
@@ -21,6 +23,17 @@ def test_commission_no_real_change_1(sim_no_real_change_1):
     assert len(record) == 1
     assert record[0]['break'] == 0
 
+    # Merged model is estimated over both segments, including the first
+    # observation of the first segment
+    model = sim_no_real_change_1
+    start = np.searchsorted(model.dates, record[0]['start'], side='left')
+    end = np.searchsorted(model.dates, record[0]['end'], side='right')
+    assert start == 0
+    model.fit_models(model.X[start:end, :], model.Y[:, start:end])
+    for i, m in enumerate(model.models):
+        np.testing.assert_allclose(record[0]['coef'][:, i], m.coef,
+                                   rtol=1e-6)
+
 
 def test_commission_no_real_change_2(sim_no_real_change_2):
     """ Test commission test's ability to resolve two spurious changes
@@ -40,6 +53,28 @@ def test_commission_real_change(sim_real_change):
     assert len(record) == len(sim_real_change.record)
 
 
+# OMISSION TEST
+def test_omission_nochange(sim_nochange):
+    omission = omission_test(sim_nochange, crit=0.01)
+    assert omission.shape == (1, )
+    assert not omission.any()
+
+
+def test_omission_test_block(sim_nochange, sim_real_change):
+    """ Test records spanning no change and a real change in a block
+    """
+    dates = sim_real_change.dates
+    record = np.repeat(sim_real_change.record[:1], 2)
+    record['start'], record['end'] = dates[0], dates[-1]
+    record['py'], record['px'] = 0, [3, 2]
+
+    Y = np.stack((sim_real_change.Y, sim_nochange.Y))
+    Y[0, :, 5] = np.nan
+    omission = omission_test_block(record, sim_real_change.X, Y, dates,
+                                   [0, 0], [3, 2], [0, 1], crit=0.01)
+    np.testing.assert_equal(omission, [True, False])
+
+
 # REFIT
 def test_refit_nochange_rlm(sim_nochange):
     """ Test record refitting of one record using robust linear models
@@ -59,6 +94,28 @@ def test_refit_nochange_rlm(sim_nochange):
     np.testing.assert_allclose(refit[0]['rlm_rmse'], rmse)
 
 
+def test_refit_segments_rlm(sim_nochange):
+    """ Test RLM refits of bands fit together match fitting each band
+    """
+    from yatsm.regression import RLM
+    estimator = RLM(maxiter=10)
+
+    prng = np.random.RandomState(0)
+    X, dates, record = sim_nochange.X, sim_nochange.dates, sim_nochange.record
+    Y = sim_nochange.Y + prng.normal(0, 5, sim_nochange.Y.shape)
+    Y[:, ::10] += 100  # outliers
+
+    coef, rmse = refit_segments(record, X, Y, dates, estimator)
+    index = (dates >= record[0]['start']) & (dates <= record[0]['end'])
+    for b, y in enumerate(Y[:, index]):
+        rlm = RLM(maxiter=10).fit(X[index], y)
+        yhat = rlm.predict(X[index])
+        np.testing.assert_allclose(coef[0, :, b], rlm.coef_, rtol=1e-5)
+        np.testing.assert_allclose(rmse[0, b],
+                                   np.sqrt(((y - yhat) ** 2).mean()),
+                                   rtol=1e-5)
+
+
 def test_refit_nochange_reg(sim_nochange):
     """ Test refit ``keep_regularized=False`` (i.e., not ignoring coef == 0)
     """
@@ -77,6 +134,26 @@ def test_refit_nochange_reg(sim_nochange):
     np.testing.assert_allclose(refit[0]['ols_rmse'], rmse)
 
 
+def test_refit_block(sim_nochange):
+    """ Test block refit matches refitting each pixel's record
+    """
+    from sklearn.linear_model import LinearRegression as OLS
+    estimator = OLS()
+
+    truth = refit_record(sim_nochange, 'ols', estimator)
+    record = np.repeat(sim_nochange.record[:1], 2)
+    record['py'], record['px'] = 0, [1, 0]
+
+    Y = np.stack((sim_nochange.Y, sim_nochange.Y))
+    Y[1, :, 5] = np.nan
+    coef, rmse = refit_block(record, sim_nochange.X, Y, sim_nochange.dates,
+                             [0, 0], [0, 1], estimator)
+    assert coef.shape == (2, ) + truth[0]['ols_coef'].shape
+    np.testing.assert_allclose(coef[1], truth[0]['ols_coef'], rtol=1e-5)
+    np.testing.assert_allclose(rmse[1], truth[0]['ols_rmse'], rtol=1e-5)
+    assert np.isfinite(coef[0]).all()
+
+
 def test_refit_none():
     """ Test refit if model is None/[]
     """
@@ -1,6 +1,7 @@
 """ Tests for yatsm.phenology.longtermmean
 """
 import numpy as np
+import pandas as pd
 import pytest
 
 import yatsm.phenology.longtermmean as ltm
@@ -36,3 +37,62 @@ def test_pheno_fit(data):
                             err_msg='Spring LTM is not correct')
     np.testing.assert_equal(result.autumnDOY, 283,
                             err_msg='Autumn LTM is not correct')
+
+
+def test__group_years_rows():
+    years = np.repeat(np.arange(2000, 2011), 3)
+    mask = np.ones((3, years.size), dtype=bool)
+    mask[1, years < 2004] = False
+    mask[2, years > 2001] = False
+    periods = ltm._group_years_rows(years, mask, interval=3)
+    for _mask, _periods in zip(mask, periods):
+        np.testing.assert_equal(_periods[_mask],
+                                ltm.group_years(years[_mask], 3))
+
+
+def test__scale_EVI_rows(data):
+    evi, periods = data['evi'].values, data['period'].values
+    mask = np.ones((2, evi.size), dtype=bool)
+    mask[1, ::2] = False
+    evi_norm = ltm._scale_EVI_rows(evi, mask, np.tile(periods, (2, 1)))
+    for _mask, _evi_norm in zip(mask, evi_norm):
+        np.testing.assert_allclose(
+            _evi_norm[_mask], ltm.scale_EVI(evi[_mask], periods[_mask]))
+        assert np.isnan(_evi_norm[~_mask]).all()
+
+
+def test_longtermmeanphenology_block():
+    # Observed every day of year, so splines share the same knots
+    dates = pd.date_range('2001-01-01', '2003-12-31', freq='D')
+    doy = dates.dayofyear.values
+    evi = (0.2 + 0.5 * np.exp(-((doy - 200) / 50.) ** 2) +
+           np.random.RandomState(0).normal(0, 0.03, (2, dates.size)))
+    evi[0, ::7] = np.nan
+    ordinal = np.array([d.toordinal() for d in dates])
+    pixel = np.array([0, 1, 1])
+    start = ordinal[[0, 0, 546]]
+    end = ordinal[[-1, 545, -1]]
+
+    pheno = ltm.longtermmeanphenology_block(evi, ordinal, pixel, start, end)
+    for i, p in enumerate(pheno):
+        index = (ordinal >= start[i]) & (ordinal <= end[i])
+        truth = ltm.longtermmeanphenology(
+            pd.Series(evi[pixel[i], index], index=dates[index]))
+        assert p['spring_doy'] == truth.springDOY
+        assert p['autumn_doy'] == truth.autumnDOY
+        assert p['peak_doy'] == truth.peakEVIDOY
+        np.testing.assert_allclose(p['peak_evi'], truth.peakEVI, rtol=1e-5)
+        np.testing.assert_allclose(p['pheno_cor'], truth.corrcoef,
+                                   rtol=1e-5)
+        np.testing.assert_allclose(p['spline_evi'], truth.smoothEVI.values,
+                                   rtol=1e-6, atol=1e-8)
+
+
+def test_longtermmeanphenology_block_empty():
+    evi = np.full((1, 50), 2.)
+    ordinal = np.arange(730000, 730050)
+    pheno = ltm.longtermmeanphenology_block(evi, ordinal, [0], [730000],
+                                            [730049])
+    assert pheno['pheno_nobs'][0] == 0
+    assert pheno['spring_doy'][0] == 0
+    assert not pheno['spline_evi'].any()
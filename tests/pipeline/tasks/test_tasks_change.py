@@ -0,0 +1,44 @@
+""" Tests for yatsm.pipeline.tasks.change
+"""
+import numpy as np
+import pytest
+import xarray as xr
+
+from yatsm.pipeline import Pipe
+from yatsm.pipeline.tasks.change import pixel_CCDCesque
+
+BANDS = ('blue', 'green', 'red', 'nir', 'swir1')
+
+
+@pytest.fixture
+def pixel_data():
+    prng = np.random.RandomState(123456789)
+    n_time = 200
+    dates = np.arange(n_time) * 16 + 730000
+    w = 2 * np.pi / 365.25
+    X = np.column_stack((np.ones(n_time), np.cos(w * dates),
+                         np.sin(w * dates)))
+    Y = (np.dot(X, [1000., 200., 100.])[:, None, None] +
+         prng.normal(0, 10, (n_time, 1, 2)))
+    # Second pixel changes halfway through
+    Y[n_time // 2:, 0, 1] += 2000
+    data = xr.Dataset(
+        dict(X=(('time', 'terms'), X),
+             **dict((b, (('time', 'y', 'x'), Y)) for b in BANDS)),
+        coords={'time': dates, 'ordinal': (('time', ), dates),
+                'y': [10.], 'x': [20., 21.]}
+    )
+    return data
+
+
+@pytest.mark.parametrize(('x', 'path'), [(20., 'stable'), (21., 'full')])
+def test_pixel_CCDCesque_fit_path(pixel_data, x, path):
+    pipe = Pipe(data=pixel_data.sel(y=10., x=x))
+    config = {'init': {'consecutive': 5, 'threshold': 4, 'min_obs': 12,
+                       'stable_test': 0.05}}
+    pipe = pixel_CCDCesque(pipe,
+                           {'data': ['X'] + list(BANDS)},
+                           {'record': ['ccdc']},
+                           config=config)
+    assert dict(pipe.stash['fit_path']) == {path: 1}
+    assert len(pipe.record['ccdc']) == (1 if path == 'stable' else 2)
@@ -0,0 +1,59 @@
+""" Tests for yatsm.pipeline.tasks.postprocess
+"""
+import numpy as np
+import pytest
+import xarray as xr
+
+from yatsm.pipeline import Pipe
+from yatsm.pipeline.tasks.postprocess import block_refit
+
+
+@pytest.fixture
+def block_pipe():
+    prng = np.random.RandomState(123456789)
+    n_time, n_y, n_x = 50, 2, 3
+    dates = np.arange(n_time) * 16 + 730000
+    X = np.column_stack((np.ones(n_time), dates))
+    bands = dict(
+        (b, (('time', 'y', 'x'),
+             prng.standard_normal((n_time, n_y, n_x)) + i))
+        for i, b in enumerate(('red', 'nir'))
+    )
+    data = xr.Dataset(
+        dict(X=(('time', 'terms'), X), ordinal=(('time', ), dates), **bands),
+        coords={'time': dates, 'y': np.arange(n_y) + 10.,
+                'x': np.arange(n_x) + 20.}
+    )
+
+    # Two segments in one pixel, one in another
+    record = np.zeros(3, dtype=[('start', 'i4'), ('end', 'i4'),
+                                ('py', 'f8'), ('px', 'f8'),
+                                ('coef', 'f4', (2, 2)), ('rmse', 'f4', (2, ))])
+    record['start'] = dates[[0, 25, 0]]
+    record['end'] = dates[[24, 49, 49]]
+    record['py'] = [10., 10., 11.]
+    record['px'] = [20., 20., 22.]
+
+    return Pipe(data=data, record={'ccdc': record})
+
+
+def test_block_refit(block_pipe):
+    pipe = block_refit(block_pipe,
+                       {'data': ['X', 'red', 'nir'], 'record': ['ccdc']},
+                       {'record': ['ccdc_ols']},
+                       config={'estimator': 'OLS'})
+    refit = pipe.record['ccdc_ols']
+    record = pipe.record['ccdc']
+
+    assert refit.shape == record.shape
+    assert refit.dtype['ols_coef'].shape == (2, 2)
+    assert refit.dtype['ols_rmse'].shape == (2, )
+    for name in record.dtype.names:
+        np.testing.assert_equal(refit[name], record[name])
+
+    # First segment of the first pixel is refit with its own observations
+    X = block_pipe.data['X'].values
+    Y = block_pipe.data['nir'].values[:25, 0, 0]
+    coef = np.linalg.lstsq(X[:25], Y, rcond=-1)[0]
+    np.testing.assert_allclose(refit['ols_coef'][0, :, 1], coef,
+                               rtol=1e-4, atol=1e-6)
@@ -2,7 +2,7 @@
 """
 import pytest
 
-from yatsm.pipeline._pipeline import Pipe
+from yatsm.pipeline._pipeline import Pipe, Pipeline
 
 import logging
 logger = logging.getLogger('yatsm')
@@ -79,3 +79,12 @@ def test_Pipe_invalid(pipe):
     with pytest.raises(TypeError) as ae:
         pipe['no'] = 'no'
     assert 'does not support item assignment' in str(ae)
+
+
+@pipes
+def test_Pipeline_run_empty(pipe):
+    # Pipelines without (eager) tasks should return the pipe unchanged
+    pipeline = Pipeline({})
+    assert pipeline.run_eager(pipe) is pipe
+    assert pipeline.run(pipe) is pipe
+    assert pipeline.run(pipe, check_eager=False) is pipe
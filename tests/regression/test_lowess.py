@@ -0,0 +1,63 @@
+""" Tests for yatsm.regression.lowess
+"""
+import numpy as np
+import pytest
+from statsmodels.nonparametric.smoothers_lowess import lowess as sm_lowess
+
+from yatsm.regression.lowess import _lowess_rows, _lowess_vectorized, lowess
+
+
+@pytest.fixture
+def x_Y(prng):
+    x = np.sort(prng.randint(0, 2000, 150)).astype(float)  # with ties
+    Y = (np.cos(2 * np.pi / 365.25 * x) * [[500], [300]] +
+         prng.standard_normal((2, x.size)) * 50)
+    Y[:, ::10] += 2000  # outliers
+    return x, Y
+
+
+@pytest.mark.parametrize('frac', [0.05, 0.2, 2.0 / 3.0])
+@pytest.mark.parametrize('it', [0, 3])
+@pytest.mark.parametrize('delta', [0.0, 20.0])
+def test_lowess(x_Y, frac, it, delta):
+    x, Y = x_Y
+    fit = lowess(x, Y, frac=frac, it=it, delta=delta)
+    for y, f in zip(Y, fit):
+        sm_fit = sm_lowess(y, x, frac=frac, it=it, delta=delta,
+                           is_sorted=True, return_sorted=False)
+        np.testing.assert_allclose(f, sm_fit, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(lowess(x, Y[0], frac=frac, it=it,
+                                      delta=delta), fit[0])
+
+
+def test_lowess_unsorted(x_Y, prng):
+    # Without ties, the sorted order is unambiguous
+    x, idx = np.unique(x_Y[0], return_index=True)
+    Y = x_Y[1][:, idx]
+    order = prng.permutation(x.size)
+    fit = lowess(x[order], Y[:, order], frac=0.2)
+    np.testing.assert_allclose(fit, lowess(x, Y, frac=0.2)[:, order])
+
+
+def test_lowess_nan():
+    # Neighborhoods of a single repeated x value have no spread
+    x = np.repeat(np.arange(10.), 4)
+    fit = lowess(x, np.arange(40.), frac=0.1)
+    assert np.all(np.isnan(fit))
+
+
+@pytest.mark.parametrize('frac', [0.05, 0.2, 2.0 / 3.0])
+@pytest.mark.parametrize('it', [0, 3])
+@pytest.mark.parametrize('delta', [0.0, 20.0])
+def test_lowess_vectorized(x_Y, frac, it, delta):
+    # Without Numba, all series are fit together with array operations
+    x, Y = x_Y
+    np.testing.assert_allclose(_lowess_vectorized(x, Y, frac, it, delta),
+                               _lowess_rows(x, Y, frac, it, delta),
+                               rtol=1e-6, atol=1e-6)
+
+
+def test_lowess_vectorized_nan():
+    x = np.repeat(np.arange(10.), 4)
+    assert np.all(np.isnan(_lowess_vectorized(x, np.arange(40.)[None, :],
+                                              0.1, 3, 0.0)))
@@ -0,0 +1,46 @@
+""" Tests for yatsm.regression.ols
+"""
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from yatsm.regression.ols import OLSStatistics
+
+
+@pytest.fixture
+def X_Y(prng):
+    n = 100
+    x = np.arange(730000, 730000 + n * 16, 16)
+    w = 2 * np.pi / 365.25
+    X = np.column_stack((np.ones(n), x, np.cos(w * x), np.sin(w * x)))
+    Y = np.vstack([1000 + 0.01 * (x - x[0]) + 200 * np.cos(w * x) +
+                   prng.normal(0, 50, n) for i in range(3)])
+    return X, Y
+
+
+@pytest.mark.parametrize('fit_intercept', [True, False])
+def test_OLSStatistics(X_Y, fit_intercept):
+    X, Y = X_Y
+    stats = OLSStatistics.from_data(X[:20, :], Y[:, :20])
+    stats.update(X[20:90, :], Y[:, 20:90])
+    stats.downdate(X[85:90, :], Y[:, 85:90])
+    coef, intercept, rmse = stats.solve(fit_intercept=fit_intercept)
+
+    lm = LinearRegression(fit_intercept=fit_intercept).fit(X[:85, :],
+                                                           Y[:, :85].T)
+    yhat = lm.predict(X[:85, :])
+    np.testing.assert_allclose(np.dot(X[:85, :], coef.T) + intercept, yhat,
+                               rtol=1e-8)
+    np.testing.assert_allclose(
+        rmse, np.sqrt(((Y[:, :85].T - yhat) ** 2).mean(axis=0)), rtol=1e-8)
+    assert stats.n == 85
+
+
+def test_OLSStatistics_add(X_Y):
+    X, Y = X_Y
+    stats = (OLSStatistics.from_data(X[:30, :], Y[:, :30]) +
+             OLSStatistics.from_data(X[30:, :], Y[:, 30:]))
+    truth = OLSStatistics.from_data(X, Y)
+    for attr in ('XTX', 'XTY', 'YTY', 'sum_X', 'sum_Y'):
+        np.testing.assert_allclose(getattr(stats, attr), getattr(truth, attr))
+    assert stats.n == truth.n
@@ -4,7 +4,7 @@ import numpy as np
 import xarray as xr
 import patsy
 
-from yatsm.regression import recresid
+from yatsm.regression import recresid, recresid_batch
 
 
 def test_regression_recresid_recresid(airquality):
@@ -91,3 +91,14 @@ def test_regression_recresid_recresid(airquality):
     y = xr.DataArray(y.squeeze(), coords={'time': y.index}, dims=['time'])
     rr = recresid(X, y)
     np.testing.assert_allclose(rr, strucchange_rr)
+
+
+def test_regression_recresid_batch(airquality, prng):
+    X = patsy.dmatrix('1 + SolarR + Wind + Temp', data=airquality)
+    y = airquality['Ozone'].values
+    Y = np.vstack((y, y * 2 + 1, prng.standard_normal(y.size)))
+
+    for span in (None, 10):
+        rr = recresid_batch(X, Y, span=span)
+        for _rr, _y in zip(rr, Y):
+            np.testing.assert_allclose(_rr, recresid(X, _y, span=span))
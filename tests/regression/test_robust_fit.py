@@ -46,3 +46,103 @@ def test_RLM_issue88(X, y):
     m.fit(X, y)
     print(m)
     m.predict(X)
+
+
+@pytest.mark.parametrize('update_scale', [True, False])
+def test_rlm_batch(prng, update_scale):
+    X = np.c_[np.ones(50), np.arange(50), np.cos(np.arange(50) / 8.)]
+    Y = (np.dot(prng.rand(6, 3), X.T) + prng.standard_normal((6, 50)))
+    Y[:, ::7] += 50  # outliers
+
+    coef, weights, scale = rf.rlm_batch(X, Y, update_scale=update_scale)
+    for i, y in enumerate(Y):
+        m = rf.RLM(update_scale=update_scale).fit(X, y)
+        np.testing.assert_allclose(coef[i], m.coef_, rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(scale[i], m.scale, rtol=1e-6, atol=1e-8)
+        if hasattr(m, 'weights'):
+            np.testing.assert_allclose(weights[i], m.weights,
+                                       rtol=1e-6, atol=1e-6)
+
+
+def test_rlm_batch_vectorized(prng):
+    # Weight functions other than ``bisquare`` reweight all series together
+    X = np.c_[np.ones(50), np.arange(50), np.cos(np.arange(50) / 8.)]
+    Y = (np.dot(prng.rand(6, 3), X.T) + prng.standard_normal((6, 50)))
+    Y[:, ::7] += 50  # outliers
+
+    def M(resid, c=4.685):
+        return rf.bisquare(resid, c=c)
+
+    for truth, test in zip(rf.rlm_batch(X, Y), rf.rlm_batch(X, Y, M=M)):
+        np.testing.assert_allclose(test, truth, rtol=1e-6, atol=1e-6)
+
+
+@pytest.mark.parametrize('M', [rf.bisquare,
+                               lambda resid, c: rf.bisquare(resid, c=c)])
+def test_rlm_stack(prng, M):
+    # Sets of different lengths, padded with NaN
+    X = np.stack([np.c_[np.ones(60), np.arange(60) + i * 10,
+                        np.cos((np.arange(60) + i * 10) / 8.)]
+                  for i in range(4)])
+    Y = (np.einsum('ksf,knf->ksn', prng.rand(4, 2, 3), X) +
+         prng.standard_normal((4, 2, 60)))
+    Y[:, :, ::7] += 50  # outliers
+    n = np.array([60, 41, 30, 55])
+    for i, _n in enumerate(n):
+        X[i, _n:], Y[i, :, _n:] = np.nan, np.nan
+
+    coef, weights, scale = rf.rlm_stack(X, Y, n, M=M, maxiter=10)
+    for i, _n in enumerate(n):
+        truth = rf.rlm_batch(X[i, :_n], Y[i, :, :_n], maxiter=10)
+        np.testing.assert_allclose(coef[i], truth[0], rtol=1e-6, atol=1e-6)
+        np.testing.assert_allclose(weights[i, :, :_n], truth[1],
+                                   rtol=1e-6, atol=1e-6)
+        np.testing.assert_equal(weights[i, :, _n:], 0)
+        np.testing.assert_allclose(scale[i], truth[2], rtol=1e-6)
+
+
+@pytest.mark.parametrize(('X', 'Y'), [
+    (np.random.rand(n, n), np.random.rand(2, n))
+    for n in range(1, 10)
+])
+def test_rlm_batch_issue88(X, Y):
+    rf.rlm_batch(X, Y)
+
+
+@pytest.mark.parametrize('n', [1, 2, 3, 10, 11, 100, 101])
+def test_mad(prng, n):
+    x = prng.standard_normal(n)
+    x[::3] = 0.5  # ties
+    np.testing.assert_allclose(rf.mad(x),
+                               np.median(np.fabs(x)) / 0.6745)
+    np.testing.assert_allclose(rf._mad_rows(np.vstack((x, x * 2))),
+                               np.median(np.fabs([x, x * 2]), axis=1) /
+                               0.6745)
+
+
+@pytest.mark.parametrize('collinear', [False, True])
+def test_weight_fit(prng, collinear):
+    X = np.c_[np.ones(30), prng.rand(30, 3)]
+    if collinear:  # ill-conditioned normal equations use lstsq
+        X[:, 3] = X[:, 2] * 2
+    y, w = prng.rand(30), prng.rand(30)
+
+    sw = np.sqrt(w)
+    beta = np.linalg.lstsq(X * sw[:, None], y * sw, -1.0)[0]
+
+    coef, resid = rf._weight_fit(X, y, w)
+    np.testing.assert_allclose(coef, beta, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(resid, y - np.dot(X, beta), atol=1e-8)
+
+
+@pytest.mark.parametrize('fit_inplace', [rf._cholesky_fit_inplace,
+                                         rf._lstsq_fit_inplace])
+def test_weight_fit_inplace(prng, fit_inplace):
+    X = np.c_[np.ones(30), prng.rand(30, 3)]
+    y, w = prng.rand(30), prng.rand(30)
+    XTWX, beta, resid = np.empty((4, 4)), np.empty(4), np.empty(30)
+    fit_inplace(X, y, w, XTWX, beta, resid)
+
+    coef, _resid = rf._weight_fit(X, y, w)
+    np.testing.assert_allclose(beta, coef, rtol=1e-6, atol=1e-8)
+    np.testing.assert_allclose(resid, _resid, atol=1e-8)
@@ -0,0 +1,148 @@
+""" Tests for yatsm.regression.smooth_spline
+"""
+import numpy as np
+import pytest
+
+try:
+    from yatsm.regression.cran import CRAN_spline
+except ImportError:
+    has_rpy2 = False
+else:
+    has_rpy2 = True
+
+from yatsm.regression import _smooth_spline as ss
+
+
+@pytest.fixture
+def x_y(prng):
+    x = np.sort(prng.randint(1, 366, 400)).astype(float)  # with ties
+    y = np.sin(2 * np.pi / 365 * x) + prng.standard_normal(x.size) * 0.2
+    return x, y
+
+
+@pytest.fixture
+def cars():
+    """ R's ``cars`` dataset of stopping distances by speed
+    """
+    speed = np.array([4, 4, 7, 7, 8, 9, 10, 10, 10, 11, 11, 12, 12, 12, 12,
+                      13, 13, 13, 13, 14, 14, 14, 14, 15, 15, 15, 16, 16,
+                      17, 17, 17, 18, 18, 18, 18, 19, 19, 19, 20, 20, 20,
+                      20, 20, 22, 23, 24, 24, 24, 24, 25], dtype=float)
+    dist = np.array([2, 10, 4, 22, 16, 10, 18, 26, 34, 17, 28, 14, 20, 24,
+                     28, 26, 34, 34, 46, 26, 36, 60, 80, 20, 26, 54, 32, 40,
+                     32, 40, 50, 42, 56, 76, 84, 36, 46, 68, 32, 48, 52, 56,
+                     64, 66, 54, 70, 92, 93, 120, 85], dtype=float)
+    return speed, dist
+
+
+@pytest.mark.parametrize(('n', 'ans'),
+                         [(10, 10), (49, 49), (100, 62), (365, 109)])
+def test__nknots(n, ans):
+    assert ss._nknots(n) == ans
+
+
+def test__bspline_basis():
+    t = ss._knots(np.linspace(0, 1, 100))
+    x = np.linspace(0, 1, 1000)
+    B = ss._bspline_basis(t, x)
+    assert B.shape == (1000, t.size - 4)
+    np.testing.assert_allclose(B.sum(axis=1), 1)
+    for deriv in (1, 2):
+        np.testing.assert_allclose(
+            ss._bspline_basis(t, x, deriv=deriv).sum(axis=1), 0, atol=1e-6)
+
+
+def test__penalty():
+    t = ss._knots(np.sort(np.random.RandomState(0).rand(30)))
+    omega = ss._penalty(t)
+    np.testing.assert_allclose(omega, omega.T)
+    # Linear functions, with coefficients at the Greville abscissae, have
+    # no penalty
+    greville = (t[1:-3] + t[2:-2] + t[3:-1]) / 3
+    assert (np.abs(np.dot(omega, greville)).max() <
+            1e-8 * np.abs(omega).max())
+
+
+@pytest.mark.parametrize('spar', [0.2, 0.55, 1.0])
+def test_smooth_spline_linear(spar):
+    x = np.arange(10, 60, dtype=float)
+    pred = ss.smooth_spline(x, 2 + 0.5 * x, spar=spar)
+    _x = np.arange(0, 100)
+    np.testing.assert_allclose(pred(_x), 2 + 0.5 * _x, rtol=1e-6)
+
+
+def test_smooth_spline_ties(x_y):
+    x, y = x_y
+    ux, inverse, counts = np.unique(x, return_inverse=True,
+                                    return_counts=True)
+    ybar = np.bincount(inverse, weights=y) / counts
+    _x = np.arange(0, 367)
+    np.testing.assert_allclose(ss.smooth_spline(x, y)(_x),
+                               ss.smooth_spline(ux, ybar, w=counts)(_x))
+
+
+def test_smooth_spline_2D(x_y):
+    x, y = x_y
+    Y = np.vstack((y, y[::-1] * 2))
+    pred = ss.smooth_spline(x, Y, spar=0.4)(x)
+    for _y, _pred in zip(Y, pred):
+        np.testing.assert_allclose(_pred,
+                                   ss.smooth_spline(x, _y, spar=0.4)(x))
+
+
+def test_smooth_spline_grid(prng):
+    x = np.arange(1., 367.)
+    w = prng.poisson(1, (3, x.size)).astype(float)
+    wy = w * np.sin(2 * np.pi / 365 * x) + prng.standard_normal(w.shape)
+    wy[w == 0] = 0
+    pred = ss.smooth_spline_grid(x, w, wy)(x)
+    for _w, _wy, _pred in zip(w, wy, pred):
+        y = np.where(_w > 0, _wy / np.where(_w > 0, _w, 1), 0)
+        np.testing.assert_allclose(_pred, ss.smooth_spline(x, y, w=_w)(x),
+                                   rtol=1e-6, atol=1e-8)
+
+
+def test_smooth_spline_error():
+    with pytest.raises(ValueError):
+        ss.smooth_spline([1., 2., 3., 3.], [0., 1., 0., 1.])
+    with pytest.raises(ValueError):
+        ss.smooth_spline(np.arange(10.), np.arange(10.), w=-np.ones(10))
+
+
+def test_smooth_spline_R_cars(cars):
+    # Output of ``with(cars, smooth.spline(speed, dist))`` in R:
+    #   Smoothing Parameter  spar= 0.7801305  lambda= 0.1112206
+    #   Equivalent Degrees of Freedom (Df): 2.635278
+    #   Penalized Criterion (RSS): 4187.776
+    #   GCV: 244.1044
+    speed, dist = cars
+    n = speed.size
+    ux, inverse, counts = np.unique(speed, return_inverse=True,
+                                    return_counts=True)
+    ybar = np.bincount(inverse, weights=dist) / counts
+
+    # Degrees of freedom and penalized criterion at ``lambda``
+    df = np.trace(ss.smooth_spline(speed, np.eye(n),
+                                   lambda_=0.1112206)(speed))
+    np.testing.assert_allclose(df, 2.635278, rtol=1e-6)
+    fit = ss.smooth_spline(speed, dist, lambda_=0.1112206)(ux)
+    np.testing.assert_allclose((counts * (ybar - fit) ** 2).sum(), 4187.776,
+                               rtol=1e-6)
+
+    # GCV criterion at ``spar``
+    pred = ss.smooth_spline(speed, np.vstack((dist, np.eye(n))),
+                            spar=0.7801305)(speed)
+    rss, df = ((dist - pred[0]) ** 2).sum(), np.trace(pred[1:])
+    np.testing.assert_allclose(rss / n / (1 - df / n) ** 2, 244.1044,
+                               rtol=1e-6)
+
+
+@pytest.mark.skipif(not has_rpy2, reason='Requires rpy2')
+@pytest.mark.parametrize('spar', [0.3, 0.55, 0.8])
+@pytest.mark.parametrize('n', [30, 400])
+def test_smooth_spline_R(x_y, spar, n):
+    x, y = x_y[0][:n], x_y[1][:n]
+    _x = np.arange(0, 367)
+    np.testing.assert_allclose(ss.smooth_spline(x, y, spar=spar)(_x),
+                               CRAN_spline(x, y, spar=spar)(_x),
+                               rtol=1e-5, atol=1e-6)
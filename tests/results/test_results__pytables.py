@@ -89,3 +89,29 @@ class TestHDF5ResultsStore(object):
 
     def test_setitem(self):
         pass
+
+
+def test_add_columns(test_data_1):
+    import numpy as np
+    from yatsm.results._pytables import add_columns, create_table
+
+    result = np.zeros(25, dtype=[('px', 'u2'), ('py', 'u2'),
+                                 ('start_day', 'i4'), ('end_day', 'i4'),
+                                 ('break_day', 'i4')])
+    result['px'] = np.arange(25)
+    test_data_1.close()
+    with HDF5ResultsStore(test_data_1.filename, 'r+') as store:
+        table = create_table(store.h5file, '/ccdc', 'ccdc', result,
+                             attrs={'version': '1.0.0'}, index=False)
+        table.append(result)
+        table.cols.px.create_index()
+
+        table = add_columns(store.h5file, table,
+                            np.dtype([('rlm_rmse', 'f4', (2, ))]),
+                            chunksize=10)
+        assert table._v_pathname == '/ccdc/ccdc'
+        assert table.colnames[-1] == 'rlm_rmse'
+        assert table.attrs['version'] == '1.0.0'
+        assert table.cols.px.is_indexed
+        np.testing.assert_equal(table.col('px'), result['px'])
+        assert not table.col('rlm_rmse').any()
@@ -0,0 +1,62 @@
+""" Tests for ``yatsm.structural_break._breakpoints``
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from yatsm.structural_break import _breakpoints as bp
+
+
+@pytest.fixture
+def two_breaks():
+    """ Shifts in the mean after observations 59 and 129
+    """
+    rng = np.random.RandomState(0)
+    n = 200
+    X = np.column_stack((np.ones(n), np.arange(n) / n))
+    y = np.concatenate((np.zeros(60), np.ones(70) * 5, np.ones(70) * -3))
+    y += rng.normal(0, 0.5, n)
+    return X, y
+
+
+def test__rss_triangle(two_breaks):
+    X, y = two_breaks
+    rss = bp._rss_triangle(X, y, 10)
+    for i, j in ((0, 9), (0, 199), (25, 80), (150, 199)):
+        resid = np.linalg.lstsq(X[i:j + 1], y[i:j + 1], -1)[1]
+        np.testing.assert_allclose(rss[i, j], resid[0])
+    assert np.isinf(rss[0, 8])
+    assert np.isinf(rss[191, 199])
+
+
+@pytest.mark.parametrize('criterion', ('BIC', 'LWZ'))
+def test_breakpoints(two_breaks, criterion):
+    X, y = two_breaks
+    result = bp.breakpoints(X, y, h=0.15, criterion=criterion)
+    np.testing.assert_equal(result.index, [59, 129])
+    assert result.signif
+    assert result.process.size == 200 // 30
+    assert result.score == result.process.min()
+
+
+def test_breakpoints_no_break(two_breaks):
+    X, y = two_breaks
+    y = np.random.RandomState(1).normal(0, 1, y.size)
+    result = bp.breakpoints(X, y, h=20)
+    assert result.index.size == 0
+    assert not result.signif
+
+
+def test_breakpoints_pandas(two_breaks):
+    X, y = two_breaks
+    dates = pd.date_range('2000-01-01', periods=y.size, freq='16D')
+    result = bp.breakpoints(X, pd.Series(y, index=dates), h=30, breaks=3)
+    assert list(result.index) == [dates[59], dates[129]]
+
+
+def test_breakpoints_error(two_breaks):
+    X, y = two_breaks
+    with pytest.raises(ValueError):
+        bp.breakpoints(X, y, h=2)
+    with pytest.raises(ValueError):
+        bp.breakpoints(X, y, criterion='AIC')
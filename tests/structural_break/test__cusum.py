@@ -113,3 +113,30 @@ def test_cusum_rec_efp_sctest_pvalue(airquality):
 def test_cusum_rec_test_crit(alpha, truth):
     test = cu._cusum_rec_test_crit(alpha)
     np.testing.assert_allclose(truth, test, rtol=1e-3)
+
+
+def test__kstwobign_sf():
+    from scipy import stats
+    x = np.concatenate((np.linspace(0, 8, 1001), [0.123456, 2.5, 10.0]))
+    np.testing.assert_allclose(cu._kstwobign_sf(x), stats.kstwobign.sf(x),
+                               rtol=1e-5)
+    np.testing.assert_allclose(cu._kstwobign_sf(1.36),
+                               stats.kstwobign.sf(1.36), rtol=1e-5)
+
+
+def test__brownian_motion_pvalue():
+    from scipy.stats import norm
+
+    def truth(x):
+        if x < 0.3:
+            return 1 - 0.1464 * x
+        return 2 * (1 - norm.cdf(3 * x) +
+                    np.exp(-4 * x ** 2) * (norm.cdf(x) + norm.cdf(5 * x) - 1) -
+                    np.exp(-16 * x ** 2) * (1 - norm.cdf(x)))
+
+    x = np.concatenate((np.linspace(0, 2, 1001), [0.2999, 0.3, 0.654321]))
+    test = cu._brownian_motion_pvalue(x, 1)
+    np.testing.assert_allclose(test, [truth(_x) for _x in x], rtol=1e-5)
+    for _x in x[::50]:
+        np.testing.assert_allclose(cu._brownian_motion_pvalue(_x, 1),
+                                   truth(_x), rtol=1e-5)
@@ -86,3 +86,22 @@ def test_EWMA(x):
     # Test MAD
     result = _ewma.ewma(x, crit=2.7, lambda_=0.2, std_type='MAD')
     assert result.signif == False
+
+
+@pytest.mark.parametrize('lambda_', [0.05, 0.2, 0.9])
+def test__ewma_smooth_recursive(x, lambda_):
+    # Dense weights of all previous observations
+    n = x.size
+    i, j = np.indices((n, n))
+    S1 = np.where(j <= i, (1 - lambda_) ** (i - j), 0)
+    S2 = (1 - lambda_) ** np.arange(1, n + 1)
+    expected = lambda_ * np.dot(S1, x) + S2 * x.mean()
+
+    result = _ewma._ewma_smooth(x, x.mean(), lambda_=lambda_)
+    np.testing.assert_allclose(result, expected)
+
+    Y = np.vstack((x, x[::-1] * 2))
+    result = _ewma._ewma_smooth_batch(Y, Y.mean(axis=1), lambda_=lambda_)
+    for y, r in zip(Y, result):
+        np.testing.assert_allclose(
+            r, _ewma._ewma_smooth(y, y.mean(), lambda_=lambda_))
@@ -0,0 +1,89 @@
+""" Tests for ``yatsm.structural_break._stack``
+"""
+import numpy as np
+import patsy
+import pytest
+import xarray as xr
+
+from yatsm.structural_break import (cusum_OLS, cusum_OLS_stack,
+                                    cusum_recursive, cusum_recursive_stack,
+                                    ewma, ewma_stack)
+from yatsm.structural_break import _cusum as cu
+
+
+@pytest.fixture
+def stack_data(airquality):
+    X = np.asarray(patsy.dmatrix('1 + SolarR + Wind + Temp',
+                                 data=airquality))
+    y = airquality['Ozone'].values.astype(np.float64)
+    rng = np.random.RandomState(0)
+    Y = np.vstack((y, y[::-1], y + rng.normal(0, 25, y.size),
+                   np.concatenate((y[:50], y[50:] + 100))))
+    return X, Y
+
+
+def test_cusum_OLS_stack(stack_data):
+    X, Y = stack_data
+    result = cusum_OLS_stack(X, Y)
+    for i, y in enumerate(Y):
+        truth = cusum_OLS(X, y)
+        np.testing.assert_allclose(result.score[i], truth.score)
+        np.testing.assert_allclose(result.pvalue[i], truth.pvalue)
+        np.testing.assert_allclose(result.process[i], truth.process,
+                                   atol=1e-8)
+        assert result.signif[i] == truth.signif
+
+
+def test_cusum_recursive_stack(stack_data):
+    X, Y = stack_data
+    k = X.shape[1]
+    result = cusum_recursive_stack(X, Y)
+    for i, y in enumerate(Y):
+        process = cu._cusum_rec_efp(X, y)
+        score = cu._cusum_rec_sctest(process)
+        np.testing.assert_allclose(result.score[i], score)
+        np.testing.assert_allclose(result.pvalue[i],
+                                   cu._brownian_motion_pvalue(score, 1))
+        np.testing.assert_allclose(result.process[i, k - 1:], process)
+        assert np.isnan(result.process[i, :k - 1]).all()
+
+        # Same significance and change point as the test of one series
+        truth = cusum_recursive(X, y)
+        assert result.signif[i] == truth.signif
+        assert result.index[i] == truth.index
+        np.testing.assert_allclose(result.boundary[i, k - 1:],
+                                   truth.boundary)
+    # Obvious shift
+    assert result.signif[-1]
+
+
+@pytest.mark.parametrize('std_type', ('SD', 'MR', 'MAD'))
+def test_ewma_stack(stack_data, std_type):
+    Y = stack_data[1]
+    result = ewma_stack(Y, std_type=std_type)
+    for i, y in enumerate(Y):
+        truth = ewma(y, std_type=std_type)
+        np.testing.assert_allclose(result.score[i], truth.score)
+        np.testing.assert_allclose(result.process[i], truth.process,
+                                   atol=1e-8)
+        np.testing.assert_allclose(result.boundary[i], truth.boundary)
+        assert result.index[i] == truth.index
+        assert result.signif[i] == truth.signif
+
+
+def test_stack_DataArray(stack_data):
+    X, Y = stack_data
+    n = Y.shape[1]
+    time = np.arange(1000, 1000 + n)
+    da = xr.DataArray(np.tile(Y.T[:, :, None], (1, 1, 3)),
+                      coords=[time, np.arange(4), np.arange(3)],
+                      dims=['time', 'y', 'x'])
+    truth = cusum_OLS_stack(X, Y)
+    result = cusum_OLS_stack(X, da)
+
+    assert result.score.dims == ('y', 'x')
+    assert result.process.dims == ('y', 'x', 'time')
+    np.testing.assert_allclose(result.score.values,
+                               np.tile(truth.score[:, None], (1, 3)))
+    np.testing.assert_equal(result.index.values,
+                            np.tile(time[truth.index][:, None], (1, 3)))
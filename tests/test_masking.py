@@ -45,3 +45,55 @@ def test_smooth_mask(masking_data):
     mask = yatsm.masking.smooth_mask(x, Y, span, green=0, swir1=1)
 
     assert np.array_equal(np.where(~mask)[0], idx_noise)
+
+
+def test_multitemp_mask_design(masking_data):
+    x, Y, idx_noise = masking_data
+    design = yatsm.masking.MultitempDesignCache(x)
+
+    mask = yatsm.masking.multitemp_mask(x, Y, 2, green=0, swir1=1,
+                                        design=design)
+    assert np.array_equal(np.where(~mask)[0], idx_noise)
+
+
+@pytest.mark.parametrize('index', [
+    slice(None),
+    slice(10, 50),
+    np.array([0, 3, 4, 5, 20, 60]),
+])
+@pytest.mark.parametrize('n_year', [1, 1.5, 2])
+def test_MultitempDesignCache(masking_data, index, n_year):
+    x = masking_data[0]
+    design = yatsm.masking.MultitempDesignCache(x)
+
+    X = design(x[index], n_year)
+    np.testing.assert_allclose(
+        X, yatsm.masking.multitemp_design(x[index], n_year))
+    # Dates outside of the cached series are computed
+    np.testing.assert_allclose(
+        design(x[index] + 1, n_year),
+        yatsm.masking.multitemp_design(x[index] + 1, n_year))
+
+
+def test_multitemp_mask_block(masking_data):
+    x, Y, idx_noise = masking_data
+    design = yatsm.masking.MultitempDesignCache(x)
+
+    # Time series of different subsets and lengths, padded at the end
+    prng = np.random.RandomState(0)
+    index = np.array([np.arange(x.size),
+                      np.r_[np.arange(0, x.size, 2), np.zeros(46, int)],
+                      np.r_[np.arange(5, x.size), np.zeros(5, int)]])
+    n = np.array([x.size, 46, x.size - 5])
+    n_year = np.array([2, 1.5, 0.9])
+    _Y = Y[:, index].transpose(1, 0, 2) + prng.normal(0, 10, (3, 2, x.size))
+
+    mask = yatsm.masking.multitemp_mask_block(design, index, _Y, n, n_year,
+                                              green=0, swir1=1)
+    for i in range(3):
+        t = index[i, :n[i]]
+        truth = yatsm.masking.multitemp_mask(x[t], _Y[i, :, :n[i]],
+                                             n_year[i], green=0, swir1=1)
+        np.testing.assert_equal(mask[i, :n[i]], truth)
+        assert not mask[i, n[i]:].any()
+    np.testing.assert_equal(np.where(~mask[0])[0], idx_noise)
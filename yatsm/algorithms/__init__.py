@@ -2,10 +2,12 @@
 
 Algorithms currently include:
     - :py:class:`ccdc.CCDCesque`
+    - :py:class:`ccdc_block.CCDCesqueBlock`
 
 """
 from ._core import iep, Segment, SEGMENT_ATTRS, SEGMENT_DTYPES
 from .ccdc import CCDCesque
+from .ccdc_block import CCDCesqueBlock
 
 
 AVAILABLE = {
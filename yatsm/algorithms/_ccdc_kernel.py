@@ -0,0 +1,350 @@
+""" Nopython kernel of the CCDCesque time series segmentation
+
+The kernel runs the same state machine as :meth:`CCDCesque.fit
+<yatsm.algorithms.ccdc.CCDCesque.fit>` for the special case of an ordinary
+least squares estimator (:class:`sklearn.linear_model.LinearRegression`) and
+multitemporal RLM noise screening, so that the entire fit of a pixel may be
+compiled by Numba instead of bouncing between Python, scikit-learn, and
+NumPy for every observation.
+
+Observations removed as noise are tracked by an index of the observations
+still in use (``obs``) rather than by copying the data.
+
+The pure Python implementation in :class:`~yatsm.algorithms.ccdc.CCDCesque`
+remains the reference implementation, and is used when Numba is not
+available.
+"""
+from __future__ import division
+
+import numpy as np
+
+from ..accel import try_jit
+from ..regression.robust_fit import (EPS, _check_converge,
+                                     _weight_fit_inplace, bisquare, mad)
+
+#: int: Kernel finished successfully
+STATUS_OK = 0
+#: int: Not enough observations to proceed after noise removal
+STATUS_SHORT = 1
+
+NDAYS = 365.25
+
+
+# ROBUST SCREENING
+@try_jit(nopython=True)
+def _rlm_predict(X, y, maxiter, tune=4.685, scale_constant=0.6745, tol=1e-8):
+    """ Predict ``y`` using a bisquare RLM, as in
+    :class:`yatsm.regression.robust_fit.RLM`
+    """
+    n, p = X.shape
+    XTWX, coef, resid = np.empty((p, p)), np.empty(p), np.empty(n)
+    _coef = np.empty(p)
+    _weight_fit_inplace(X, y, np.ones(n), XTWX, coef, resid)
+    scale = mad(resid, scale_constant)
+
+    if scale >= EPS:
+        iteration = 1
+        converged = False
+        while not converged and iteration < maxiter:
+            _coef[:] = coef
+            weights = bisquare(resid / scale, tune)
+            _weight_fit_inplace(X, y, weights, XTWX, coef, resid)
+            scale = max(EPS, mad(resid, scale_constant))
+            iteration += 1
+            converged = _check_converge(coef, _coef, tol)
+
+    return np.dot(X, coef)
+
+
+@try_jit(nopython=True)
+def _multitemp_mask(x, green, swir1, n_year, crit, maxiter=10):
+    """ Multitemporal masking, as in :func:`yatsm.masking.multitemp_mask`
+    """
+    n_year = np.ceil(n_year)
+    w = 2.0 * np.pi / NDAYS
+
+    X = np.empty((x.size, 5))
+    for i in range(x.size):
+        X[i, 0] = 1.0
+        X[i, 1] = np.cos(w * x[i])
+        X[i, 2] = np.sin(w * x[i])
+        X[i, 3] = np.cos(w / n_year * x[i])
+        X[i, 4] = np.sin(w / n_year * x[i])
+
+    green_hat = _rlm_predict(X, green, maxiter)
+    swir1_hat = _rlm_predict(X, swir1, maxiter)
+
+    return (green - green_hat < crit) & (swir1 - swir1_hat > -crit)
+
+
+# MODEL FITTING
+@try_jit(nopython=True)
+def _fit_models(X, Y, obs, start, end, bands, fit_intercept, coef_, intercept,
+                rmse):
+    """ Fit OLS models for ``bands`` using observations ``obs[start:end]``
+
+    Updates ``coef_``, ``intercept``, and ``rmse`` in place, as
+    :class:`sklearn.linear_model.LinearRegression` would.
+    """
+    n, p = end - start, X.shape[1]
+    _X = np.empty((n, p))
+    _Y = np.empty((n, bands.size))
+    for i in range(n):
+        o = obs[start + i]
+        _X[i, :] = X[o, :]
+        for j in range(bands.size):
+            _Y[i, j] = Y[bands[j], o]
+
+    mean_X = np.zeros(p)
+    mean_Y = np.zeros(bands.size)
+    if fit_intercept:
+        for i in range(n):
+            mean_X += _X[i, :]
+            mean_Y += _Y[i, :]
+        mean_X /= n
+        mean_Y /= n
+
+    beta = np.linalg.lstsq(_X - mean_X, _Y - mean_Y, -1.0)[0]
+    resid = _Y - (np.dot(_X, beta) + mean_Y - np.dot(mean_X, beta))
+
+    for j in range(bands.size):
+        b = bands[j]
+        coef_[b, :] = beta[:, j]
+        intercept[b] = mean_Y[j] - np.dot(mean_X, beta[:, j])
+        rmse[b] = np.sqrt(np.mean(resid[:, j] ** 2))
+
+
+@try_jit(nopython=True)
+def _predict(X, coef_, intercept, b, o):
+    """ Predict band ``b`` of observation ``o``
+    """
+    return np.dot(X[o, :], coef_[b, :]) + intercept[b]
+
+
+# MAIN LOOP
+@try_jit(nopython=True)
+def ccdc_kernel(X, Y, dates, test_indices, min_rmse, consecutive, threshold,
+                min_obs, retrain_time, screening_crit, green_band, swir1_band,
+                remove_noise, dynamic_rmse, slope_test, idx_slope,
+                fit_intercept):
+    """ Run CCDCesque with an OLS estimator and RLM screening
+
+    Arguments match the hyperparameters of
+    :class:`~yatsm.algorithms.ccdc.CCDCesque`.
+
+    Args:
+        X (np.ndarray): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray): 2D (n_series x n_obs) dependent variables
+        dates (np.ndarray): 1D (n_obs) ordinal dates as float
+        test_indices (np.ndarray): Indices of ``Y`` to test for change
+        min_rmse (np.ndarray): Minimum RMSE of each series in ``Y``
+        consecutive (int): Consecutive observations to trigger change
+        threshold (float): Test statistic threshold for change
+        min_obs (int): Minimum observations in model
+        retrain_time (float): Number of days between model fit updates
+        screening_crit (float): Critical value for multitemporal screening
+        green_band (int): Index of green band in ``Y``
+        swir1_band (int): Index of first SWIR band in ``Y``
+        remove_noise (bool): Remove noise during monitoring
+        dynamic_rmse (bool): Vary RMSE as a function of day of year
+        slope_test (bool): Test the slope of the training period
+        idx_slope (int): Index of ``X`` containing slope term
+        fit_intercept (bool): Estimate an intercept for each model
+
+    Returns:
+        tuple: Kernel status (:data:`STATUS_OK` or :data:`STATUS_SHORT`), the
+        number of records, the record start, end, and break dates (records),
+        coefficients (records x n_features x n_series), RMSE
+        (records x n_series), and magnitudes (records x n_series), the
+        indices and number of observations not removed as noise, and the
+        current coefficients (n_series x n_features), intercept, and RMSE of
+        the models. Only the first ``n_record`` records are valid
+    """
+    n_features, n_series = X.shape[1], Y.shape[0]
+    n_test = test_indices.size
+    all_bands = np.arange(n_series)
+
+    # Observations not removed as noise
+    obs = np.arange(dates.size)
+    n_obs = dates.size
+
+    # Models
+    coef_ = np.zeros((n_series, n_features))
+    intercept = np.zeros(n_series)
+    rmse = np.zeros(n_series)
+
+    # Records -- each record spans at least `min_obs` observations
+    n_record = 0
+    capacity = dates.size // max(min_obs, 1) + 2
+    rec_start = np.zeros(capacity, np.int32)
+    rec_end = np.zeros(capacity, np.int32)
+    rec_break = np.zeros(capacity, np.int32)
+    rec_coef = np.zeros((capacity, n_features, n_series), np.float32)
+    rec_rmse = np.zeros((capacity, n_series), np.float32)
+    rec_mag = np.zeros((capacity, n_series), np.float32)
+
+    _rmse = np.zeros(n_test)
+    scores = np.zeros((n_test, consecutive))
+    mag = np.zeros(consecutive)
+
+    # Location information
+    start = 0
+    here = min_obs
+    _here = here
+    trained_date = 0.0
+    monitoring = False
+
+    while here < n_obs:
+
+        # TRAINING
+        while not monitoring and here < n_obs - consecutive - 1:
+            span_time = abs(dates[obs[here]] - dates[obs[start]])
+            if span_time <= NDAYS or here - start < n_features:
+                here += 1
+                continue
+
+            # Multitemporal noise removal
+            end = here + consecutive
+            _obs = obs[start:end]
+            mask = _multitemp_mask(dates[_obs],
+                                   Y[green_band, _obs], Y[swir1_band, _obs],
+                                   span_time / NDAYS, screening_crit)
+            _span_index = mask[:-consecutive].sum()
+            if (_span_index < min_obs or
+                    abs(dates[obs[start + _span_index - 1]] -
+                        dates[obs[start]]) < NDAYS):
+                here += 1
+                continue
+
+            # Remove noise, keeping a copy in case training fails
+            obs_train = obs[start:n_obs].copy()
+            n = start
+            for i in range(start, end):
+                if mask[i - start]:
+                    obs[n] = obs[i]
+                    n += 1
+            for i in range(end, n_obs):
+                obs[n] = obs[i]
+                n += 1
+            n_obs = n
+
+            _here = here
+            here = start + _span_index - 1
+
+            if here >= n_obs:
+                return (STATUS_SHORT, n_record, rec_start, rec_end,
+                        rec_break, rec_coef, rec_rmse, rec_mag, obs, n_obs,
+                        coef_, intercept, rmse)
+
+            # Fit and test stability of training period
+            _fit_models(X, Y, obs, start, here + 1, test_indices,
+                        fit_intercept, coef_, intercept, rmse)
+            test_start, test_end, test_slope = 0.0, 0.0, 0.0
+            for i in range(n_test):
+                b = test_indices[i]
+                r = max(min_rmse[b], rmse[b])
+                test_start += (abs(Y[b, obs[start]] -
+                                   _predict(X, coef_, intercept, b,
+                                            obs[start])) / r) ** 2
+                test_end += (abs(Y[b, obs[here]] -
+                                 _predict(X, coef_, intercept, b,
+                                          obs[here])) / r) ** 2
+                test_slope += (abs(coef_[b, idx_slope] * (here - start)) /
+                               r) ** 2
+
+            if (np.sqrt(test_start) > threshold or
+                    np.sqrt(test_end) > threshold or
+                    (slope_test and np.sqrt(test_slope) > threshold)):
+                n_obs = start + obs_train.size
+                obs[start:n_obs] = obs_train
+                start += 1
+                here = _here
+            else:
+                monitoring = True
+
+            here += 1
+
+        # Ensure all bands are fit in case we can't monitor
+        if here - start > n_features and \
+                abs(dates[obs[here]] - trained_date) > retrain_time:
+            _fit_models(X, Y, obs, start, here + 1, all_bands,
+                        fit_intercept, coef_, intercept, rmse)
+            trained_date = dates[obs[here]]
+
+        # MONITORING
+        while monitoring and here < n_obs - consecutive - 1:
+            if abs(dates[obs[here]] - trained_date) > retrain_time:
+                _fit_models(X, Y, obs, start, here + 1, all_bands,
+                            fit_intercept, coef_, intercept, rmse)
+                trained_date = dates[obs[here]]
+
+            # RMSE of tested models
+            if dynamic_rmse:
+                doy = np.mod(dates[obs[start:here]] -
+                             dates[obs[here + consecutive]], NDAYS)
+                # Like CCDCesque, indices relative to `start` are used to
+                # index all observations, and ties are kept in their order
+                i_doy = obs[np.argsort(doy, kind='mergesort')[:min_obs]]
+                for i in range(n_test):
+                    b = test_indices[i]
+                    sse = 0.0
+                    for o in i_doy:
+                        sse += (Y[b, o] -
+                                _predict(X, coef_, intercept, b, o)) ** 2
+                    _rmse[i] = np.float32(np.sqrt(sse / i_doy.size))
+            else:
+                for i in range(n_test):
+                    _rmse[i] = rmse[test_indices[i]]
+
+            # Scaled residuals of next `consecutive` observations
+            for j in range(consecutive):
+                o = obs[here + j]
+                mag[j] = 0.0
+                for i in range(n_test):
+                    b = test_indices[i]
+                    scores[i, j] = ((Y[b, o] -
+                                     _predict(X, coef_, intercept, b, o)) /
+                                    max(min_rmse[b], _rmse[i]))
+                    mag[j] += scores[i, j] ** 2
+                mag[j] = np.sqrt(mag[j])
+
+            if np.all(mag > threshold):
+                rec_start[n_record] = dates[obs[start]]
+                rec_end[n_record] = dates[obs[here]]
+                rec_break[n_record] = dates[obs[here + 1]]
+                for b in range(n_series):
+                    rec_coef[n_record, :, b] = coef_[b, :]
+                    rec_coef[n_record, 0, b] += intercept[b]
+                    rec_rmse[n_record, b] = rmse[b]
+                for i in range(n_test):
+                    rec_mag[n_record, test_indices[i]] = np.mean(scores[i, :])
+                n_record += 1
+
+                start = here + 1
+                trained_date = 0.0
+                monitoring = False
+            elif mag[0] > threshold and remove_noise:
+                obs[here:n_obs - 1] = obs[here + 1:n_obs].copy()
+                n_obs -= 1
+                here -= 1
+
+            here += 1
+
+        here += 1
+
+    # Update record for last model
+    rec_start[n_record] = dates[obs[start]]
+    # Re-adjust end for consecutive, and for two ``here += 1`` calls
+    i_end = here - consecutive - (2 if monitoring else 1)
+    if i_end < 0:
+        i_end += n_obs
+    rec_end[n_record] = dates[obs[i_end]]
+    for b in range(n_series):
+        rec_coef[n_record, :, b] = coef_[b, :]
+        rec_coef[n_record, 0, b] += intercept[b]
+        rec_rmse[n_record, b] = rmse[b]
+    if monitoring:
+        n_record += 1
+
+    return (STATUS_OK, n_record, rec_start, rec_end, rec_break, rec_coef,
+            rec_rmse, rec_mag, obs, n_obs, coef_, intercept, rmse)
@@ -1,5 +1,6 @@
 from __future__ import print_function, division
 
+import bisect
 import logging
 import sys
 
@@ -7,14 +8,56 @@ import numpy as np
 
 import sklearn.linear_model
 
-from ..accel import try_jit
+from ..accel import has_numba, try_jit
 from ..errors import TSLengthException
-from ..masking import smooth_mask, multitemp_mask
+from ..masking import MultitempDesignCache, smooth_mask, multitemp_mask
 from ..regression.diagnostics import rmse
+from ..regression.ols import OLSStatistics
+from ..structural_break._cusum import CUSUM_OLS_CRIT, _cusum
+from ._ccdc_kernel import STATUS_SHORT, ccdc_kernel
 
 # Setup
 logger = logging.getLogger('yatsm.algo')
 
+#: dict: Record datatypes, cached by (number of features, number of series)
+_RECORD_DTYPES = {}
+
+
+def record_dtype(n_features, n_series):
+    """ Return the NumPy datatype of a YATSM record
+
+    Datatypes are cached so they aren't rebuilt for every record.
+
+    Args:
+        n_features (int): Number of features in the design matrix
+        n_series (int): Number of series modeled
+
+    Returns:
+        numpy.dtype: Datatype of a YATSM record
+    """
+    key = (n_features, n_series)
+    dtype = _RECORD_DTYPES.get(key)
+    if dtype is None:
+        dtype = _RECORD_DTYPES[key] = np.dtype([
+            ('start', 'i4'),
+            ('end', 'i4'),
+            ('break', 'i4'),
+            ('coef', 'float32', (n_features, n_series)),
+            ('rmse', 'float32', (n_series)),
+            ('magnitude', 'float32', n_series),
+            ('px', 'u2'),
+            ('py', 'u2')
+        ])
+    return dtype
+
+
+#: tuple: Estimators that can fit all bands at once, sharing one design matrix,
+#         with the same results as fitting each band separately
+MULTIOUTPUT_ESTIMATORS = (
+    sklearn.linear_model.LinearRegression,
+    sklearn.linear_model.Lasso,
+)
+
 
 @try_jit(nopython=True)
 def _monitor_calc_scores(X, Y, here, scores, predictions, rmse,
@@ -69,6 +112,23 @@ class CCDCesque(object):
             test but overrides the test criterion threshold. (default: False)
         idx_slope (int): if ``slope_test`` is enabled, provide index of ``X``
             containing slope term (default: 1)
+        dtype (numpy.dtype): Datatype of ``X`` and ``Y`` while fitting. Use
+            ``float32`` to halve the memory and bandwidth used by the time
+            series. Estimators then fit models in single precision, except
+            for the running OLS statistics and the nopython kernel, which
+            solve in double precision from single precision data. Records
+            from single precision fits usually have the same dates as from
+            double precision fits, with coefficients and RMSE within about
+            0.1% (default: ``float64``)
+        stable_test (float or bool): Pre-screen the entire time series for
+            stability before running the full algorithm. A pixel is stable
+            if, after noise screening, an OLS-CUSUM test of the residuals of
+            each test index is not significant and no ``consecutive``
+            observations exceed ``threshold``. Stable pixels emit a single
+            record spanning all observations without monitoring for change.
+            A value of True enables the test at a significance level of 0.05,
+            or a float value (0.01, 0.05, or 0.10) enables the test at that
+            significance level. False turns off the test (default: False)
 
 
     .. document private functions
@@ -82,6 +142,9 @@ class CCDCesque(object):
     __algorithm__ = ':'.join([__name, __version__])
 
     ndays = 365.25
+    #: int: Number of records to allocate space for when fitting. Space is
+    #       doubled as needed
+    record_capacity = 4
 
     def __init__(self,
                  test_indices=None,
@@ -91,14 +154,30 @@ class CCDCesque(object):
                  retrain_time=365.25, screening='RLM', screening_crit=400.0,
                  remove_noise=True, green_band=1, swir1_band=4,
                  dynamic_rmse=False, slope_test=False, idx_slope=1,
-                 **kwargs):
+                 dtype=np.float64, stable_test=False, **kwargs):
         self.test_indices = np.asarray(test_indices)
+        self.dtype = np.dtype(dtype)
         self.estimator = sklearn.clone(estimator['object'])
         self.estimator_fit = estimator.get('fit', {})
+        # Check exact type -- subclasses (e.g., MultiTaskLasso) might
+        # estimate bands jointly
+        self.multioutput = type(self.estimator) in MULTIOUTPUT_ESTIMATORS
+        # OLS retraining can update normal equations as observations are added
+        self.incremental = (
+            type(self.estimator) is sklearn.linear_model.LinearRegression and
+            not self.estimator_fit)
+        # OLS with RLM screening can be fit entirely by a compiled kernel
+        self.nopython = (has_numba and self.incremental and
+                         screening == 'RLM')
         self.models = []  # leave empty, fill in during `fit`
+        # Coefficients, intercepts, and RMSE of all models, stacked
+        self.coef_, self.intercept_, self.rmse_ = None, None, None
 
         self.n_record = 0
         self.record = []
+        #: str: Path through :meth:`fit` taken by the last time series fit
+        #       (``'stable'`` or ``'full'``)
+        self.fit_path = None
 
         self.n_series, self.n_features = 0, 0
         self.px = kwargs.get('px', 0)
@@ -112,6 +191,7 @@ class CCDCesque(object):
         self.retrain_time = retrain_time
 
         # Define screening method according to type
+        self.screening = screening
         if screening == 'RLM':
             self.screen_timeseries = self._screen_timeseries_RLM
             logger.debug('Using RLM for screening')
@@ -129,7 +209,14 @@ class CCDCesque(object):
         if self.slope_test is True:
             self.slope_test = threshold
         self.idx_slope = idx_slope
-
+        self.stable_test = stable_test
+        if self.stable_test is True:
+            self.stable_test = 0.05
+        if self.stable_test and self.stable_test not in CUSUM_OLS_CRIT:
+            raise ValueError('stable_test must be one of %s' %
+                             sorted(CUSUM_OLS_CRIT))
+
+        self.dynamic_rmse = dynamic_rmse
         if dynamic_rmse:
             self.get_rmse = self._get_dynamic_rmse
         else:
@@ -147,22 +234,48 @@ class CCDCesque(object):
                 YATSM record
 
         """
-        record_template = np.zeros(1, dtype=[
-            ('start', 'i4'),
-            ('end', 'i4'),
-            ('break', 'i4'),
-            ('coef', 'float32', (self.n_features, self.n_series)),
-            ('rmse', 'float32', (self.n_series)),
-            ('magnitude', 'float32', self.n_series),
-            ('px', 'u2'),
-            ('py', 'u2')
-        ])
+        record_template = np.zeros(1, dtype=record_dtype(self.n_features,
+                                                         self.n_series))
         record_template['px'] = self.px
         record_template['py'] = self.py
 
         return record_template
 
 # HELPER PROPERTIES
+    @property
+    def X(self):
+        """ numpy.ndarray: Design matrix of observations not removed as noise
+        """
+        return self._X_obs[:self._n_front, :]
+
+    @X.setter
+    def X(self, value):
+        self._X_obs = value
+        self.n_obs = self._n_front = value.shape[0]
+
+    @property
+    def Y(self):
+        """ numpy.ndarray: Dependent variables of observations not removed as
+        noise
+        """
+        return self._Y_obs[:, :self._n_front]
+
+    @Y.setter
+    def Y(self, value):
+        self._Y_obs = value
+        self.n_obs = self._n_front = value.shape[1]
+
+    @property
+    def dates(self):
+        """ numpy.ndarray: Ordinal dates of observations not removed as noise
+        """
+        return self._dates_obs[:self._n_front]
+
+    @dates.setter
+    def dates(self, value):
+        self._dates_obs = value
+        self.n_obs = self._n_front = len(value)
+
     @property
     def span_time(self):
         """ Return time span (in days) between start and end of model """
@@ -176,12 +289,12 @@ class CCDCesque(object):
     @property
     def running(self):
         """ Determine if timeseries can run """
-        return self.here < len(self.dates)
+        return self.here < self.n_obs
 
     @property
     def can_monitor(self):
         """ Determine if timeseries can monitor the future consecutive obs """
-        return self.here < len(self.dates) - self.consecutive - 1
+        return self.here < self.n_obs - self.consecutive - 1
 
 # MAIN LOOP
     def fit(self, X, Y, dates):
@@ -200,11 +313,15 @@ class CCDCesque(object):
         if len(dates) != X.shape[0] or len(dates) != Y.shape[1]:
             raise ValueError('X/Y/dates must have same number of observations')
 
-        self.X = np.asarray(X, dtype=np.float64)
-        self.Y = np.asarray(Y, dtype=np.float64)
-        self.dates = dates
+        # Copy data since noise is removed from observations in place
+        self._X_obs = np.array(X, dtype=self.dtype)
+        self._Y_obs = np.array(Y, dtype=self.dtype)
+        self._dates_obs = np.array(dates)
+        self.n_obs = self._n_front = len(dates)
         self.n_features = X.shape[1]
         self.n_series = Y.shape[0]
+        # Harmonics for multitemporal screening of any part of the series
+        self._design_cache = MultitempDesignCache(self._dates_obs)
 
         # Setup test indices
         if not np.any(np.asarray(self.test_indices)):
@@ -223,8 +340,16 @@ class CCDCesque(object):
             raise TSLengthException('Not enough observations (n = %s)' %
                                     len(dates))
 
+        if self.stable_test and self._fit_stable():
+            self.fit_path = 'stable'
+            return self
+        self.fit_path = 'full'
+
+        if self.nopython:
+            return self._fit_nopython()
+
         self.n_record = 0
-        self.record = np.copy(self.record_template)
+        self.record = np.repeat(self.record_template, self.record_capacity)
 
         while self.running:
 
@@ -247,21 +372,131 @@ class CCDCesque(object):
 
             self.here += 1
 
+        # Move all remaining observations in front of removed noise
+        self._fill_front(self.n_obs)
+
         # Update record for last model
         self.record[self.n_record]['start'] = self.dates[self.start]
         # Re-adjust end for consecutive, and for two ``self.here += 1`` calls
         offset = 1 + (1 if self.monitoring else 0)
         self.record[self.n_record]['end'] = self.dates[
             self.here - self.consecutive - offset]
-        for i, m in enumerate(self.models):
-            self.record[self.n_record]['coef'][:, i] = m.coef
-            self.record[self.n_record]['rmse'][i] = m.rmse
+        self._store_models()
 
         # If we ended without being able to monitor again, delete last model
         # since it will be empty
         # TODO: fit this time period with median
-        if not self.monitoring:
-            self.record = self.record[:-1]
+        n_record = self.n_record + (1 if self.monitoring else 0)
+        self.record = self.record[:n_record]
+
+        return self
+
+    def _fit_stable(self):
+        """ Fit one model to the entire time series if it is stable
+
+        The time series is screened for noise and fit once with OLS. It is
+        stable if the OLS-CUSUM test statistic of each test index is below
+        its critical value for the ``stable_test`` significance level and no
+        run of ``consecutive`` observations have scaled residuals above
+        ``threshold``, as would trigger a change while monitoring.
+
+        Returns:
+            bool: True if the time series is stable and a single record was
+            stored, else False with no state modified
+
+        """
+        span_time = abs(self.dates[-1] - self.dates[0])
+        if span_time <= self.ndays:
+            return False
+
+        if self.screening == 'RLM':
+            mask = multitemp_mask(self.dates, self.Y, span_time / self.ndays,
+                                  crit=self.screening_crit,
+                                  green=self.green_band,
+                                  swir1=self.swir1_band,
+                                  design=self._design_cache)
+        else:
+            mask = smooth_mask(self.dates, self.Y, self.consecutive * 2 + 1,
+                               crit=self.screening_crit,
+                               green=self.green_band, swir1=self.swir1_band)
+        if mask.sum() < max(self.min_obs, self.n_features + 1):
+            return False
+
+        X, Y = self.X[mask, :], self.Y[:, mask]
+        beta = np.linalg.lstsq(X, Y.T, -1)[0]
+        resid = (Y.T - np.dot(X, beta))[:, self.test_indices]
+
+        crit = CUSUM_OLS_CRIT[self.stable_test]
+        for i in range(resid.shape[1]):
+            score = np.abs(_cusum(resid[:, i].astype(np.float64),
+                                  self.n_features)).max()
+            if score > crit:
+                return False
+
+        _rmse = np.maximum((resid ** 2).mean(axis=0) ** 0.5,
+                           self.min_rmse[self.test_indices])
+        mag = np.linalg.norm(resid / _rmse, axis=1)
+        n_exceed = np.convolve(mag > self.threshold,
+                               np.ones(self.consecutive, dtype=int),
+                               mode='valid')
+        if np.any(n_exceed == self.consecutive):
+            return False
+
+        logger.debug('Time series is stable - fitting single model')
+        self._remove_obs(np.flatnonzero(~mask))
+        self._fill_front(self.n_obs)
+
+        self.fit_models(self.X, self.Y)
+
+        self.n_record = 0
+        self.record = self.record_template.copy()
+        self.record[0]['start'] = self.dates[0]
+        self.record[0]['end'] = self.dates[-1]
+        self._store_models()
+        self.n_record = 1
+
+        return True
+
+    def _fit_nopython(self):
+        """ Fit timeseries model using :func:`~._ccdc_kernel.ccdc_kernel`
+
+        Returns:
+            CCDCesque: Returns ``self``
+        """
+        (status, n_record, start, end, break_, coef, _rmse, magnitude,
+         obs, n_obs, coef_, intercept, model_rmse) = ccdc_kernel(
+            self.X.astype(np.float64), self.Y.astype(np.float64),
+            self.dates.astype(np.float64),
+            np.asarray(self.test_indices, dtype=np.intp),
+            self.min_rmse.astype(np.float64),
+            self.consecutive, float(self.threshold), self.min_obs,
+            float(self.retrain_time), float(self.screening_crit),
+            self.green_band, self.swir1_band,
+            bool(self.remove_noise), bool(self.dynamic_rmse),
+            bool(self.slope_test), self.idx_slope,
+            self.estimator.fit_intercept)
+
+        obs = obs[:n_obs]
+        self._X_obs = self._X_obs[obs, :]
+        self._Y_obs = self._Y_obs[:, obs]
+        self._dates_obs = self._dates_obs[obs]
+        self.n_obs = self._n_front = n_obs
+
+        if status == STATUS_SHORT:
+            raise TSLengthException('Not enough observations to proceed '
+                                    'after noise removal')
+
+        self._set_models(np.arange(self.n_series), coef_, intercept,
+                         model_rmse)
+
+        self.n_record = n_record
+        self.record = np.repeat(self.record_template, n_record)
+        self.record['start'] = start[:n_record]
+        self.record['end'] = end[:n_record]
+        self.record['break'] = break_[:n_record]
+        self.record['coef'] = coef[:n_record]
+        self.record['rmse'] = _rmse[:n_record]
+        self.record['magnitude'] = magnitude[:n_record]
 
         return self
 
@@ -274,6 +509,16 @@ class CCDCesque(object):
         self._here = self.here
         self.trained_date = 0
         self.monitoring = False
+        # Entire time series is screened once when screening with LOWESS
+        self.screened = False
+        # Training period observations before RLM noise removal
+        self._train_obs = None
+        # Running OLS statistics for X[_ols_start:_ols_end]
+        self._ols_stats = None
+        self._ols_start, self._ols_end = 0, 0
+        # Day of year sorted index of X[_doy_start:_doy_end]
+        self._doy_keys, self._doy_index = [], []
+        self._doy_start, self._doy_end = None, 0
         # Populate prediction models
         if len(self.models) == 0:
             self.models = np.array([sklearn.clone(self.estimator) for
@@ -281,6 +526,7 @@ class CCDCesque(object):
             for m in self.models:  # initialize additional attributes
                 m.rmse = 0.0
                 m.coef = np.zeros(self.X.shape[1])
+            self._init_stacked()
         # Training period test calculations
         self.start_resid = np.zeros(len(self.test_indices))
         self.end_resid = np.zeros(len(self.test_indices))
@@ -321,6 +567,8 @@ class CCDCesque(object):
                 {RMSE_b} > T_{crit}
 
         """
+        self._fill_front()
+
         # Test if we can train yet
         if self.span_time <= self.ndays or self.span_index < self.n_features:
             logger.debug('Could not train - moving forward')
@@ -331,13 +579,13 @@ class CCDCesque(object):
             return
 
         # Test if we can still run after noise removal
-        if self.here >= self._X.shape[0]:
+        if self.here >= self.n_obs:
             raise TSLengthException('Not enough observations to proceed '
                                     'after noise removal')
 
         # After noise removal, try to fit models
-        self.fit_models(self._X[self.start:self.here + 1, :],
-                        self._Y[:, self.start:self.here + 1],
+        self.fit_models(self.X[self.start:self.here + 1, :],
+                        self.Y[:, self.start:self.here + 1],
                         bands=self.test_indices)
 
         # Ensure first and last points aren't unusual
@@ -345,12 +593,12 @@ class CCDCesque(object):
             m = self.models[b]
             _rmse = max(self.min_rmse[b], m.rmse)
             self.start_resid[i] = (
-                np.abs(self._Y[b, self.start] -
-                       m.predict(self._X[self.start, :][None, :])) /
+                np.abs(self.Y[b, self.start] -
+                       m.predict(self.X[self.start, :][None, :])) /
                 _rmse)
             self.end_resid[i] = (
-                np.abs(self._Y[b, self.here] -
-                       m.predict(self._X[self.here, :][None, :])) /
+                np.abs(self.Y[b, self.here] -
+                       m.predict(self.X[self.here, :][None, :])) /
                 _rmse)
             self.slope_resid[i] = (
                 np.abs(m.coef_[self.idx_slope] * (self.here - self.start)) /
@@ -362,13 +610,12 @@ class CCDCesque(object):
         if (test_start > self.threshold or test_end > self.threshold or
                 (self.slope_test and test_slope > self.threshold)):
             logger.debug('Training period unstable')
+            self._restore_train_obs()
             self.start += 1
             self.here = self._here
             return
 
-        self.X = self._X
-        self.Y = self._Y
-        self.dates = self._dates
+        self._train_obs = None
 
         logger.debug('Entering monitoring period')
         self.monitoring = True
@@ -418,11 +665,13 @@ class CCDCesque(object):
         scaled residual is above ``threshold`` but not all ``consecutive``
         scaled residuals exceed ``threshold``.
         """
+        self._fill_front()
         _rmse = self.get_rmse()
 
-        for idx, model in enumerate(self.models[self.test_indices]):
-            self.predictions[idx, :] = model.predict(
-                self.X[self.here:self.here + self.consecutive, :])
+        self.predictions[:] = (
+            np.dot(self.coef_[self.test_indices, :],
+                   self.X[self.here:self.here + self.consecutive, :].T) +
+            self.intercept_[self.test_indices, None])
 
         _monitor_calc_scores(self.X, self.Y, self.here,
                              self.scores,
@@ -440,36 +689,81 @@ class CCDCesque(object):
             self.record[self.n_record]['start'] = self.dates[self.start]
             self.record[self.n_record]['end'] = self.dates[self.here]
             self.record[self.n_record]['break'] = self.dates[self.here + 1]
-            for i, m in enumerate(self.models):
-                self.record[self.n_record]['coef'][:, i] = m.coef
-                self.record[self.n_record]['rmse'][i] = m.rmse
+            self._store_models()
 
             # Record magnitude of difference for tested indices
             self.record[self.n_record]['magnitude'][self.test_indices] = \
                 np.mean(self.scores, axis=1)
 
-            self.record = np.append(self.record, self.record_template)
             self.n_record += 1
+            if self.n_record == self.record.size:
+                # Double capacity for amortized constant time growth
+                self.record = np.concatenate((
+                    self.record,
+                    np.repeat(self.record_template, self.record.size)
+                ))
 
-            # Reset _X and _Y for re-training
-            self._X = self.X
-            self._Y = self.Y
             self.start = self.here + 1
 
             self.trained_date = 0
             self.monitoring = False
 
         elif mag[0] > self.threshold and self.remove_noise:
-            # Masking way of deleting is faster than `np.delete`
-            m = np.ones(self.X.shape[0], dtype=bool)
-            m[self.here] = False
-            self.X = self.X[m, :]
-            self.Y = self.Y[:, m]
-            self.dates = self.dates[m]
+            # Remove observation from running OLS statistics, if included
+            if self._ols_stats is not None and self.here < self._ols_end:
+                self._ols_stats.downdate(self.X[self.here:self.here + 1, :],
+                                         self.Y[:, self.here:self.here + 1])
+                self._ols_end -= 1
+
+            self._remove_obs(np.array([self.here]))
             self.here -= 1
 
 # MODEL FITTING UTILITIES
+    def _store_models(self):
+        """ Copy coefficients and RMSE of ``self.models`` into current record
+        """
+        record = self.record[self.n_record]
+        record['coef'] = self.coef_.T
+        record['coef'][0, :] += self.intercept_
+        record['rmse'] = self.rmse_
+
+    def _init_stacked(self):
+        """ Initialize stacked coefficients, intercepts, and RMSE of models
+        """
+        self.coef_ = np.zeros((len(self.models), self.n_features))
+        self.intercept_ = np.zeros(len(self.models))
+        self.rmse_ = np.zeros(len(self.models))
+
+    def _set_models(self, bands, coef_, intercept, _rmse):
+        """ Store estimates of the models for `bands`
+
+        Args:
+            bands (numpy.ndarray): Indices of models estimated
+            coef_ (numpy.ndarray): Coefficients (bands x number of features),
+                excluding the intercept
+            intercept (numpy.ndarray): Intercept of each model
+            _rmse (numpy.ndarray): RMSE of each model
+        """
+        if (self.coef_ is None or
+                self.coef_.shape != (len(self.models), self.n_features)):
+            self._init_stacked()
+
+        self.coef_[bands, :] = coef_
+        self.intercept_[bands] = intercept
+        self.rmse_[bands] = _rmse
+
+        for b in bands:
+            model = self.models[b]
+            model.coef_ = self.coef_[b, :].copy()
+            model.intercept_ = self.intercept_[b]
+            model.rmse = self.rmse_[b]
+
+            # Add intercept to intercept term of design matrix
+            model.coef = model.coef_.copy()
+            model.coef[0] += model.intercept_
+
     def _update_model(self):
+        self._fill_front()
         # Only train if enough time has past
         if (abs(self.dates[self.here] - self.trained_date) >
                 self.retrain_time):
@@ -477,8 +771,11 @@ class CCDCesque(object):
                          str(self.dates[self.here] - self.trained_date))
 
             # Fit timeseries models
-            self.fit_models(self.X[self.start:self.here + 1, :],
-                            self.Y[:, self.start:self.here + 1])
+            if self.incremental:
+                self._fit_models_incremental()
+            else:
+                self.fit_models(self.X[self.start:self.here + 1, :],
+                                self.Y[:, self.start:self.here + 1])
 
             self.trained_date = self.dates[self.here]
 
@@ -497,16 +794,14 @@ class CCDCesque(object):
         if not self.screened:
             span = span or self.consecutive * 2 + 1
 
+            self._fill_front(self.n_obs)
             mask = smooth_mask(self.dates, self.Y, span,
                                crit=self.screening_crit,
                                green=self.green_band, swir1=self.swir1_band)
 
-            # Apply mask to X and Y
-            self.X = self.X[mask, :]
-            self.Y = self.Y[:, mask]
-            # Also apply to _X and _Y for training purposes
-            self._X = self.X
-            self._Y = self.Y
+            # Remove noise from X, Y, and dates
+            self._remove_obs(np.flatnonzero(~mask))
+            self._ols_stats = None
 
             self.screened = True
 
@@ -520,28 +815,36 @@ class CCDCesque(object):
 
         """
         # Multitemporal noise removal
-        mask = np.ones(self.X.shape[0], dtype=np.bool)
-        index = np.arange(self.start, self.here + self.consecutive,
-                          dtype=np.uint16)
-        mask[index] = multitemp_mask(self.dates[index],
-                                     self.Y[:, index],
-                                     self.span_time / self.ndays,
-                                     crit=self.screening_crit,
-                                     green=self.green_band,
-                                     swir1=self.swir1_band)
+        end = self.here + self.consecutive
+        mask = multitemp_mask(self.dates[self.start:end],
+                              self.Y[:, self.start:end],
+                              self.span_time / self.ndays,
+                              crit=self.screening_crit,
+                              green=self.green_band,
+                              swir1=self.swir1_band,
+                              design=self._design_cache)
 
         # Check if there are enough observations for model with noise removed
-        _span_index = mask[index][:-self.consecutive].sum()
+        _span_index = mask[:-self.consecutive].sum()
 
         # Return if not enough observations
         if _span_index < self.min_obs:
             logger.debug('    multitemp masking - not enough obs')
             return False
 
-        # There is enough observations in train period to fit - remove noise
-        self._X = self.X[mask, :]
-        self._Y = self.Y[:, mask]
-        self._dates = self.dates[mask]
+        # Time span is checked against the dates before noise removal
+        if (abs(self.dates[self.start + _span_index - 1] -
+                self.dates[self.start]) < self.ndays):
+            logger.debug('    multitemp masking - not enough time')
+            return False
+
+        # There is enough observations in train period to fit - remove noise,
+        # keeping a copy of the training period in case training fails
+        self._train_obs = (self.start, self.X[self.start:, :].copy(),
+                           self.Y[:, self.start:].copy(),
+                           self.dates[self.start:].copy())
+        self._remove_obs(self.start + np.flatnonzero(~mask))
+        self._ols_stats = None
 
         # record our current position
         #   important for next iteration of noise removal
@@ -550,15 +853,88 @@ class CCDCesque(object):
         # Go forward after noise removal
         self.here = self.start + _span_index - 1
 
-        if self.span_time < self.ndays:
-            logger.debug('    multitemp masking - not enough time')
-            self.here = self._here
-            return False
-
         logger.debug('Updated "here"')
 
         return True
 
+# OBSERVATION MANAGEMENT
+    def _fill_front(self, n=None):
+        """ Move observations ahead of noise removed from ``X``, ``Y``, and
+        ``dates``
+
+        Observations removed as noise are not deleted by copying ``X``,
+        ``Y``, and ``dates``, but left as a gap between the observations in
+        front of the gap, which are available from ``X``, ``Y``, and
+        ``dates``, and the observations behind it. Observations are moved in
+        front of the gap as the model moves forward in time so that removing
+        noise only requires moving the observations between the noise and
+        the gap.
+
+        Args:
+            n (int): Number of observations to have available. If None, make
+                available all observations needed to monitor
+                ``consecutive`` observations past ``here``
+        """
+        if n is None:
+            n = self.here + self.consecutive + 1
+        n = min(n, self.n_obs)
+        if n <= self._n_front:
+            return
+
+        gap = self._X_obs.shape[0] - self.n_obs
+        if gap:
+            src = slice(self._n_front + gap, n + gap)
+            dst = slice(self._n_front, n)
+            self._X_obs[dst, :] = self._X_obs[src, :]
+            self._Y_obs[:, dst] = self._Y_obs[:, src]
+            self._dates_obs[dst] = self._dates_obs[src]
+        self._n_front = n
+
+    def _remove_obs(self, index):
+        """ Remove observations from ``X``, ``Y``, and ``dates``
+
+        Only the observations between the first observation removed and the
+        gap left by previously removed observations are moved.
+
+        Args:
+            index (numpy.ndarray): Sorted indices of observations to remove
+        """
+        if not index.size:
+            return
+        self._fill_front(index[-1] + 1)
+
+        start = index[0]
+        keep = np.ones(self._n_front - start, dtype=bool)
+        keep[index - start] = False
+        n = start + keep.sum()
+
+        self._X_obs[start:n, :] = self._X_obs[start:self._n_front, :][keep]
+        self._Y_obs[:, start:n] = self._Y_obs[:, start:self._n_front][:, keep]
+        self._dates_obs[start:n] = self._dates_obs[start:self._n_front][keep]
+
+        self.n_obs -= self._n_front - n
+        self._n_front = n
+        if start < self._doy_end:
+            self._doy_start = None
+
+    def _restore_train_obs(self):
+        """ Restore observations removed when screening the training period
+        """
+        if self._train_obs is None:
+            return
+        start, X, Y, dates = self._train_obs
+        n = start + len(dates)
+
+        self._X_obs[start:n, :] = X
+        self._Y_obs[:, start:n] = Y
+        self._dates_obs[start:n] = dates
+
+        self.n_obs += n - self._n_front
+        self._n_front = n
+        self._train_obs = None
+        self._ols_stats = None
+        self._doy_start = None
+
 # RMSE CALCULATION
     def _get_model_rmse(self):
         """ Return the normal RMSE of each fitted model
@@ -567,7 +943,7 @@ class CCDCesque(object):
           numpy.ndarray: RMSE of each tested model
 
         """
-        return np.array([m.rmse for m in self.models])[self.test_indices]
+        return self.rmse_[self.test_indices]
 
     def _get_dynamic_rmse(self):
         """ Return the dynamic RMSE for each model
@@ -583,24 +959,59 @@ class CCDCesque(object):
 
         """
         # Indices of closest observations based on DOY
-        i_doy = np.argsort(
-            np.mod(self.dates[self.start:self.here] -
-                   self.dates[self.here + self.consecutive],
-                   self.ndays))[:self.min_obs]
-
-        _rmse = np.zeros(len(self.test_indices), np.float32)
-        _X = self.X.take(i_doy, axis=0)
-        for i_b, b in enumerate(self.test_indices):
-            m = self.models[b]
-            _rmse[i_b] = rmse(self.Y[b, :].take(i_doy), m.predict(_X))
+        i_doy = self._get_nearest_doy()
+
+        yhat = (np.dot(self.X.take(i_doy, axis=0),
+                       self.coef_[self.test_indices, :].T) +
+                self.intercept_[self.test_indices])
+        resid = self.Y[self.test_indices, :].take(i_doy, axis=1).T - yhat
+
+        return ((resid ** 2).mean(axis=0) ** 0.5).astype(np.float32)
 
-        return _rmse
+    def _get_nearest_doy(self):
+        """ Return indices of training observations closest in day of year
+
+        Training period observations are kept sorted by their day of year as
+        they are added, so the `self.min_obs` observations in the training
+        period with the smallest day of year difference (modulo
+        `self.ndays`) after the observation `self.consecutive` steps into
+        the future can be found by binary search.
+
+        Returns:
+          numpy.ndarray: indices of closest observations relative to
+            `self.start`, ordered by difference in day of year
+
+        """
+        if self._doy_start != self.start or self._doy_end > self.here:
+            self._doy_keys, self._doy_index = [], []
+            self._doy_start = self._doy_end = self.start
+
+        for i in range(self._doy_end, self.here):
+            key = self.dates[i] % self.ndays
+            j = bisect.bisect_right(self._doy_keys, key)
+            self._doy_keys.insert(j, key)
+            self._doy_index.insert(j, i - self.start)
+        self._doy_end = self.here
+
+        n = len(self._doy_index)
+        k = min(self.min_obs, n)
+        j = bisect.bisect_left(
+            self._doy_keys,
+            self.dates[self.here + self.consecutive] % self.ndays)
+        i_doy = self._doy_index[j:j + k]
+        if j + k > n:
+            i_doy = i_doy + self._doy_index[:j + k - n]
+
+        return np.array(i_doy, dtype=np.intp)
 
 # From (former) parent
     def fit_models(self, X, Y, bands=None):
         """ Fit timeseries models for `bands` within `Y` for a given `X`
 
-        Updates or initializes fit for ``self.models``
+        Updates or initializes fit for ``self.models``. Estimators listed in
+        :data:`MULTIOUTPUT_ESTIMATORS` fit all ``bands`` in one call using
+        ``Y`` as a multiple output (matrix) right hand side, so ``X`` is
+        only validated and factorized once.
 
         Args:
             X (numpy.ndarray): design matrix (number of observations x number
@@ -614,18 +1025,53 @@ class CCDCesque(object):
         if bands is None:
             bands = np.arange(self.n_series)
 
+        if self.multioutput:
+            self._fit_models_multioutput(X, Y, bands)
+            return
+
         for b in bands:
             y = Y[b, :]
 
             model = self.models[b]
             model.fit(X, y, **self.estimator_fit)
 
-            # Add in RMSE calculation
-            model.rmse = rmse(y, model.predict(X))
+            self._set_models([b], model.coef_, model.intercept_,
+                             rmse(y, model.predict(X)))
 
-            # Add intercept to intercept term of design matrix
-            model.coef = model.coef_.copy()
-            model.coef[0] += model.intercept_
+    def _fit_models_multioutput(self, X, Y, bands):
+        """ Fit timeseries models for all `bands` within `Y` at once
+        """
+        y = Y.take(bands, axis=0).T
+        self.estimator.fit(X, y, **self.estimator_fit)
+
+        coef = np.atleast_2d(self.estimator.coef_)
+        intercept = np.broadcast_to(self.estimator.intercept_, len(bands))
+        _rmse = (((y - self.estimator.predict(X).reshape(y.shape)) ** 2)
+                 .mean(axis=0) ** 0.5)
+
+        self._set_models(bands, coef, intercept, _rmse)
+
+    def _fit_models_incremental(self):
+        """ Fit OLS timeseries models for all bands from running statistics
+
+        The normal equations for ``X[start:here + 1]`` are updated with the
+        observations added since the last fit, unless the time series
+        segment has changed, so that retraining costs :math:`O(p^2)` per new
+        observation.
+        """
+        end = self.here + 1
+        if (self._ols_stats is None or self._ols_start != self.start or
+                self._ols_end > end):
+            self._ols_stats = OLSStatistics(self.n_features, self.n_series)
+            self._ols_start = self._ols_end = self.start
+
+        self._ols_stats.update(self.X[self._ols_end:end, :],
+                               self.Y[:, self._ols_end:end])
+        self._ols_end = end
+
+        coef, intercept, _rmse = self._ols_stats.solve(
+            fit_intercept=self.estimator.fit_intercept)
+        self._set_models(np.arange(self.n_series), coef, intercept, _rmse)
 
     def __iter__(self):
         """ Iterate over the timeseries segment records
@@ -0,0 +1,626 @@
+""" Batched, multi-pixel implementation of the CCDCesque algorithm
+
+All pixels within a block of data share a design matrix and a set of dates,
+but each pixel may have a different set of valid observations. Instead of
+walking the :class:`yatsm.algorithms.ccdc.CCDCesque` state machine one pixel
+at a time, :class:`CCDCesqueBlock` stores the position (``start`` and
+``here``) and the state of every pixel in arrays and advances all of the
+pixels together. At each step, the regressions and monitoring period scores
+of every pixel that needs them are calculated at once using vectorized NumPy
+operations.
+
+Observations for each pixel are tracked as rows of indices into the time
+dimension of the block, so masking clouds or noise from a pixel never
+requires copying the data.
+"""
+from __future__ import division
+
+import logging
+import sys
+
+import numpy as np
+
+from ..masking import (MultitempDesignCache, multitemp_mask_block,
+                       smooth_mask)
+from .ccdc import record_dtype
+
+logger = logging.getLogger('yatsm.algo')
+
+# Pixel states, following the loops of ``CCDCesque.fit``
+_OUTER, _TRAIN, _UPDATE, _MONITOR, _DONE = range(5)
+
+
+def _compact(obs, keep):
+    """ Shift observation indices marked ``keep`` to the front of each row
+
+    Args:
+        obs (np.ndarray): 2D (n_pixel x n_obs) observation indices
+        keep (np.ndarray): 2D (n_pixel x n_obs) boolean mask of observations
+            to retain
+
+    Returns:
+        tuple (np.ndarray, np.ndarray): Compacted observation indices and the
+        number of retained observations for each row
+    """
+    order = np.argsort(~keep, axis=1, kind='mergesort')
+    return np.take_along_axis(obs, order, 1), keep.sum(axis=1)
+
+
+def _chunks(index, size):
+    """ Yield successive chunks of ``index`` no longer than ``size``
+    """
+    for i in range(0, index.size, size):
+        yield index[i:i + size]
+
+
+class CCDCesqueBlock(object):
+    """ Run a CCDC-like model for all pixels within a block of data at once
+
+    The hyperparameters match those of
+    :class:`yatsm.algorithms.ccdc.CCDCesque`, but time series models are
+    always estimated using ordinary least squares so that the regressions of
+    many pixels may be solved together. For a given pixel, the records
+    produced are those of
+    :class:`~yatsm.algorithms.ccdc.CCDCesque` when run with an estimator of
+    ``sklearn.linear_model.LinearRegression(fit_intercept=False)``.
+
+    When Numba is installed, :class:`~yatsm.algorithms.ccdc.CCDCesque` fits
+    each pixel in compiled code, and fitting a block of pixels one at a time
+    with it is about as fast as using this class.
+
+    Args:
+        test_indices (numpy.ndarray): Test for changes with these
+            indices of ``Y``. If not provided, all series in ``Y`` will be used
+            as test indices
+        consecutive (int): Consecutive observations to trigger change
+        threshold (float): Test statistic threshold for change
+        min_obs (int): Minimum observations in model
+        min_rmse (float): Minimum RMSE for models during testing
+        retrain_time (float): Number of days between model fit updates during
+            monitoring period
+        screening (str): Style of prescreening of the timeseries for noise.
+            Options are 'RLM' or 'LOWESS' (default: RLM)
+        screening_crit (float): critical value for multitemporal
+            noise screening (default: 400.0)
+        remove_noise (bool): Remove observation if change is not
+            detected but first observation is above threshold (if it looks like
+            noise) (default: True)
+        green_band (int): Index of green band in ``Y`` for
+            multitemporal masking (default: 1)
+        swir1_band (int): Index of first SWIR band in ``Y`` for
+            multitemporal masking (default: 4)
+        dynamic_rmse (bool): Vary RMSE as a function of day of year
+            (default: False)
+        slope_test (float or bool): Use an additional slope test to
+            assess the suitability of the training period. A value of True
+            enables the test and uses the `threshold` parameter as the test
+            criterion. False turns off the test or a float value enables the
+            test but overrides the test criterion threshold. (default: False)
+        idx_slope (int): if ``slope_test`` is enabled, provide index of ``X``
+            containing slope term (default: 1)
+        batch_size (int): Maximum number of pixels to solve regressions for
+            at once. Limits memory used for each batch to roughly
+            ``batch_size * n_obs * n_features`` values (default: 1024)
+        dtype (numpy.dtype): Datatype of ``Y`` while fitting. Use ``float32``
+            to halve the memory used by the time series of all pixels. The
+            design matrix and regressions remain in double precision
+            (default: ``float64``)
+
+    Attributes:
+        record (np.ndarray): Records of all pixels, ordered by pixel and then
+            by time
+        record_pixel (np.ndarray): Index of the pixel (along the first
+            dimension of ``Y``) for each entry in ``record``
+        failed (np.ndarray): True for pixels with too few observations to
+            run
+
+    """
+
+    __version__ = '1.0.0'
+    __name = 'yatsm-ccdcesque-block'
+    __algorithm__ = ':'.join([__name, __version__])
+
+    ndays = 365.25
+
+    def __init__(self,
+                 test_indices=None,
+                 consecutive=5, threshold=2.56, min_obs=None, min_rmse=None,
+                 retrain_time=365.25, screening='RLM', screening_crit=400.0,
+                 remove_noise=True, green_band=1, swir1_band=4,
+                 dynamic_rmse=False, slope_test=False, idx_slope=1,
+                 batch_size=1024, dtype=np.float64, **kwargs):
+        if 'estimator' in kwargs:
+            logger.warning('CCDCesqueBlock always estimates time series '
+                           'models using OLS and ignores "estimator"')
+        self.test_indices = np.asarray(test_indices)
+
+        self.consecutive = consecutive
+        self.threshold = threshold
+        self.min_obs = min_obs or 16
+        self.min_rmse = min_rmse
+        self.retrain_time = retrain_time
+
+        if screening == 'RLM':
+            self.screen_timeseries = self._screen_timeseries_RLM
+        elif screening == 'LOWESS':
+            self.screen_timeseries = self._screen_timeseries_LOWESS
+        else:
+            raise TypeError('Unknown screening type %s' % screening)
+
+        self.screening_crit = screening_crit
+        self.remove_noise = remove_noise
+        self.green_band = green_band
+        self.swir1_band = swir1_band
+        self.slope_test = slope_test
+        if self.slope_test is True:
+            self.slope_test = threshold
+        self.idx_slope = idx_slope
+        self.dynamic_rmse = dynamic_rmse
+        self.batch_size = batch_size
+        self.dtype = np.dtype(dtype)
+
+        self.record = np.zeros(0, dtype=self.record_dtype)
+        self.record_pixel = np.zeros(0, dtype=np.intp)
+
+    @property
+    def record_dtype(self):
+        """ np.dtype: NumPy structured array datatype of a record
+
+        Matches the dtype of :attr:`CCDCesque.record_template`
+        """
+        return record_dtype(getattr(self, 'n_features', 0),
+                            getattr(self, 'n_series', 0))
+
+    @property
+    def records(self):
+        """ list[np.ndarray]: Records of each pixel
+        """
+        counts = np.bincount(self.record_pixel, minlength=self.n_pixel)
+        return np.split(self.record, np.cumsum(counts)[:-1])
+
+# HELPERS
+    def _date(self, pix, i):
+        """ Return the date of observation ``i`` for pixels ``pix``
+        """
+        i = np.minimum(i, self.obs.shape[1] - 1)
+        return self.dates[self.obs[pix, i]]
+
+    def _can_monitor(self, pix):
+        return self.here[pix] < self.nobs[pix] - self.consecutive - 1
+
+# MAIN LOOP
+    def fit(self, X, Y, dates, px=None, py=None):
+        """ Fit timeseries models for all pixels in a block
+
+        Args:
+            X (numpy.ndarray): design matrix (number of observations x number
+                of features)
+            Y (numpy.ndarray): independent variable array (number of pixels x
+                number of series x number of observations). Observations
+                containing NaN in any series are excluded for that pixel
+            dates (numpy.ndarray): ordinal dates for each observation in X/Y
+            px (numpy.ndarray): X coordinate of each pixel, stored in the
+                ``px`` field of ``record`` (optional)
+            py (numpy.ndarray): Y coordinate of each pixel, stored in the
+                ``py`` field of ``record`` (optional)
+
+        Returns:
+            CCDCesqueBlock: Returns ``self``
+        """
+        if Y.ndim != 3:
+            raise ValueError('Y must be 3D (pixels x series x observations)')
+        if len(dates) != X.shape[0] or len(dates) != Y.shape[2]:
+            raise ValueError('X/Y/dates must have same number of observations')
+
+        self.X = np.asarray(X, dtype=np.float64)
+        self.Y = np.asarray(Y, dtype=self.dtype)
+        self.dates = np.asarray(dates)
+        # All pixels share the harmonics for multitemporal screening
+        self._design_cache = MultitempDesignCache(self.dates)
+        self.n_pixel, self.n_series, _ = self.Y.shape
+        self.n_features = self.X.shape[1]
+        self.px = (np.zeros(self.n_pixel) if px is None else
+                   np.asarray(px).ravel())
+        self.py = (np.zeros(self.n_pixel) if py is None else
+                   np.asarray(py).ravel())
+
+        if not np.any(np.asarray(self.test_indices)):
+            self.test_indices = np.arange(self.n_series)
+        if isinstance(self.min_rmse, (list, np.ndarray)):
+            self.min_rmse = np.asarray(self.min_rmse)
+        elif isinstance(self.min_rmse, (int, float)):
+            self.min_rmse = np.array([self.min_rmse] * self.n_series)
+        else:
+            self.min_rmse = np.array([sys.float_info.min] * self.n_series)
+
+        self.reset()
+
+        while np.any(self.state != _DONE):
+            self._step_outer(np.flatnonzero(self.state == _OUTER))
+            self._step_train(np.flatnonzero(self.state == _TRAIN))
+            self._step_update(np.flatnonzero(self.state == _UPDATE))
+            self._step_monitor(np.flatnonzero(self.state == _MONITOR))
+
+        if self._records:
+            record = np.concatenate(self._records)
+            pixel = np.concatenate(self._record_pixels)
+            # Pixels that failed would have raised in ``CCDCesque``
+            keep = ~self.failed[pixel]
+            record, pixel = record[keep], pixel[keep]
+            order = np.argsort(pixel, kind='mergesort')
+            self.record, self.record_pixel = record[order], pixel[order]
+        else:
+            self.record = np.zeros(0, dtype=self.record_dtype)
+            self.record_pixel = np.zeros(0, dtype=np.intp)
+
+        return self
+
+    def reset(self):
+        """ Reset state information for all pixels
+        """
+        n_pixel, n_obs = self.n_pixel, self.X.shape[0]
+        valid = np.all(np.isfinite(self.Y), axis=1)
+        idx = np.broadcast_to(np.arange(n_obs), (n_pixel, n_obs))
+        self.obs, self.nobs = _compact(idx, valid)
+        self._obs, self._nobs = self.obs.copy(), self.nobs.copy()
+
+        self.start = np.zeros(n_pixel, dtype=np.intp)
+        self.here = np.full(n_pixel, self.min_obs, dtype=np.intp)
+        self._here = self.here.copy()
+        self.trained_date = np.zeros(n_pixel)
+        self.monitoring = np.zeros(n_pixel, dtype=bool)
+        self.screened = np.zeros(n_pixel, dtype=bool)
+
+        self.coef = np.zeros((n_pixel, self.n_features, self.n_series))
+        self.rmse = np.zeros((n_pixel, self.n_series))
+
+        self.state = np.full(n_pixel, _OUTER, dtype=np.uint8)
+        self.failed = self.nobs < self.here + self.consecutive
+        self.state[self.failed] = _DONE
+        if self.failed.any():
+            logger.debug('Not enough observations for %i pixels' %
+                         self.failed.sum())
+
+        self._records, self._record_pixels = [], []
+
+    def _step_outer(self, pix):
+        """ Begin training, or finish pixels that can no longer run
+        """
+        running = self.here[pix] < self.nobs[pix]
+        self.state[pix[running]] = _TRAIN
+
+        done = pix[~running]
+        self.state[done] = _DONE
+
+        # Update record for last model, which is only kept if monitoring
+        done = done[self.monitoring[done]]
+        if done.size:
+            # Re-adjust end for consecutive, and for two ``here += 1`` steps
+            end = self.here[done] - self.consecutive - 2
+            self._emit(done, self._date(done, self.start[done]),
+                       self._date(done, end), 0,
+                       np.zeros((done.size, self.test_indices.size)))
+
+    def _step_train(self, pix):
+        can_train = ~self.monitoring[pix] & self._can_monitor(pix)
+        self.state[pix[~can_train]] = _UPDATE
+
+        pix = pix[can_train]
+        self.train(pix)
+        self.here[pix] += 1
+
+    def _step_update(self, pix):
+        # Ensure all bands are fit in case we can't monitor
+        enough = (self.here[pix] - self.start[pix]) > self.n_features
+        self._update_model(pix[enough])
+        self.state[pix] = _MONITOR
+
+    def _step_monitor(self, pix):
+        can_monitor = self.monitoring[pix] & self._can_monitor(pix)
+
+        stop = pix[~can_monitor]
+        self.here[stop] += 1
+        self.state[stop] = _OUTER
+
+        pix = pix[can_monitor]
+        self._update_model(pix)
+        self.monitor(pix)
+        self.here[pix] += 1
+
+    def train(self, pix):
+        """ Train time series models for pixels if stability criteria are met
+
+        See :meth:`yatsm.algorithms.ccdc.CCDCesque.train`
+
+        Args:
+            pix (np.ndarray): Indices of pixels to train
+        """
+        span_time = np.abs(self._date(pix, self.here[pix]) -
+                           self._date(pix, self.start[pix]))
+        span_index = self.here[pix] - self.start[pix]
+        pix = pix[(span_time > self.ndays) & (span_index >= self.n_features)]
+        if not pix.size:
+            return
+
+        pix = pix[self.screen_timeseries(pix)]
+
+        # Test if we can still run after noise removal
+        short = self.here[pix] >= self._nobs[pix]
+        if short.any():
+            logger.debug('Not enough observations to proceed after noise '
+                         'removal for %i pixels' % short.sum())
+            self.failed[pix[short]] = True
+            self.state[pix[short]] = _DONE
+            pix = pix[~short]
+        if not pix.size:
+            return
+
+        # After noise removal, try to fit models
+        self.fit_models(pix, self._obs, self.start[pix], self.here[pix] + 1,
+                        bands=self.test_indices)
+
+        # Ensure first and last points aren't unusual
+        _rmse = np.maximum(self.min_rmse[self.test_indices],
+                           self.rmse[pix][:, self.test_indices])
+        coef = self.coef[pix][:, :, self.test_indices]
+        resid = []
+        for i in (self.start[pix], self.here[pix]):
+            t = self._obs[pix, i]
+            yhat = np.einsum('pf,pfb->pb', self.X[t], coef)
+            y = self.Y[pix[:, None], self.test_indices, t[:, None]]
+            resid.append(np.linalg.norm(np.abs(y - yhat) / _rmse, axis=1))
+        test_slope = np.linalg.norm(
+            np.abs(coef[:, self.idx_slope, :] *
+                   (self.here[pix] - self.start[pix])[:, None]) / _rmse,
+            axis=1)
+
+        unstable = (resid[0] > self.threshold) | (resid[1] > self.threshold)
+        if self.slope_test:
+            unstable |= test_slope > self.threshold
+
+        bad, good = pix[unstable], pix[~unstable]
+        self.start[bad] += 1
+        self.here[bad] = self._here[bad]
+
+        self.obs[good] = self._obs[good]
+        self.nobs[good] = self._nobs[good]
+        self.monitoring[good] = True
+
+    def monitor(self, pix):
+        """ Monitor for changes in time series of pixels
+
+        See :meth:`yatsm.algorithms.ccdc.CCDCesque.monitor`
+
+        Args:
+            pix (np.ndarray): Indices of pixels to monitor
+        """
+        if not pix.size:
+            return
+        test = self.test_indices
+        if self.dynamic_rmse:
+            _rmse = self._get_dynamic_rmse(pix)
+        else:
+            _rmse = self._get_model_rmse(pix)
+        _rmse = np.maximum(self.min_rmse[test], _rmse)
+
+        i = self.here[pix][:, None] + np.arange(self.consecutive)
+        t = np.take_along_axis(self.obs[pix], i, 1)
+        yhat = np.einsum('pcf,pfb->pbc', self.X[t],
+                         self.coef[pix][:, :, test])
+        y = self.Y[pix[:, None, None], test[None, :, None], t[:, None, :]]
+        scores = (y - yhat) / _rmse[:, :, None]
+
+        # Check for scores above critical value
+        mag = np.linalg.norm(scores, axis=1)
+        change = np.all(mag > self.threshold, axis=1)
+
+        brk = pix[change]
+        if brk.size:
+            self._emit(brk,
+                       self._date(brk, self.start[brk]),
+                       self._date(brk, self.here[brk]),
+                       self._date(brk, self.here[brk] + 1),
+                       scores[change].mean(axis=2))
+            self.start[brk] = self.here[brk] + 1
+            self.trained_date[brk] = 0
+            self.monitoring[brk] = False
+
+        if self.remove_noise:
+            noise = pix[~change & (mag[:, 0] > self.threshold)]
+            if noise.size:
+                i = np.arange(self.obs.shape[1])
+                keep = ((i != self.here[noise][:, None]) &
+                        (i < self.nobs[noise][:, None]))
+                self.obs[noise], self.nobs[noise] = _compact(
+                    self.obs[noise], keep)
+                self.here[noise] -= 1
+
+    def _emit(self, pix, start, end, brk, magnitude):
+        """ Store records for pixels from current model estimates
+        """
+        rec = np.zeros(pix.size, dtype=self.record_dtype)
+        rec['start'] = start
+        rec['end'] = end
+        rec['break'] = brk
+        rec['coef'] = self.coef[pix]
+        rec['rmse'] = self.rmse[pix]
+        rec['magnitude'][:, self.test_indices] = magnitude
+        rec['px'] = self.px[pix]
+        rec['py'] = self.py[pix]
+
+        self._records.append(rec)
+        self._record_pixels.append(pix)
+
+# MODEL FITTING UTILITIES
+    def _update_model(self, pix):
+        # Only train if enough time has past
+        date = self._date(pix, self.here[pix])
+        retrain = np.abs(date - self.trained_date[pix]) > self.retrain_time
+        pix = pix[retrain]
+        if not pix.size:
+            return
+        self.fit_models(pix, self.obs, self.start[pix], self.here[pix] + 1)
+        self.trained_date[pix] = date[retrain]
+
+    def fit_models(self, pix, obs, start, end, bands=None):
+        """ Fit OLS models for `bands` of pixels ``pix`` in one batch
+
+        Updates ``coef`` and ``rmse`` for each pixel and band fit.
+
+        Args:
+            pix (np.ndarray): Indices of pixels to fit
+            obs (np.ndarray): Observation indices for all pixels (i.e.,
+                ``self.obs`` or ``self._obs``)
+            start (np.ndarray): Index of first observation to fit for each
+                pixel in ``pix``
+            end (np.ndarray): Index after last observation to fit for each
+                pixel in ``pix``
+            bands (iterable): Subset of bands of `Y` to fit. If None are
+                provided, fit all bands in Y
+
+        """
+        if bands is None:
+            bands = np.arange(self.n_series)
+        bands = np.asarray(bands)
+        n_obs = obs.shape[1]
+
+        for i in _chunks(np.arange(pix.size), self.batch_size):
+            _pix, _start, n = pix[i], start[i], end[i] - start[i]
+            rows = np.arange(n.max())
+            valid = rows < n[:, None]
+            t = np.take_along_axis(
+                obs[_pix], np.minimum(_start[:, None] + rows, n_obs - 1), 1)
+
+            X = np.where(valid[..., None], self.X[t], 0)
+            Y = np.where(valid[..., None],
+                         self.Y[_pix[:, None, None], bands, t[..., None]], 0)
+
+            XT = X.transpose(0, 2, 1)
+            try:
+                beta = np.linalg.solve(np.matmul(XT, X), np.matmul(XT, Y))
+            except np.linalg.LinAlgError:
+                beta = np.matmul(np.linalg.pinv(X), Y)
+            resid = Y - np.matmul(X, beta)
+
+            self.coef[_pix[:, None], :, bands] = beta.transpose(0, 2, 1)
+            self.rmse[_pix[:, None], bands] = np.sqrt(
+                (resid ** 2).sum(axis=1) / n[:, None])
+
+# MULTITEMP SCREENING
+    def _screen_timeseries_LOWESS(self, pix, span=None):
+        """ Screen entire dataset for noise before training using LOWESS
+
+        Args:
+            pix (np.ndarray): Indices of pixels to screen
+            span (int): span for LOWESS
+
+        Returns:
+            np.ndarray: True if timeseries is screened and we can train,
+            else False
+
+        """
+        span = span or self.consecutive * 2 + 1
+        keep = np.ones(self.obs.shape, dtype=bool)
+        todo = pix[~self.screened[pix]]
+        for p in todo:
+            t = self.obs[p, :self.nobs[p]]
+            keep[p, :t.size] = smooth_mask(self.dates[t], self.Y[p][:, t],
+                                           span,
+                                           crit=self.screening_crit,
+                                           green=self.green_band,
+                                           swir1=self.swir1_band)
+            keep[p, t.size:] = False
+
+        self.obs[todo], self.nobs[todo] = _compact(self.obs[todo], keep[todo])
+        self._obs[pix], self._nobs[pix] = self.obs[pix], self.nobs[pix]
+        self._here[pix] = self.here[pix]
+        self.screened[todo] = True
+
+        return np.ones(pix.size, dtype=bool)
+
+    def _screen_timeseries_RLM(self, pix):
+        """ Screen training period of pixels for noise with IRWLS RLM
+
+        Args:
+            pix (np.ndarray): Indices of pixels to screen
+
+        Returns:
+            np.ndarray: True if timeseries is screened and we can train,
+            else False
+
+        """
+        start, here = self.start[pix], self.here[pix]
+        span_time = np.abs(self._date(pix, here) - self._date(pix, start))
+
+        # Multitemporal noise removal of all pixels' training periods
+        n = here - start + self.consecutive
+        rows = np.arange(n.max())
+        index = np.minimum(start[:, None] + rows, self.obs.shape[1] - 1)
+        mask = np.zeros(index.shape, dtype=bool)
+        bands = np.array([self.green_band, self.swir1_band])
+        for i in _chunks(np.arange(pix.size), self.batch_size):
+            t = np.take_along_axis(self.obs[pix[i]], index[i], 1)
+            mask[i] = multitemp_mask_block(
+                self._design_cache, t,
+                self.Y[pix[i][:, None, None], bands[:, None], t[:, None, :]],
+                n[i], span_time[i] / self.ndays,
+                crit=self.screening_crit, green=0, swir1=1)
+
+        keep = np.arange(self.obs.shape[1]) < self.nobs[pix][:, None]
+        i, j = np.nonzero(rows < n[:, None])
+        keep[i, index[i, j]] = mask[i, j]
+        _span_index = (mask & (rows < (here - start)[:, None])).sum(axis=1)
+
+        # Check if there are enough observations for model with noise removed
+        ok = _span_index >= self.min_obs
+        pix, keep, _span_index = pix[ok], keep[ok], _span_index[ok]
+
+        # There is enough observations in train period to fit - remove noise
+        self._obs[pix], self._nobs[pix] = _compact(self.obs[pix], keep)
+
+        # Record our current position and go forward after noise removal
+        self._here[pix] = self.here[pix]
+        self.here[pix] = self.start[pix] + _span_index - 1
+
+        span_time = np.abs(self._date(pix, self.here[pix]) -
+                           self._date(pix, self.start[pix]))
+        short = span_time < self.ndays
+        self.here[pix[short]] = self._here[pix[short]]
+        ok[ok] = ~short
+
+        return ok
+
+# RMSE CALCULATION
+    def _get_model_rmse(self, pix):
+        """ Return the normal RMSE of each fitted model of pixels ``pix``
+        """
+        return self.rmse[pix][:, self.test_indices]
+
+    def _get_dynamic_rmse(self, pix):
+        """ Return the dynamic RMSE for each model of pixels ``pix``
+
+        See :meth:`yatsm.algorithms.ccdc.CCDCesque._get_dynamic_rmse`
+        """
+        start, here = self.start[pix], self.here[pix]
+        n = here - start
+        rows = np.arange(n.max())
+        valid = rows < n[:, None]
+        d = self._date(pix[:, None], start[:, None] + rows)
+        d = np.mod(d - self._date(pix, here + self.consecutive)[:, None],
+                   self.ndays)
+
+        # Indices of closest observations based on DOY. As in ``CCDCesque``,
+        # these index from the beginning of the time series
+        i_doy = np.argsort(np.where(valid, d, np.inf),
+                           axis=1)[:, :self.min_obs]
+        valid = (np.arange(i_doy.shape[1]) <
+                 np.minimum(n, self.min_obs)[:, None])
+        t = np.take_along_axis(self.obs[pix], i_doy, 1)
+
+        test = self.test_indices
+        yhat = np.einsum('pif,pfb->pbi', self.X[t], self.coef[pix][:, :, test])
+        y = self.Y[pix[:, None, None], test[None, :, None], t[:, None, :]]
+        resid = np.where(valid[:, None, :], y - yhat, 0)
+
+        return np.sqrt((resid ** 2).sum(axis=2) /
+                       valid.sum(axis=1)[:, None]).astype(np.float32)
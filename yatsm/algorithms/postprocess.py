@@ -3,27 +3,33 @@
 Includes comission and omission tests and robust linear model result
 calculations
 """
+from collections import defaultdict
 import logging
 
 import numpy as np
 import numpy.lib.recfunctions as nprf
 import scipy.stats
-import statsmodels.api as sm
 
-from ..regression.diagnostics import rmse
+from .ccdc import MULTIOUTPUT_ESTIMATORS
+from ..regression.ols import OLSStatistics, ols_solve
+from ..regression.robust_fit import RLM, mad, rlm_batch
+from ..structural_break import cusum_OLS_stack
 
 logger = logging.getLogger('yatsm')
 
 
-def date2index(dates, d):
+def date2index(dates, d, side='right'):
     """ Returns index of sorted array `dates` containing the date `d`
     Args:
       dates (np.ndarray): array of dates (or numbers really) in sorted order
       d (int, float): number to search for
+      side (str): 'left' to return the index of `d` (e.g., to start a slice
+        with `d`) or 'right' to return the index after `d` (e.g., to end a
+        slice with `d`)
     Returns:
       int: index of `dates` containing value `d`
     """
-    return np.searchsorted(dates, d, side='right')
+    return np.searchsorted(dates, d, side=side)
 
 
 # POST-PROCESSING
@@ -52,6 +58,14 @@ def commission_test(yatsm, alpha=0.10):
     the unrestricted versus restricted models is the mean RSS
     values from all ``model.test_indices``.
 
+    The sufficient statistics (:math:`X'X`, :math:`X'Y`, and :math:`Y'Y`) of
+    each segment are calculated once, and the statistics of the restricted
+    model are the sum of the statistics of the segments it spans. The RSS of
+    all test indices are solved together from these statistics. Merged
+    models are also estimated from these statistics if the model's
+    estimator is OLS (i.e., ``yatsm.incremental``), or are otherwise refit
+    using ``yatsm.fit_models``.
+
     Args:
         yatsm (YATSM model): fitted YATSM model to check for commission errors
         alpha (float): significance level for F-statistic (default: 0.10)
@@ -65,11 +79,21 @@ def commission_test(yatsm, alpha=0.10):
         return yatsm.record
 
     k = yatsm.record[0]['coef'].shape[0]
+    incremental = getattr(yatsm, 'incremental', False)
+
+    # Sufficient statistics of observations by (start, end) index
+    _stats = {}
 
-    # Allocate memory outside of loop
-    m_1_rss = np.zeros(yatsm.test_indices.size)
-    m_2_rss = np.zeros(yatsm.test_indices.size)
-    m_r_rss = np.zeros(yatsm.test_indices.size)
+    def segment_stats(start, end):
+        if (start, end) not in _stats:
+            _stats[(start, end)] = OLSStatistics.from_data(
+                yatsm.X[start:end, :], yatsm.Y[:, start:end])
+        return _stats[(start, end)]
+
+    def segment_rss(stats):
+        _rmse = ols_solve(stats.XTX, stats.XTY[:, yatsm.test_indices],
+                          stats.YTY[yatsm.test_indices], stats.n)[2]
+        return _rmse ** 2 * stats.n
 
     models = []
     merged = False
@@ -81,9 +105,9 @@ def commission_test(yatsm, alpha=0.10):
         m_2 = yatsm.record[i + 1]
 
         # Unrestricted model starts/ends
-        m_1_start = date2index(yatsm.dates, m_1['start'])
+        m_1_start = date2index(yatsm.dates, m_1['start'], side='left')
         m_1_end = date2index(yatsm.dates, m_1['end'])
-        m_2_start = date2index(yatsm.dates, m_2['start'])
+        m_2_start = date2index(yatsm.dates, m_2['start'], side='left')
         m_2_end = date2index(yatsm.dates, m_2['end'])
         # Restricted start/end
         m_r_start = m_1_start
@@ -101,13 +125,18 @@ def commission_test(yatsm, alpha=0.10):
         n = m_r_end - m_r_start
         F_crit = scipy.stats.f.ppf(1 - alpha, k, n - 2 * k)
 
-        for i_b, b in enumerate(yatsm.test_indices):
-            m_1_rss[i_b] = np.linalg.lstsq(yatsm.X[m_1_start:m_1_end, :],
-                                           yatsm.Y[b, m_1_start:m_1_end])[1]
-            m_2_rss[i_b] = np.linalg.lstsq(yatsm.X[m_2_start:m_2_end, :],
-                                           yatsm.Y[b, m_2_start:m_2_end])[1]
-            m_r_rss[i_b] = np.linalg.lstsq(yatsm.X[m_r_start:m_r_end, :],
-                                           yatsm.Y[b, m_r_start:m_r_end])[1]
+        # Restricted model also includes observations between segments
+        m_1_stats = segment_stats(m_1_start, m_1_end)
+        m_2_stats = segment_stats(m_2_start, m_2_end)
+        if (m_r_start, m_r_end) not in _stats:
+            _stats[(m_r_start, m_r_end)] = (
+                m_1_stats + segment_stats(m_1_end, max(m_1_end, m_2_start)) +
+                m_2_stats)
+        m_r_stats = _stats[(m_r_start, m_r_end)]
+
+        m_1_rss = segment_rss(m_1_stats)
+        m_2_rss = segment_rss(m_2_stats)
+        m_r_rss = segment_rss(m_r_stats)
 
         # Collapse RSS across all test indices for F statistic
         F = (
@@ -134,8 +163,14 @@ def commission_test(yatsm, alpha=0.10):
             m_new['break'] = m_2['break']
 
             # Re-fit models and copy over attributes
-            yatsm.fit_models(yatsm.X[m_r_start:m_r_end, :],
-                             yatsm.Y[:, m_r_start:m_r_end])
+            if incremental:
+                coef, intercept, _rmse = m_r_stats.solve(
+                    fit_intercept=yatsm.estimator.fit_intercept)
+                yatsm._set_models(np.arange(yatsm.n_series), coef,
+                                  intercept, _rmse)
+            else:
+                yatsm.fit_models(yatsm.X[m_r_start:m_r_end, :],
+                                 yatsm.Y[:, m_r_start:m_r_end])
             for i_m, _m in enumerate(yatsm.models):
                 m_new['coef'][:, i_m] = _m.coef
                 m_new['rmse'][i_m] = _m.rmse
@@ -151,13 +186,51 @@ def commission_test(yatsm, alpha=0.10):
     return np.array(models)
 
 
+def _omission_pvalue(record, X, Y, dates, indices):
+    """ Return OLS-CUSUM p-values of each record (n_record x n_indices)
+
+    Records without a fit, or too few observations to test, have a p-value
+    of 1.
+    """
+    pvalue = np.ones((record.size, len(indices)))
+    Y = Y.take(indices, axis=0)
+
+    for i, r in enumerate(record):
+        # Skip if no model fit
+        if r['start'] == 0 or r['end'] == 0:
+            continue
+        # Find matching X and Y in data
+        index = np.where(
+            (dates >= min(r['start'], r['end'])) &
+            (dates <= max(r['end'], r['start'])))[0]
+        if index.size <= X.shape[1]:
+            continue
+
+        # CUSUM test on OLS residuals of all test indices at once
+        pvalue[i, :] = cusum_OLS_stack(X.take(index, axis=0),
+                                       Y.take(index, axis=1)).pvalue
+
+    return pvalue
+
+
+def _omission_collapse(omission, behavior):
+    """ Collapse band answers according to `behavior`
+    """
+    if behavior.lower() == 'any':
+        return np.any(omission, 1)
+    else:
+        return np.all(omission, 1)
+
+
 def omission_test(model, crit=0.05, behavior='ANY', indices=None):
     """ Add omitted breakpoint into records based on residual stationarity
 
     Uses recursive residuals within a CUMSUM test to check if each model
     has omitted a "structural change" (e.g., land cover change). Returns
     an array of True or False for each timeseries segment record depending
-    on result from `statsmodels.stats.diagnostic.breaks_cusumolsresid`.
+    on the p-value of an OLS-CUSUM test
+    (:func:`yatsm.structural_break.cusum_OLS_stack`) of the residuals of
+    all test indices.
 
     Args:
         crit (float, optional): Critical p-value for rejection of null
@@ -177,47 +250,241 @@ def omission_test(model, crit=0.05, behavior='ANY', indices=None):
     if behavior.lower() not in ['any', 'all']:
         raise ValueError('`behavior` must be "any" or "all"')
 
-    if not indices:
+    if indices is None:
         indices = model.test_indices
 
     if not np.all(np.in1d(indices, model.test_indices)):
         raise ValueError('`indices` must be a subset of '
                          '`model.test_indices`')
 
-    if not model.ran:
+    if getattr(model, 'record', None) is None or not len(model.record):
         return np.empty(0, dtype=bool)
 
-    omission = np.zeros((model.record.size, len(indices)), dtype=bool)
+    pvalue = _omission_pvalue(model.record, model.X, model.Y, model.dates,
+                              indices)
+    return _omission_collapse(pvalue < crit, behavior)
 
-    for i, r in enumerate(model.record):
-        # Skip if no model fit
-        if r['start'] == 0 or r['end'] == 0:
-            continue
+
+def _iter_record_pixels(record, Y, py, px):
+    """ Yield the records and observations of each pixel in a block
+
+    Args:
+        record (np.ndarray): Records of pixels in the block
+        Y (np.ndarray): 3D (n_pixel x n_series x n_obs) data of each pixel
+        py (np.ndarray): 1D (n_pixel) ``py`` of each pixel in ``Y``
+        px (np.ndarray): 1D (n_pixel) ``px`` of each pixel in ``Y``
+
+    Yields:
+        tuple (int, np.ndarray, np.ndarray): Index of the pixel in ``Y``, the
+        indices of its records, and a mask of observations without NaN in
+        any of its ``Y``
+
+    Raises:
+        KeyError: if a record's pixel is not in ``Y``
+    """
+    # Match pixels using the same type as the record
+    py = np.asarray(py).astype(record['py'].dtype)
+    px = np.asarray(px).astype(record['px'].dtype)
+    pixels = dict((yx, i) for i, yx in enumerate(zip(py, px)))
+    i_pix = np.array([pixels[yx] for yx in zip(record['py'], record['px'])],
+                     dtype=np.intp)
+
+    for i in np.unique(i_pix):
+        yield (i, np.flatnonzero(i_pix == i),
+               np.all(np.isfinite(Y[i]), axis=0))
+
+
+def omission_test_block(record, X, Y, dates, py, px, indices,
+                        crit=0.05, behavior='ANY'):
+    """ Omission test of the records of all pixels in a block
+
+    The same test as :func:`omission_test`, run from stored records (e.g.,
+    read from results files) and the data of the block they were estimated
+    from, instead of a fitted model. Observations containing NaN in any of
+    ``Y`` are excluded separately for each pixel.
+
+    Args:
+        record (np.ndarray): Records of pixels in the block, including the
+            ``py`` and ``px`` of each record
+        X (np.ndarray): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray): 3D (n_pixel x n_series x n_obs) data of each pixel
+        dates (np.ndarray): 1D (n_obs) ordinal dates
+        py (np.ndarray): 1D (n_pixel) ``py`` of each pixel in ``Y``
+        px (np.ndarray): 1D (n_pixel) ``px`` of each pixel in ``Y``
+        indices (np.ndarray): Array indices of ``Y`` to test
+        crit (float, optional): Critical p-value for rejection of null
+            hypothesis that data contain no structural change
+        behavior (str, optional): Method for dealing with multiple
+            ``indices`` (``ANY`` or ``ALL``). See :func:`omission_test`
+
+    Returns:
+        np.ndarray: Array of True or False for each record where
+            True indicates omitted break point
+
+    Raises:
+        KeyError: if a record's pixel is not in ``Y``
+
+    """
+    if behavior.lower() not in ['any', 'all']:
+        raise ValueError('`behavior` must be "any" or "all"')
+
+    pvalue = np.ones((record.size, len(indices)))
+    for i, rows, good in _iter_record_pixels(record, Y, py, px):
+        pvalue[rows, :] = _omission_pvalue(record[rows], X[good, :],
+                                           Y[i][:, good], dates[good],
+                                           indices)
+
+    return _omission_collapse(pvalue < crit, behavior)
+
+
+def _fit_bands(estimator, X, Y, fitopt):
+    """ Return coefficients, intercepts, and predictions of ``Y``
+
+    Estimators in :data:`yatsm.algorithms.ccdc.MULTIOUTPUT_ESTIMATORS` fit
+    all series in ``Y`` (n_series x n_obs) at once, and
+    :class:`yatsm.regression.robust_fit.RLM` models of all series are fit
+    together by :func:`yatsm.regression.robust_fit.rlm_batch`.
+    """
+    if (type(estimator) is RLM and estimator.scale_est is mad and
+            not fitopt):
+        coef = rlm_batch(X, Y, M=estimator.M, tune=estimator.tune,
+                         scale_constant=estimator.scale_constant,
+                         update_scale=estimator.update_scale,
+                         maxiter=estimator.maxiter, tol=estimator.tol)[0]
+        return coef, np.zeros(Y.shape[0]), np.dot(coef, X.T)
+
+    if type(estimator) in MULTIOUTPUT_ESTIMATORS:
+        estimator.fit(X, Y.T, **fitopt)
+        coef = np.atleast_2d(estimator.coef_)
+        intercept = np.broadcast_to(getattr(estimator, 'intercept_', 0.0),
+                                    Y.shape[0])
+        yhat = estimator.predict(X).reshape(Y.T.shape).T
+        return coef, intercept, yhat
+
+    coef = np.zeros((Y.shape[0], X.shape[1]))
+    intercept = np.zeros(Y.shape[0])
+    yhat = np.zeros(Y.shape)
+    for i, y in enumerate(Y):
+        estimator.fit(X, y, **fitopt)
+        coef[i, :] = estimator.coef_
+        intercept[i] = getattr(estimator, 'intercept_', 0.0)
+        yhat[i, :] = estimator.predict(X)
+    return coef, intercept, yhat
+
+
+def refit_segments(record, X, Y, dates, estimator,
+                   fitopt=None, keep_regularized=False):
+    """ Refit segments of a record with a new estimator
+
+    Bands sharing the same features (all bands, unless
+    ``keep_regularized``) are fit together by multiple output estimators
+    (see :data:`yatsm.algorithms.ccdc.MULTIOUTPUT_ESTIMATORS`).
+
+    Args:
+        record (np.ndarray): Segment records to refit
+        X (np.ndarray): 2D (n_obs x n_coef) design matrix
+        Y (np.ndarray): 2D (n_series x n_obs) dependent variables
+        dates (np.ndarray): 1D (n_obs) ordinal dates
+        estimator (object): instance of a scikit-learn compatible estimator
+            object
+        fitopt (dict, optional): dict of options for the ``fit`` method of the
+            ``estimator`` provided (default: None)
+        keep_regularized (bool, optional): do not use features with coefficient
+            estimates that are fit to 0 (i.e., if using L1 regularization).
+            Requires ``X`` to be the design matrix of ``record``
+
+    Returns:
+        tuple (np.ndarray, np.ndarray): Refit coefficients (n_record x n_coef
+        x n_series), with the intercept added to the first coefficient, and
+        RMSE (n_record x n_series)
+
+    Raises:
+        ValueError: if ``keep_regularized`` but the number of coefficients in
+            ``record`` and ``X`` differ
+
+    """
+    fitopt = fitopt or {}
+    n_coef, n_series = X.shape[1], Y.shape[0]
+    if keep_regularized and record.dtype['coef'].shape[0] != n_coef:
+        raise ValueError('Cannot `keep_regularized` coefficients when '
+                         'refitting with a different design matrix')
+
+    coef = np.zeros((record.size, n_coef, n_series), dtype=np.float32)
+    _rmse = np.zeros((record.size, n_series), dtype=np.float32)
+
+    for i_rec, rec in enumerate(record):
         # Find matching X and Y in data
-        index = np.where(
-            (model.dates >= min(r['start'], r['end'])) &
-            (model.dates <= max(r['end'], r['start'])))[0]
-        # Grab matching X and Y
-        _X = model.X[index, :]
-        _Y = model.Y[:, index]
-
-        for i_b, b in enumerate(indices):
-            # Create OLS regression
-            ols = sm.OLS(_Y[b, :], _X).fit()
-            # Perform CUMSUM test on residuals
-            test = sm.stats.diagnostic.breaks_cusumolsresid(
-                ols.resid, _X.shape[1])
-
-            if test[1] < crit:
-                omission[i, i_b] = True
+        # start/end dates are considered in case ran backward
+        index = np.where((dates >= min(rec['start'], rec['end'])) &
+                         (dates <= max(rec['start'], rec['end'])))[0]
+
+        _X = X.take(index, axis=0)
+        _Y = Y.take(index, axis=1)
+
+        # Fit bands with the same nonzero coefficients together
+        groups = defaultdict(list)
+        for b in range(n_series):
+            if keep_regularized:
+                # Find nonzero in case of regularized regression
+                nonzero = np.flatnonzero(rec['coef'][:, b])
             else:
-                omission[i, i_b] = False
+                nonzero = np.arange(n_coef)
+            groups[tuple(nonzero)].append(b)
 
-    # Collapse band answers according to `behavior`
-    if behavior.lower() == 'any':
-        return np.any(omission, 1)
-    else:
-        return np.all(omission, 1)
+        for nonzero, bands in groups.items():
+            bands = np.asarray(bands)
+            if not nonzero:
+                _rmse[i_rec, bands] = rec['rmse'][bands]
+                continue
+            nonzero = np.asarray(nonzero)
+
+            _coef, intercept, yhat = _fit_bands(
+                estimator, _X[:, nonzero], _Y[bands, :], fitopt)
+            coef[i_rec, nonzero[:, None], bands] = _coef.T
+            coef[i_rec, 0, bands] += intercept
+            _rmse[i_rec, bands] = np.sqrt(((_Y[bands, :] - yhat) ** 2)
+                                          .mean(axis=1))
+
+    return coef, _rmse
+
+
+def refit_block(record, X, Y, dates, py, px, estimator,
+                fitopt=None, keep_regularized=False):
+    """ Refit the segments of all pixels in a block with a new estimator
+
+    The same refit as :func:`refit_segments`, for stored records (e.g.,
+    read from results files) and the data of the block they were estimated
+    from. Observations containing NaN in any of ``Y`` are excluded
+    separately for each pixel.
+
+    Args:
+        record (np.ndarray): Records of pixels in the block, including the
+            ``py`` and ``px`` of each record
+        X (np.ndarray): 2D (n_obs x n_coef) design matrix
+        Y (np.ndarray): 3D (n_pixel x n_series x n_obs) data of each pixel
+        dates (np.ndarray): 1D (n_obs) ordinal dates
+        py (np.ndarray): 1D (n_pixel) ``py`` of each pixel in ``Y``
+        px (np.ndarray): 1D (n_pixel) ``px`` of each pixel in ``Y``
+        estimator (object): instance of a scikit-learn compatible estimator
+            object
+        fitopt (dict, optional): dict of options for the ``fit`` method of the
+            ``estimator`` provided (default: None)
+        keep_regularized (bool, optional): do not use features with coefficient
+            estimates that are fit to 0 (i.e., if using L1 regularization)
+
+    Returns:
+        tuple (np.ndarray, np.ndarray): Refit coefficients (n_record x n_coef
+        x n_series) and RMSE (n_record x n_series)
+
+    """
+    coef = np.zeros((record.size, X.shape[1], Y.shape[1]), dtype=np.float32)
+    _rmse = np.zeros((record.size, Y.shape[1]), dtype=np.float32)
+    for i, rows, good in _iter_record_pixels(record, Y, py, px):
+        coef[rows], _rmse[rows] = refit_segments(
+            record[rows], X[good, :], Y[i][:, good], dates[good], estimator,
+            fitopt=fitopt, keep_regularized=keep_regularized)
+
+    return coef, _rmse
 
 
 def refit_record(model, prefix, estimator,
@@ -246,48 +513,20 @@ def refit_record(model, prefix, estimator,
     if not model:
         return None
 
-    fitopt = fitopt or {}
-
     refit_coef = prefix + '_coef'
     refit_rmse = prefix + '_rmse'
 
+    coef, _rmse = refit_segments(model.record, model.X, model.Y, model.dates,
+                                 estimator, fitopt=fitopt,
+                                 keep_regularized=keep_regularized)
+
     # Create new array for robust coefficients and RMSE
-    n_coef, n_series = model.record[0]['coef'].shape
     refit = np.zeros(model.record.shape[0], dtype=[
-        (refit_coef, 'float32', (n_coef, n_series)),
-        (refit_rmse, 'float32', (n_series)),
+        (refit_coef, 'float32', coef.shape[1:]),
+        (refit_rmse, 'float32', _rmse.shape[1:]),
     ])
-
-    for i_rec, rec in enumerate(model.record):
-        # Find matching X and Y in data
-        # start/end dates are considered in case ran backward
-        index = np.where((model.dates >= min(rec['start'], rec['end'])) &
-                         (model.dates <= max(rec['start'], rec['end'])))[0]
-
-        X = model.X.take(index, axis=0)
-        Y = model.Y.take(index, axis=1)
-
-        # Refit each band
-        for i_y, y in enumerate(Y):
-            if keep_regularized:
-                # Find nonzero in case of regularized regression
-                nonzero = np.nonzero(rec['coef'][:, i_y])[0]
-                if nonzero.size == 0:
-                    refit[i_rec][refit_rmse][:] = rec['rmse']
-                    continue
-            else:
-                nonzero = np.arange(n_series)
-
-            # Fit
-            estimator.fit(X[:, nonzero], y, **fitopt)
-            # Store updated coefficients
-            refit[i_rec][refit_coef][nonzero, i_y] = estimator.coef_
-            refit[i_rec][refit_coef][0, i_y] += getattr(
-                estimator, 'intercept_', 0.0)
-
-            # Update RMSE
-            refit[i_rec][refit_rmse][i_y] = rmse(
-                y, estimator.predict(X[:, nonzero]))
+    refit[refit_coef] = coef
+    refit[refit_rmse] = _rmse
 
     # Merge
     refit = nprf.merge_arrays((model.record, refit), flatten=True)
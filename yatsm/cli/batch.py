@@ -2,7 +2,7 @@
 """
 from __future__ import division
 
-from collections import defaultdict
+from collections import Counter, defaultdict
 import logging
 from itertools import product
 import time
@@ -114,7 +114,8 @@ def batch_block(config, readers, window, overwrite=False):
     data = io.read_and_preprocess(config['data']['datasets'],
                                   readers,
                                   window,
-                                  out=None)
+                                  out=None,
+                                  dtype=config['data'].get('dtype', None))
 
     store_kwds = {
         'window': window,
@@ -138,18 +139,37 @@ def batch_block(config, readers, window, overwrite=False):
 
         pipe = pipeline.run_eager(pipe)
 
+        # Eager tasks (e.g., ``block_CCDCesque``) produce results for all
+        # pixels at once
         record_results = defaultdict(list)
+        eager_records = set(pipe['record'].keys())
+        for k, v in pipe['record'].items():
+            record_results[k].append(v)
+
+        # Skip per-pixel loop if all tasks were eager
+        pixels = product(data.y.values, data.x.values)
+        if not pipeline.pipeline:
+            pixels = []
+
+        fit_paths = Counter()
         n_ = data.y.shape[0] * data.x.shape[0]
-        for i, (y, x) in enumerate(product(data.y.values, data.x.values)):
+        for i, (y, x) in enumerate(pixels):
             logger.debug('Processing pixel {pct:>4.2f}%: y/x {y}/{x}'
                          .format(pct=i / n_ * 100, y=y, x=x))
             pix_pipe = sel_pix(pipe, y, x)
 
             result = pipeline.run(pix_pipe, check_eager=False)
+            fit_paths.update(result['stash'].get('fit_path', {}))
 
             # TODO: figure out what to do with 'data' results
             for k, v in result['record'].items():
-                record_results[k].append(v)
+                if k not in eager_records:
+                    record_results[k].append(v)
+
+        if fit_paths:
+            logger.info('CCDCesque pixels fit by path: {}'.format(
+                ', '.join('{}={}'.format(k, v)
+                          for k, v in sorted(fit_paths.items()))))
 
         for name, result in record_results.items():
             record_results[name] = np.concatenate(result)
@@ -0,0 +1,173 @@
+""" Command line interface for refitting YATSM results with a new estimator
+"""
+from __future__ import division
+
+import logging
+import time
+
+import click
+
+from . import options
+
+logger = logging.getLogger('yatsm')
+
+
+@click.command(short_help='Refit segment results with a different estimator')
+@options.arg_config
+@click.argument('task', nargs=1, type=str)
+@options.arg_job_number
+@options.arg_total_jobs
+@options.opt_executor
+@click.option('--estimator', default='RLM', show_default=True,
+              type=click.Choice(['OLS', 'RLM']),
+              help='Estimator used to refit segments')
+@click.option('--prefix', default=None, show_default=True,
+              help='Prefix of refit columns (default: estimator name)')
+@click.option('--keep_regularized', is_flag=True,
+              help='Only refit features with nonzero coefficients')
+@click.option('--chunksize', default=10000, show_default=True, type=int,
+              help='Number of result rows to refit at once')
+@click.pass_context
+def refit(ctx, config, task, job_number, total_jobs, executor,
+          estimator, prefix, keep_regularized, chunksize):
+    """ Refit the segments in the results table of a pipeline TASK
+
+    Segments are refit using the design matrix and data the TASK requires,
+    which are recomputed for each block window using the pipeline in
+    CONFIG. Refit coefficients and RMSE are written into the results table
+    as ``<prefix>_coef`` and ``<prefix>_rmse`` columns, reading and writing
+    ``chunksize`` rows at a time.
+    """
+    from yatsm.utils import distribute_jobs
+
+    prefix = prefix or estimator.lower()
+
+    windows = config.primary_reader.block_windows
+    job_idx = distribute_jobs(job_number, total_jobs, len(windows))
+    job_windows = [windows[i] for i in job_idx]
+    logger.debug('Working on {0} of {1} block windows'
+                 .format(len(job_idx), len(windows)))
+
+    futures = {}
+    for idx, window in job_windows:
+        future = executor.submit(refit_window,
+                                 config=config,
+                                 readers=config.readers,
+                                 window=window,
+                                 task=task,
+                                 estimator=estimator,
+                                 prefix=prefix,
+                                 keep_regularized=keep_regularized,
+                                 chunksize=chunksize)
+        futures[future] = window
+
+    n_good, n_skip, n_fail = 0, 0, 0
+    for future in executor.as_completed(futures):
+        window = futures[future]
+        try:
+            result = future.result()
+            if isinstance(result, str):
+                logger.info("Refit: %s" % result)
+                n_good += 1
+            else:
+                n_skip += 1
+            time.sleep(1)
+        except KeyboardInterrupt:
+            logger.critical('Interrupting and shutting down')
+            executor.shutdown()
+            raise click.Abort()
+        except Exception:
+            logger.exception("Exception for window: {}".format(window))
+            n_fail += 1
+
+    logger.info('Complete: %s' % n_good)
+    logger.info('Skipped: %s' % n_skip)
+    logger.info('Failed: %s' % n_fail)
+
+
+def refit_window(config, readers, window, task, estimator, prefix,
+                 keep_regularized=False, chunksize=10000):
+    """ Refit the results of ``task`` for a block window
+
+    Args:
+        config (yatsm.api.Config): YATSM configuration
+        readers (dict): Dataset readers
+        window (tuple): Block window to read
+        task (str): Name of pipeline task whose results are refit
+        estimator (str): Name of estimator (see
+            :data:`yatsm.pipeline.tasks.postprocess.REFIT_ESTIMATORS`)
+        prefix (str): Prefix of refit columns
+        keep_regularized (bool): Only refit features with nonzero
+            coefficients
+        chunksize (int): Number of result rows to refit at once
+
+    Returns:
+        str: Filename of refit results, or ``None`` if there are no results
+        for this window
+    """
+    import logging
+    import os
+
+    import numpy as np
+
+    from yatsm import io
+    from yatsm.algorithms.postprocess import refit_block
+    from yatsm.pipeline import Pipe, Pipeline
+    from yatsm.pipeline.tasks.postprocess import REFIT_ESTIMATORS, _block_XY
+    from yatsm.results import (HDF5ResultsStore, add_columns,
+                               result_filename)
+
+    logger = logging.getLogger('yatsm')
+
+    filename = result_filename(window,
+                               root=config['results']['output'],
+                               pattern=config['results']['output_prefix'])
+    if not os.path.exists(filename):
+        logger.debug('No results to refit for window: {}'.format(window))
+        return
+
+    logger.info('Working on window: {}'.format(window))
+    data = io.read_and_preprocess(config['data']['datasets'],
+                                  readers,
+                                  window,
+                                  out=None,
+                                  dtype=config['data'].get('dtype', None))
+
+    # Only recompute the data required -- records are read from the results
+    pipe = Pipe(data=data)
+    pipeline = config.get_pipeline(pipe, overwrite=True)
+    if task not in pipeline.tasks:
+        raise click.ClickException('Task "{}" is not in the pipeline'
+                                   .format(task))
+    _task = pipeline.tasks[task]
+    data_tasks = [t for t in pipeline.eager_pipeline if not t.output_record]
+    if data_tasks:
+        pipe = Pipeline.delayed(data_tasks, pipe).compute()
+
+    X, Y, py, px = _block_XY(pipe, {'data': _task.require_data})
+    n_band = Y.shape[1]
+    dates = pipe.data['ordinal'].values
+
+    _estimator = REFIT_ESTIMATORS[estimator]()
+    names = (prefix + '_coef', prefix + '_rmse')
+    dtype = np.dtype([(names[0], 'float32', (X.shape[1], n_band)),
+                      (names[1], 'float32', (n_band, ))])
+
+    with HDF5ResultsStore(filename, mode='r+') as store:
+        where, name = pipeline.task_table(_task)
+        table = store.h5file.get_node(where, name)
+        if not all(n in table.colnames for n in names):
+            table = add_columns(store.h5file, table, dtype,
+                                chunksize=chunksize)
+
+        for start in range(0, table.nrows, chunksize):
+            stop = min(start + chunksize, table.nrows)
+            record = table.read(start, stop)
+            coef, rmse = refit_block(record, X, Y, dates, py, px,
+                                     _estimator,
+                                     keep_regularized=keep_regularized)
+            table.modify_columns(start, stop, columns=[coef, rmse],
+                                 names=list(names))
+        table.flush()
+
+    return filename
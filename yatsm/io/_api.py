@@ -73,7 +73,7 @@ def get_reader(name=None, **kwargs):
         return reader_cls(**kwargs)
 
 
-def read_and_preprocess(config, readers, window, out=None):
+def read_and_preprocess(config, readers, window, out=None, dtype=None):
     """ Read and preprocess a window of data from multiple readers
 
     Note:
@@ -93,6 +93,10 @@ def read_and_preprocess(config, readers, window, out=None):
             time series into. Its shape should be:
 
             (time series length, # bands, # rows, # columns)
+        dtype (np.dtype): Datatype to convert data to before masking. Masked
+            values are set to NaN, so this should be a floating point type
+            (e.g., ``float32``). If not given, masking promotes the data to
+            ``float64``
 
     Returns:
         xarray.Dataset: A ``Dataset`` contaiing all data and metadata from all
@@ -104,6 +108,8 @@ def read_and_preprocess(config, readers, window, out=None):
         arr = reader.read_dataarray(window=window,
                                     band_names=cfg['band_names'],
                                     out=out)
+        if dtype is not None:
+            arr = arr.astype(dtype)
 
         if cfg['mask_band'] and cfg['mask_values']:
             logger.debug('Applying mask band to "{}"'.format(name))
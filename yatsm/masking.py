@@ -1,18 +1,100 @@
 from __future__ import division
 
 import numpy as np
-import statsmodels.api as sm
 
-from .accel import try_jit
 from .regression import robust_fit as rlm
+from .regression.lowess import lowess
 
 ndays = 365.25
 
 
-@try_jit()  # np.array prevents nopython
+def multitemp_design(x, n_year):
+    """ Harmonic design matrix used by :func:`multitemp_mask`
+
+    Args:
+        x (ndarray): array of ordinal dates
+        n_year (float): "number of years to mask"
+
+    Returns:
+        np.ndarray: design matrix (n_obs x 5) with an intercept, an annual
+            harmonic, and a harmonic with a period of ``ceil(n_year)`` years
+
+    """
+    n_year = np.ceil(n_year)
+    w = 2.0 * np.pi / ndays
+
+    return np.array([np.ones_like(x),
+                     np.cos(w * x),
+                     np.sin(w * x),
+                     np.cos(w / n_year * x),
+                     np.sin(w / n_year * x)], dtype=np.float64).T
+
+
+class MultitempDesignCache(object):
+    """ Cache of :func:`multitemp_mask` design matrices for a time series
+
+    Design matrices are computed once for all dates of a time series for
+    each number of years, and any subset of the dates is then served from
+    the cached matrix instead of evaluating the harmonics again. Subsets
+    are found by their dates, so observations may be removed from or
+    reordered in the caller's copy of the dates.
+
+    Args:
+        dates (ndarray): sorted array of ordinal dates of the time series
+
+    """
+    def __init__(self, dates):
+        self.dates = np.array(dates)
+        self._design = {}
+
+    def design(self, n_year):
+        """ Return the design matrix for all dates of the time series
+
+        Args:
+            n_year (float): "number of years to mask"
+
+        Returns:
+            np.ndarray: design matrix (n_obs x 5)
+
+        """
+        n_year = np.ceil(n_year)
+        X = self._design.get(n_year)
+        if X is None:
+            X = self._design[n_year] = multitemp_design(self.dates, n_year)
+        return X
+
+    def __call__(self, x, n_year):
+        """ Return the design matrix for dates ``x`` of the time series
+
+        Args:
+            x (ndarray): array of ordinal dates in the time series
+            n_year (float): "number of years to mask"
+
+        Returns:
+            np.ndarray: design matrix (n_obs x 5). Contiguous dates are
+            returned as a view of the cached design matrix
+
+        """
+        X = self.design(n_year)
+        n = len(x)
+        if not n:
+            return X[:0]
+
+        # Contiguous dates are a slice of the time series
+        i = np.searchsorted(self.dates, x[0])
+        if np.array_equal(self.dates[i:i + n], x):
+            return X[i:i + n]
+
+        idx = np.searchsorted(self.dates, x).clip(max=self.dates.size - 1)
+        if np.array_equal(self.dates[idx], x):
+            return X[idx]
+
+        return multitemp_design(x, n_year)
+
+
 def multitemp_mask(x, Y, n_year, crit=400,
                    green=1, swir1=4,
-                   maxiter=10):
+                   maxiter=10, design=None):
     """ Multi-temporal masking using RLM
 
     Taken directly from CCDC (Zhu and Woodcock, 2014). This "temporal masking"
@@ -28,32 +110,81 @@ def multitemp_mask(x, Y, n_year, crit=400,
         swir1 (int): 0 indexed value for SWIR (~1.55-1.75um) band
             in Y (default: 4)
         maxiter (int): maximum iterations for RLM fit
+        design (MultitempDesignCache): Cache of design matrices for the
+            time series containing ``x``. If not given, the design matrix is
+            computed from ``x`` (optional)
 
     Returns:
         mask (np.ndarray): mask where False indicates values to be masked
 
     """
-    green = Y[green, :]
-    swir1 = Y[swir1, :]
+    green_swir1 = Y[[green, swir1], :]
 
-    n_year = np.ceil(n_year)
-    w = 2.0 * np.pi / ndays
+    if design is None:
+        X = multitemp_design(x, n_year)
+    else:
+        X = design(x, n_year)
 
-    X = np.array([np.ones_like(x),
-                  np.cos(w * x),
-                  np.sin(w * x),
-                  np.cos(w / n_year * x),
-                  np.sin(w / n_year * x)]).T
+    # Fit green and SWIR1 together
+    coef = rlm.rlm_batch(X, green_swir1, M=rlm.bisquare, maxiter=maxiter)[0]
+    resid = green_swir1 - np.dot(coef, X.T)
 
-    green_RLM = rlm.RLM(M=rlm.bisquare, maxiter=maxiter).fit(X, green)
-    swir1_RLM = rlm.RLM(M=rlm.bisquare, maxiter=maxiter).fit(X, swir1)
-
-    mask = ((green - green_RLM.predict(X) < crit) *
-            (swir1 - swir1_RLM.predict(X) > -crit))
+    mask = (resid[0, :] < crit) * (resid[1, :] > -crit)
 
     return mask
 
 
+def multitemp_mask_block(design, index, Y, n, n_year, crit=400,
+                         green=1, swir1=4, maxiter=10):
+    """ Multi-temporal masking using RLM of many time series at once
+
+    The same masking as :func:`multitemp_mask` for time series observed on
+    subsets of the same dates (e.g., pixels of a block). Design matrices
+    are computed once for all dates and each number of years, and the green
+    and SWIR1 bands of all time series are fit together by
+    :func:`yatsm.regression.robust_fit.rlm_stack`.
+
+    Args:
+        design (MultitempDesignCache): Cache of design matrices for the
+            dates of all time series
+        index (ndarray): 2D (n_ts x n_obs) indices of the observations of
+            each time series in the dates of ``design``
+        Y (ndarray): 3D (n_ts x n_series x n_obs) observed spectra of each
+            time series
+        n (ndarray): 1D (n_ts) number of observations of each time series.
+            Observations beyond ``n`` are ignored
+        n_year (ndarray): 1D (n_ts) "number of years to mask" of each time
+            series
+        crit (float): critical value for masking clouds/shadows
+        green (int): 0 indexed value for green band in Y
+            (default: 1)
+        swir1 (int): 0 indexed value for SWIR (~1.55-1.75um) band
+            in Y (default: 4)
+        maxiter (int): maximum iterations for RLM fit
+
+    Returns:
+        mask (np.ndarray): 2D (n_ts x n_obs) mask where False indicates
+        values to be masked, or observations beyond ``n``
+
+    """
+    n = np.asarray(n)
+    n_year = np.ceil(n_year)
+    X = np.empty(index.shape + (5, ))
+    for _n_year in np.unique(n_year):
+        i = n_year == _n_year
+        X[i] = design.design(_n_year)[index[i]]
+
+    # Fit green and SWIR1 of all time series together
+    green_swir1 = Y[:, [green, swir1], :]
+    coef = rlm.rlm_stack(X, green_swir1, n, M=rlm.bisquare,
+                         maxiter=maxiter)[0]
+    resid = green_swir1 - np.einsum('tnf,tsf->tsn', X, coef)
+
+    with np.errstate(invalid='ignore'):
+        return ((np.arange(index.shape[1]) < n[:, None]) &
+                (resid[:, 0, :] < crit) & (resid[:, 1, :] > -crit))
+
+
 def smooth_mask(x, Y, span, crit=400, green=1, swir1=4,
                 maxiter=5):
     """ Multi-temporal masking using LOWESS
@@ -97,20 +228,17 @@ def smooth_mask(x, Y, span, crit=400, green=1, swir1=4,
     # Estimate delta as "good choice": delta = 0.01 * range(exog)
     delta = (x.max() - x.min()) * 0.01
 
-    # Run LOWESS checking for NaN in output
+    # Run LOWESS of green and SWIR1 together checking for NaN in output
+    green_swir1 = Y[[green, swir1], :]
     i = 0
-    green_lowess, swir1_lowess = np.nan, np.nan
-    while (np.any(np.isnan(green_lowess)) or
-           np.any(np.isnan(swir1_lowess))) and i < maxiter:
-        green_lowess = sm.nonparametric.lowess(Y[green, :], x,
-                                               frac=frac, delta=delta)
-        swir1_lowess = sm.nonparametric.lowess(Y[swir1, :], x,
-                                               frac=frac, delta=delta)
+    fit = np.nan
+    while np.any(np.isnan(fit)) and i < maxiter:
+        fit = lowess(x, green_swir1, frac=frac, delta=delta)
         span += 1
         frac = span / x.shape[0]
         i += 1
 
-    mask = (((Y[green, :] - green_lowess[:, 1]) < crit) *
-            ((Y[swir1, :] - swir1_lowess[:, 1]) > -crit))
+    resid = green_swir1 - fit
+    mask = (resid[0, :] < crit) * (resid[1, :] > -crit)
 
     return mask
@@ -17,7 +17,7 @@ import numpy as np
 import numpy.lib.recfunctions
 import pandas as pd
 
-from ..regression.cran import CRAN_spline
+from ..regression import smooth_spline, smooth_spline_grid
 from ..vegetation_indices import EVI
 
 logger = logging.getLogger('yatsm')
@@ -30,6 +30,17 @@ LongTermMeanPhenologyResults = namedtuple('LongTermMeanPhenologyResults', [
     'peakEVI', 'corrcoef', 'smoothEVI'
 ])
 
+#: list: NumPy structured array data type of phenology metrics of records
+PHENOLOGY_DTYPE = [
+    ('spring_doy', 'u2'),
+    ('autumn_doy', 'u2'),
+    ('pheno_cor', 'f4'),
+    ('peak_evi', 'f4'),
+    ('peak_doy', 'u2'),
+    ('spline_evi', 'f8', 366),
+    ('pheno_nobs', 'u2')
+]
+
 
 def group_years(years, interval=3):
     """ Return integers representing sequential groupings of years
@@ -101,6 +112,47 @@ def halfmax(x):
         (np.nanmax(x) - np.nanmin(x)) - 0.5))
 
 
+def _halfmax_rows(x, mask):
+    """ Return index of the observation closest to the half-max of each row
+
+    The same as :func:`halfmax`, considering only the observations of each
+    row within ``mask``.
+    """
+    x_min = np.where(mask, x, np.inf).min(axis=1)[:, None]
+    x_max = np.where(mask, x, -np.inf).max(axis=1)[:, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        dist = np.abs((x - x_min) / (x_max - x_min) - 0.5)
+    return np.argmin(np.where(mask, dist, np.inf), axis=1)
+
+
+def transition_doys(evi_smooth):
+    """ Return the phenological transition dates of smoothed EVI
+
+    The peak of EVI separates spring from autumn, and the spring and autumn
+    transitions are the days of year closest to the half-max of the EVI of
+    each season.
+
+    Args:
+        evi_smooth (np.ndarray): 2D (n x 366) smoothed EVI for days of
+            year 1 to 366
+
+    Returns:
+        tuple (np.ndarray, np.ndarray, np.ndarray, np.ndarray): spring,
+        autumn, and peak EVI day of year, and the peak EVI. Autumn is 0 if
+        the peak is at the end of the year
+    """
+    peak = evi_smooth.argmax(axis=1)
+    peak_evi = evi_smooth.max(axis=1)
+
+    # Spring includes the day of year after the peak
+    spring = np.arange(evi_smooth.shape[1]) <= (peak + 1)[:, None]
+    spring_doy = _halfmax_rows(evi_smooth, spring) + 1
+    autumn_doy = np.where((~spring).any(axis=1),
+                          _halfmax_rows(evi_smooth, ~spring) + 1, 0)
+
+    return spring_doy, autumn_doy, peak + 1, peak_evi
+
+
 # TODO: delete
 def ordinal2yeardoy(ordinal):
     """ Convert ordinal dates to two arrays of year and doy
@@ -174,8 +226,8 @@ def longtermmeanphenology(evi, periods=None, year_interval=3,
     ))
 
     # Fit spline and predict EVI
-    spl_pred = CRAN_spline(pad_evi_norm.index.dayofyear, pad_evi_norm.values,
-                           spar=0.55)
+    spl_pred = smooth_spline(pad_evi_norm.index.dayofyear,
+                             pad_evi_norm.values, spar=0.55)
     # 366 to include leap years
     evi_smooth = pd.Series(spl_pred(np.arange(1, 367)),
                            index=np.arange(1, 367))
@@ -184,24 +236,10 @@ def longtermmeanphenology(evi, periods=None, year_interval=3,
     pheno_cor = np.corrcoef(evi_smooth[evi_norm.index.dayofyear],
                             evi_norm)[0, 1]
 
-    # Separate into spring / autumn
-    peak_doy = evi_smooth.argmax()
-    peak_evi = evi_smooth.max()
-    evi_smooth_spring = evi_smooth[:peak_doy + 1]
-    evi_smooth_autumn = evi_smooth[peak_doy + 1:]
-
-    # Compute half-maximum of spring logistic for "ruling in" image dates
-    # (points) for anomaly calculation
-    # Note: we add + 1 to go from index (on 0) to day of year (on 1)
-    if evi_smooth_spring.size > 0:
-        ltm_spring = halfmax(evi_smooth_spring)
-    else:
-        ltm_spring = 0
-
-    if evi_smooth_autumn.size > 0:
-        ltm_autumn = halfmax(evi_smooth_autumn)
-    else:
-        ltm_autumn = 0
+    # Separate into spring / autumn and compute half-maximum of each for
+    # "ruling in" image dates (points) for anomaly calculation
+    ltm_spring, ltm_autumn, peak_doy, peak_evi = [
+        v[0] for v in transition_doys(evi_smooth.values[None, :])]
 
     return LongTermMeanPhenologyResults(
         springDOY=ltm_spring, autumnDOY=ltm_autumn, peakEVIDOY=peak_doy,
@@ -209,6 +247,178 @@ def longtermmeanphenology(evi, periods=None, year_interval=3,
     )
 
 
+def _group_years_rows(years, mask, interval=3):
+    """ Return :func:`group_years` of the years within ``mask`` of each row
+
+    Args:
+        years (np.ndarray): 1D (n_obs) year of each observation
+        mask (np.ndarray): 2D (n x n_obs) observations of each row to group
+        interval (int, optional): number of years to group together
+
+    Returns:
+        np.ndarray: 2D (n x n_obs) year grouping of each row, valid within
+        ``mask``
+    """
+    y_min = np.where(mask, years, years.max()).min(axis=1)
+    y_max = np.where(mask, years, years.min()).max(axis=1)
+    n_groups = np.maximum(np.ceil((y_max - y_min) / interval), 1).astype(int)
+
+    # Same as ``np.array_split``: the first ``r`` groups get an extra year
+    n_years = np.maximum(y_max - y_min + 1, 1)
+    q, r = n_years // n_groups, n_years % n_groups
+    offset = years - y_min[:, None]
+    cut = (r * (q + 1))[:, None]
+    return np.where(offset < cut,
+                    offset // (q + 1)[:, None],
+                    r[:, None] + (offset - cut) // q[:, None])
+
+
+def _percentile_rows(x, mask, q):
+    """ Return the percentiles of the observations within ``mask`` of each row
+
+    Computed as :func:`np.percentile` (with linear interpolation), for all
+    rows at once. ``x`` is broadcast to the shape of ``mask``.
+    """
+    x = np.broadcast_to(x, mask.shape)
+    n = mask.sum(axis=1)
+    x_sort = np.sort(np.where(mask, x, np.inf), axis=1)
+    rows = np.arange(mask.shape[0])
+
+    pct = []
+    for _q in q:
+        pos = _q / 100. * np.maximum(n - 1, 0)
+        lo = np.floor(pos).astype(int)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        v_lo, v_hi = x_sort[rows, lo], x_sort[rows, hi]
+        with np.errstate(invalid='ignore'):
+            pct.append(np.where(n > 0, v_lo + (v_hi - v_lo) * (pos - lo),
+                                np.nan))
+    return pct
+
+
+def _scale_EVI_rows(evi, mask, periods, qmin=10, qmax=90):
+    """ Return :func:`scale_EVI` of the observations within ``mask`` of
+    each row, NaN elsewhere
+    """
+    evi = np.broadcast_to(evi, mask.shape)
+    evi_norm = np.full(mask.shape, np.nan)
+    for period in np.unique(periods[mask]):
+        index = mask & (periods == period)
+        evi_min, evi_max = _percentile_rows(evi, index, (qmin, qmax))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scaled = ((evi - evi_min[:, None]) /
+                      (evi_max - evi_min)[:, None])
+        evi_norm[index] = scaled[index]
+
+    return evi_norm
+
+
+def _correlation_rows(x, y, mask):
+    """ Pearson correlation of ``x`` and ``y`` within ``mask`` of each row
+    """
+    n = mask.sum(axis=1)
+    x_anom = np.where(mask, x - (np.where(mask, x, 0).sum(axis=1) /
+                                 n)[:, None], 0)
+    y_anom = np.where(mask, y - (np.where(mask, y, 0).sum(axis=1) /
+                                 n)[:, None], 0)
+    return ((x_anom * y_anom).sum(axis=1) /
+            np.sqrt((x_anom ** 2).sum(axis=1) * (y_anom ** 2).sum(axis=1)))
+
+
+def longtermmeanphenology_block(evi, dates, pixel, start, end,
+                                year_interval=3, q_min=10., q_max=90.,
+                                spar=0.55, chunksize=5000):
+    """ Calculate the long term mean phenology of many time segments at once
+
+    The same calculation as :func:`longtermmeanphenology`, vectorized over
+    the segments of all pixels in a block. Observations of each segment are
+    summarized by their count and sum for each day of year, so the spline of
+    every segment shares the same knots and basis, chosen from all days of
+    year (see :func:`yatsm.regression.smooth_spline_grid`). Results are the
+    same as :func:`longtermmeanphenology` for segments observed on every
+    day of year, and differ only by the choice of knots otherwise.
+
+    Args:
+        evi (np.ndarray): 2D (n_pixel x n_obs) EVI. Values not within
+            [0, 1] are ignored
+        dates (np.ndarray): 1D (n_obs) ordinal dates
+        pixel (np.ndarray): 1D (n_segment) row of ``evi`` of each segment
+        start (np.ndarray): 1D (n_segment) ordinal start date of each
+            segment
+        end (np.ndarray): 1D (n_segment) ordinal end date of each segment
+        year_interval (int): number of years to group together when
+            normalizing EVI to upper and lower percentiles of EVI within the
+            group
+        q_min (float): lower percentile for scaling EVI
+        q_max (float): upper percentile for scaling EVI
+        spar (float): smoothing parameter of the smoothing spline
+        chunksize (int): Number of segments to calculate at once
+
+    Returns:
+        np.ndarray: NumPy structured array (n_segment) of phenology metrics
+        (see :data:`PHENOLOGY_DTYPE`). Segments without valid EVI are 0
+
+    """
+    evi = np.asarray(evi, dtype=np.float64)
+    dates = np.asarray(dates)
+    yeardoy = ordinal2yeardoy(dates.astype(np.uint32))
+    years, doy = yeardoy[:, 0].astype(int), yeardoy[:, 1].astype(int)
+    pixel, start, end = (np.asarray(a) for a in (pixel, start, end))
+
+    # Observations of each day of year
+    doy_obs = (doy[:, None] == np.arange(1, 367)).astype(np.float64)
+
+    pheno = np.zeros(pixel.size, dtype=PHENOLOGY_DTYPE)
+    for i in range(0, pixel.size, chunksize):
+        idx = slice(i, i + chunksize)
+        _evi = evi[pixel[idx]]
+        with np.errstate(invalid='ignore'):
+            valid = ((dates >= start[idx][:, None]) &
+                     (dates <= end[idx][:, None]) &
+                     (_evi >= 0.) & (_evi <= 1.))
+        n_obs = valid.sum(axis=1)
+
+        periods = _group_years_rows(years, valid, year_interval)
+        evi_norm = _scale_EVI_rows(_evi, valid, periods,
+                                   qmin=q_min, qmax=q_max)
+        valid &= np.isfinite(evi_norm)
+        evi_norm[~valid] = 0.
+
+        # Pad missing DOY values (e.g. in winter) with 0's to improve
+        # spline fit. As in ``longtermmeanphenology``, padding is dated in
+        # 2000 and so falls one day after each of its DOY
+        doy_min = np.where(valid, doy, 367).min(axis=1)[:, None]
+        doy_max = np.where(valid, doy, 0).max(axis=1)[:, None]
+        doys = np.arange(1, 367)
+        w = (np.dot(valid, doy_obs) +
+             ((doys >= 2) & (doys <= doy_min + 1)) + (doys >= doy_max + 1))
+        wy = np.dot(evi_norm, doy_obs)
+
+        # Spline of each segment spans DOY 2-366, or 1-366 if DOY 1 has data
+        fit = valid.any(axis=1)
+        evi_smooth = np.zeros((fit.size, 366))
+        for first, has_grid in ((1, w[:, 0] > 0), (2, w[:, 0] == 0)):
+            has_grid &= fit
+            if has_grid.any():
+                spl_pred = smooth_spline_grid(
+                    doys[first - 1:], w[has_grid, first - 1:],
+                    wy[has_grid, first - 1:], spar=spar)
+                evi_smooth[has_grid] = spl_pred(doys)
+
+        _pheno = pheno[idx]
+        (_pheno['spring_doy'], _pheno['autumn_doy'],
+         _pheno['peak_doy'], _pheno['peak_evi']) = transition_doys(evi_smooth)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            _pheno['pheno_cor'] = _correlation_rows(
+                evi_smooth[:, doy - 1], evi_norm, valid)
+        _pheno['spline_evi'] = evi_smooth
+        _pheno['pheno_nobs'] = n_obs
+        for name in _pheno.dtype.names:
+            _pheno[name][~fit] = 0
+
+    return pheno
+
+
 class LongTermMeanPhenology(object):
     """ Calculate long term mean phenology metrics for each YATSM record
 
@@ -278,24 +488,6 @@ class LongTermMeanPhenology(object):
                            model.Y[self.blue_index, :] * self.scale)
 
         self.ordinal = model.dates.astype(np.uint32)
-        self.yeardoy = ordinal2yeardoy(self.ordinal)
-
-        # Mask based on unusual EVI values
-        valid_evi = np.where((self.evi >= 0) & (self.evi <= 1))[0]
-        self.evi = self.evi[valid_evi]
-        self.ordinal = self.ordinal[valid_evi]
-        self.yeardoy = self.yeardoy[valid_evi, :]
-
-        self.pheno = np.zeros(self.model.record.shape, dtype=[
-            ('spring_doy', 'u2'),
-            ('autumn_doy', 'u2'),
-            ('pheno_cor', 'f4'),
-            ('peak_evi', 'f4'),
-            ('peak_doy', 'u2'),
-            ('spline_evi', 'f8', 366),
-            ('pheno_nobs', 'u2')
-        ])
-
 
     def fit(self, model):
         """ Fit phenology metrics for each time segment within a YATSM model
@@ -310,34 +502,15 @@ class LongTermMeanPhenology(object):
 
         """
         self.model = model
-        # Preprocess EVI and create our `self.pheno` record
+        # Preprocess EVI
         self._fit_prep(model)
 
-        for i, _record in enumerate(self.model.record):
-            # Subset variables to range of current record
-            rec_range = np.where((self.ordinal >= _record['start']) &
-                                 (self.ordinal <= _record['end']))[0]
-            if rec_range.size == 0:
-                continue
-
-            _evi = self.evi[rec_range]
-            _yeardoy = self.yeardoy[rec_range, :]
-
-            # TODO
-            # Fit and save results
-            _result = self._fit_record(_evi, _yeardoy,
-                                       self.year_interval,
-                                       self.q_min, self.q_max)
-            if _result is None:
-                continue
-
-            self.pheno[i]['spring_doy'] = _result[0]
-            self.pheno[i]['autumn_doy'] = _result[1]
-            self.pheno[i]['pheno_cor'] = _result[2]
-            self.pheno[i]['peak_evi'] = _result[3]
-            self.pheno[i]['peak_doy'] = _result[4]
-            self.pheno[i]['spline_evi'][:] = _result[5]
-            self.pheno[i]['pheno_nobs'] = rec_range.size
+        record = self.model.record
+        self.pheno = longtermmeanphenology_block(
+            self.evi[None, :], self.ordinal,
+            np.zeros(record.size, dtype=int), record['start'], record['end'],
+            year_interval=self.year_interval,
+            q_min=self.q_min, q_max=self.q_max)
 
         return np.lib.recfunctions.merge_arrays(
             (self.model.record, self.pheno), flatten=True)
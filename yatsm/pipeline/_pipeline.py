@@ -253,6 +253,8 @@ class Pipeline(object):
             pipe (Pipe): Pipeline data
 
         """
+        if not self.eager_pipeline:
+            return pipe
         pipeline = self.delayed(self.eager_pipeline, pipe)
         return pipeline.compute(**compute_kwds)
 
@@ -267,6 +269,8 @@ class Pipeline(object):
         if check_eager and not self._check_eager(self.eager_pipeline, pipe):
             logger.warning('Triggering eager compute')
             pipe = self.run_eager(pipe)
+        if not self.pipeline:
+            return pipe
         pipeline = self.delayed(self.pipeline, pipe)
         return pipeline.compute(**compute_kwds)
 
@@ -9,7 +9,9 @@ import logging
 from pkg_resources import iter_entry_points
 
 from ._validation import eager_task, outputs, requires, version
-from .change import pixel_CCDCesque
+from .change import block_CCDCesque, block_structural_break, pixel_CCDCesque
+from .phenology import block_longtermmean_phenology
+from .postprocess import block_omission_test, block_refit
 from .preprocess import dmatrix, norm_diff
 from .stash import sklearn_dump, sklearn_load
 
@@ -31,7 +33,8 @@ def _get_eps(ep):
 #        some kind of change detection process
 SEGMENT_TASKS = {
     # CHANGE
-    'pixel_CCDCesque': pixel_CCDCesque,
+    'pixel_CCDCesque': pixel_CCDCesque,  # recommended
+    'block_CCDCesque': block_CCDCesque,
 }
 
 
@@ -41,7 +44,14 @@ PIPELINE_TASKS = {
     'sklearn_dump': sklearn_dump,
     # DATA MANIPULATION
     'dmatrix': dmatrix,
-    'norm_diff': norm_diff
+    'norm_diff': norm_diff,
+    # STRUCTURAL BREAKS
+    'block_structural_break': block_structural_break,
+    # POSTPROCESS
+    'block_omission_test': block_omission_test,
+    'block_refit': block_refit,
+    # PHENOLOGY
+    'block_longtermmean_phenology': block_longtermmean_phenology
 }
 
 
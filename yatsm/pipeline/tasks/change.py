@@ -1,7 +1,15 @@
 """ Functional wrappers around change detection algorithms
 """
-from yatsm.algorithms import CCDCesque
-from yatsm.pipeline.tasks._validation import outputs, requires, version
+from collections import Counter
+
+import numpy as np
+import xarray as xr
+
+from yatsm.algorithms import CCDCesque, CCDCesqueBlock
+from yatsm.structural_break import (cusum_OLS_stack, cusum_recursive_stack,
+                                    ewma_stack)
+from yatsm.pipeline.tasks._validation import (eager_task, outputs, requires,
+                                              version)
 from yatsm.pipeline.language import RECORD
 
 
@@ -28,7 +36,9 @@ def pixel_CCDCesque(pipe, require, output, config=None):
             contain `init` section
 
     Returns:
-        yatsm.pipeline.Pipe: Piped output
+        yatsm.pipeline.Pipe: Piped output, with the path through
+        :meth:`CCDCesque.fit` (``'stable'`` or ``'full'``) counted in a
+        :class:`collections.Counter` stashed as ``fit_path``
 
     """
     XY = pipe.data[require['data']].dropna('time', how='any')
@@ -40,5 +50,127 @@ def pixel_CCDCesque(pipe, require, output, config=None):
 
     model = model.fit(X, Y.values, XY['ordinal'])
     pipe.record[output[RECORD][0]] = model.record
+    pipe.stash.setdefault('fit_path', Counter())[model.fit_path] += 1
+
+    return pipe
+
+
+@version(CCDCesqueBlock.__algorithm__)
+@eager_task
+@requires(data=[])
+@outputs(record=[str])
+def block_CCDCesque(pipe, require, output, config=None):
+    """ Run :class:`yatsm.algorithms.CCDCesqueBlock` on all pixels at once
+
+    .. note::
+
+        With Numba installed, :func:`pixel_CCDCesque` runs at least as fast
+        as this task and remains the recommended way to run CCDCesque. This
+        task is only faster when Numba is not available.
+
+    Users should pass to ``require`` both ``X`` and ``Y`` arguments, which
+    are interpreted as:
+
+    .. code-block:: python
+
+        X, Y = require[0], require[1:]
+
+    Observations containing NaN in any of ``Y`` are excluded separately for
+    each pixel.
+
+    Args:
+        pipe (yatsm.pipeline.Pipe): Piped data to operate on
+        require (dict[str, list[str]]): Labels for the requirements of this
+            calculation
+        output (dict[str, list[str]]): Label for the result of this
+            calculation
+        config (dict): Configuration to pass to :class:`CCDCesqueBlock`.
+            Should contain `init` section
+
+    Returns:
+        yatsm.pipeline.Pipe: Piped output
+
+    """
+    X = pipe.data[require['data'][0]]
+    Y = (pipe.data[require['data'][1:]].to_array()
+         .transpose('y', 'x', 'variable', 'time'))
+    n_y, n_x, n_band, n_time = Y.shape
+
+    py, px = [c.ravel() for c in
+              np.meshgrid(Y.y.values, Y.x.values, indexing='ij')]
+
+    model = CCDCesqueBlock(**config.get('init', {}))
+    model = model.fit(X.values, Y.values.reshape(n_y * n_x, n_band, n_time),
+                      pipe.data['ordinal'].values, px=px, py=py)
+    pipe.record[output[RECORD][0]] = model.record
+
+    return pipe
+
+
+#: dict: Structural break tests of many series, by name, and if they
+#        require a design matrix
+_STRUCTURAL_BREAK_TESTS = {
+    'cusum_OLS': (cusum_OLS_stack, True),
+    'cusum_recursive': (cusum_recursive_stack, True),
+    'ewma': (ewma_stack, False)
+}
+
+
+@version('block_structural_break:1.0.0')
+@eager_task
+@requires(data=[])
+@outputs(data=[str, str, str])
+def block_structural_break(pipe, require, output, config=None):
+    """ Test all pixels for a structural break at once
+
+    Tests requiring a design matrix (``cusum_OLS`` and ``cusum_recursive``)
+    should be passed both ``X`` and ``Y`` arguments in ``require``,
+    interpreted as:
+
+    .. code-block:: python
+
+        X, Y = require[0], require[1]
+
+    The ``ewma`` test only requires ``Y``. Pixels with NaN in ``Y`` are not
+    tested, and have a NaN score, an index of -1, and are not significant.
+
+    Args:
+        pipe (yatsm.pipeline.Pipe): Piped data to operate on
+        require (dict[str, list[str]]): Labels for the requirements of this
+            calculation
+        output (dict[str, list[str]]): Labels for the test ``score``, the
+            index of the change along ``time``, and significance of the test
+        config (dict): Configuration containing the ``method`` (one of
+            ``cusum_OLS``, ``cusum_recursive``, or ``ewma``) and, optionally,
+            keyword arguments to the test in ``kwargs``
+
+    Returns:
+        yatsm.pipeline.Pipe: Piped output
+
+    """
+    func, has_X = _STRUCTURAL_BREAK_TESTS[config['method']]
+    kwargs = config.get('kwargs', {})
+
+    Y = pipe.data[require['data'][1 if has_X else 0]]
+    dims = [d for d in Y.dims if d != 'time']
+    Y = Y.transpose(*(dims + ['time']))
+    values = Y.values.reshape(-1, Y['time'].size)
+    complete = np.all(np.isfinite(values), axis=1)
+
+    if has_X:
+        result = func(pipe.data[require['data'][0]], values[complete],
+                      **kwargs)
+    else:
+        result = func(values[complete], **kwargs)
+
+    coords = [Y[d] for d in dims]
+    for name, value, fill in zip(output['data'],
+                                 ('score', 'index', 'signif'),
+                                 (np.nan, -1, False)):
+        out = np.full(complete.size, fill,
+                      dtype=getattr(result, value).dtype)
+        out[complete] = getattr(result, value)
+        pipe.data[name] = xr.DataArray(out.reshape(Y.shape[:-1]),
+                                       coords, dims)
 
     return pipe
@@ -0,0 +1,69 @@
+""" Phenology tasks
+
+* ``block_longtermmean_phenology``: Long term mean phenology of the segments
+  of all pixels at once
+"""
+import numpy.lib.recfunctions as nprf
+import pandas as pd
+
+from yatsm.phenology.longtermmean import longtermmeanphenology_block
+from yatsm.pipeline.language import RECORD
+from yatsm.pipeline.tasks._validation import (eager_task, outputs, requires,
+                                              version)
+
+
+@version('block_longtermmean_phenology:1.0.0')
+@eager_task
+@requires(data=[str], record=[str])
+@outputs(record=[str])
+def block_longtermmean_phenology(pipe, require, output, config=None):
+    """ Calculate long term mean phenology metrics of each segment
+
+    See :func:`yatsm.phenology.longtermmean.longtermmeanphenology_block`.
+    Users should pass to ``require`` the EVI data and the record of segments
+    to calculate phenology for. The output record is a copy of the required
+    record with additional phenology fields (see
+    :data:`yatsm.phenology.longtermmean.PHENOLOGY_DTYPE`).
+
+    Args:
+        pipe (yatsm.pipeline.Pipe): Piped data to operate on
+        require (dict[str, list[str]]): Labels for the requirements of this
+            calculation
+        output (dict[str, list[str]]): Label for the result of this
+            calculation
+        config (dict): Configuration containing, optionally, the ``scale``
+            factor to transform EVI into [0, 1] (default: 1), and the
+            ``year_interval``, ``q_min``, ``q_max``, and ``spar`` used to
+            calculate phenology
+
+    Returns:
+        yatsm.pipeline.Pipe: Piped output
+
+    Raises:
+        KeyError: if a record's pixel is not in the EVI data
+
+    """
+    config = config or {}
+    evi = pipe.data[require['data'][0]].transpose('y', 'x', 'time')
+    n_y, n_x, n_time = evi.shape
+
+    record = pipe.record[require[RECORD][0]]
+    iy = pd.Index(evi.y.values).get_indexer(record['py'])
+    ix = pd.Index(evi.x.values).get_indexer(record['px'])
+    unmatched = (iy < 0) | (ix < 0)
+    if unmatched.any():
+        raise KeyError('{0} record(s) are of pixels not in the EVI data'
+                       .format(unmatched.sum()))
+    pixel = iy * n_x + ix
+
+    pheno = longtermmeanphenology_block(
+        evi.values.reshape(n_y * n_x, n_time) * config.get('scale', 1.0),
+        pipe.data['ordinal'].values, pixel, record['start'], record['end'],
+        year_interval=config.get('year_interval', 3),
+        q_min=config.get('q_min', 10.), q_max=config.get('q_max', 90.),
+        spar=config.get('spar', 0.55))
+
+    pipe.record[output[RECORD][0]] = nprf.merge_arrays(
+        (record, pheno), flatten=True, usemask=False)
+
+    return pipe
@@ -6,4 +6,145 @@
   design matrices
 * ``transform_harmonic``: Convert design matrix specification of Fourier series
   to be in terms of amplitude and phase
+* ``block_omission_test``: Test segments of all pixels for omitted changes
+* ``block_refit``: Re-estimate segment models of all pixels at once
 """
+import numpy as np
+import numpy.lib.recfunctions as nprf
+from sklearn.linear_model import LinearRegression
+
+from yatsm.algorithms.postprocess import omission_test_block, refit_block
+from yatsm.pipeline.language import RECORD
+from yatsm.pipeline.tasks._validation import (eager_task, outputs, requires,
+                                              version)
+from yatsm.regression import RLM
+
+#: dict: Estimators available to refit segments, by name
+REFIT_ESTIMATORS = {
+    'OLS': LinearRegression,
+    'RLM': RLM
+}
+
+
+def _block_XY(pipe, require):
+    """ Return the design matrix, data of each pixel, and pixel coordinates
+    """
+    X = pipe.data[require['data'][0]]
+    Y = (pipe.data[require['data'][1:]].to_array()
+         .transpose('y', 'x', 'variable', 'time'))
+    n_y, n_x, n_band, n_time = Y.shape
+
+    py, px = [c.ravel() for c in
+              np.meshgrid(Y.y.values, Y.x.values, indexing='ij')]
+    return (X.values, Y.values.reshape(n_y * n_x, n_band, n_time),
+            py, px)
+
+
+@version('block_omission_test:1.0.0')
+@eager_task
+@requires(data=[], record=[str])
+@outputs(record=[str])
+def block_omission_test(pipe, require, output, config=None):
+    """ Test the records of all pixels for omitted structural changes
+
+    See :func:`yatsm.algorithms.postprocess.omission_test_block`. The
+    record may be produced by a change detection task earlier in the
+    pipeline or read from existing results. Users should pass to
+    ``require`` both ``X`` and ``Y`` arguments, which are interpreted as:
+
+    .. code-block:: python
+
+        X, Y = require[0], require[1:]
+
+    The output record is a copy of the required record with an additional
+    boolean ``omission`` field.
+
+    Args:
+        pipe (yatsm.pipeline.Pipe): Piped data to operate on
+        require (dict[str, list[str]]): Labels for the requirements of this
+            calculation
+        output (dict[str, list[str]]): Label for the result of this
+            calculation
+        config (dict): Configuration containing, optionally, the
+            ``test_indices`` (positions in ``Y``, default: all), the
+            critical p-value ``crit`` (default: 0.05), and the ``behavior``
+            for multiple test indices (default: ``ANY``)
+
+    Returns:
+        yatsm.pipeline.Pipe: Piped output
+
+    """
+    config = config or {}
+    X, Y, py, px = _block_XY(pipe, require)
+    indices = config.get('test_indices', np.arange(Y.shape[1]))
+
+    record = pipe.record[require[RECORD][0]]
+    omission = omission_test_block(
+        record, X, Y, pipe.data['ordinal'].values, py, px, indices,
+        crit=config.get('crit', 0.05),
+        behavior=config.get('behavior', 'ANY'))
+
+    pipe.record[output[RECORD][0]] = nprf.append_fields(
+        record, 'omission', omission, usemask=False)
+
+    return pipe
+
+
+@version('block_refit:1.0.0')
+@eager_task
+@requires(data=[], record=[str])
+@outputs(record=[str])
+def block_refit(pipe, require, output, config=None):
+    """ Refit the segments of all pixels with a different estimator
+
+    See :func:`yatsm.algorithms.postprocess.refit_block`. Users should pass
+    to ``require`` both ``X`` and ``Y`` arguments, which are interpreted as:
+
+    .. code-block:: python
+
+        X, Y = require[0], require[1:]
+
+    ``X`` may be a different design matrix than the one used to estimate
+    the required record. The output record is a copy of the required
+    record with additional ``<prefix>_coef`` and ``<prefix>_rmse`` fields.
+
+    Args:
+        pipe (yatsm.pipeline.Pipe): Piped data to operate on
+        require (dict[str, list[str]]): Labels for the requirements of this
+            calculation
+        output (dict[str, list[str]]): Label for the result of this
+            calculation
+        config (dict): Configuration containing the name of the
+            ``estimator`` (one of :data:`REFIT_ESTIMATORS`, default:
+            ``RLM``) and, optionally, keyword arguments to initialize it
+            (``init``) and fit it (``fit``), the ``prefix`` of the refit
+            fields (default: the estimator name in lower case), and
+            ``keep_regularized``
+
+    Returns:
+        yatsm.pipeline.Pipe: Piped output
+
+    """
+    config = config or {}
+    name = config.get('estimator', 'RLM')
+    estimator = REFIT_ESTIMATORS[name](**config.get('init', {}))
+    prefix = config.get('prefix', name.lower())
+
+    X, Y, py, px = _block_XY(pipe, require)
+    record = pipe.record[require[RECORD][0]]
+    coef, rmse = refit_block(
+        record, X, Y, pipe.data['ordinal'].values, py, px, estimator,
+        fitopt=config.get('fit', {}),
+        keep_regularized=config.get('keep_regularized', False))
+
+    refit = np.zeros(record.shape[0], dtype=[
+        (prefix + '_coef', 'float32', coef.shape[1:]),
+        (prefix + '_rmse', 'float32', rmse.shape[1:]),
+    ])
+    refit[prefix + '_coef'] = coef
+    refit[prefix + '_rmse'] = rmse
+
+    pipe.record[output[RECORD][0]] = nprf.merge_arrays(
+        (record, refit), flatten=True, usemask=False)
+
+    return pipe
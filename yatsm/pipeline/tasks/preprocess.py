@@ -52,7 +52,9 @@ def dmatrix(pipe, require, output, config=None):
             calculation
         output (dict[str, list[str]]): Label for the result of this
             calculation
-        config
+        config (dict): Configuration containing the ``design`` string and,
+            optionally, the ``dtype`` of the design matrix (default:
+            ``float64``)
 
     Returns:
         yatsm.pipeline.Pipe: Piped output
@@ -70,6 +72,7 @@ def dmatrix(pipe, require, output, config=None):
 
     coords = (ds['time'], X.design_info.column_names)
     dims = ('time', 'terms')
+    X = np.asarray(X, dtype=config.get('dtype', np.float64))
     pipe.data[output['data'][0]] = xr.DataArray(X, coords, dims)
 
     return pipe
@@ -1,13 +1,20 @@
-from ._recresid import recresid
+from ._recresid import recresid, recresid_batch
+from ._smooth_spline import smooth_spline, smooth_spline_grid
 from .design import design_coefs, design_to_indices
-from .robust_fit import RLM, bisquare
+from .lowess import lowess
+from .robust_fit import RLM, bisquare, rlm_batch
 from .transforms import harm
 
 __all__ = [
     'design_coefs',
     'design_to_indices',
+    'lowess',
     'recresid',
+    'recresid_batch',
     'RLM',
     'bisquare',
+    'rlm_batch',
+    'smooth_spline',
+    'smooth_spline_grid',
     'harm'
 ]
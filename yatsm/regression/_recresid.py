@@ -59,6 +59,63 @@ def _recresid(X, y, span):
     return recresid / np.sqrt(recvar)
 
 
+@try_jit(nopython=True)
+def _recresid_gains(X, span):
+    """ Return the recursive residual update sequence of ``X``
+
+    Returns:
+        tuple: inverse of X'X of the first ``span`` observations, the gain
+            (:math:`S_{r-1}x_r / f_r`) added to the coefficients per unit
+            of prediction error of each observation, and the prediction
+            error variance (:math:`f_r`) of each observation
+
+    """
+    nobs, nvars = X.shape
+
+    gain = np.nan * np.zeros((nobs, nvars))
+    recvar = np.nan * np.zeros((nobs))
+
+    X0 = X[:span, :]
+    XTX_0 = np.linalg.inv(np.dot(X0.T, X0))
+    recvar[span - 1] = 1 + np.dot(X[span - 1, :],
+                                  np.dot(XTX_0, X[span - 1, :]))
+
+    XTX_j = XTX_0
+    for j in range(span, nobs):
+        x_j = X[j, :]
+
+        XTXx_j = np.dot(XTX_j, x_j)
+        f_t = 1 + np.dot(x_j, XTXx_j)
+        XTX_j = XTX_j - np.outer(XTXx_j, XTXx_j) / f_t  # eqn 5.5.15
+
+        gain[j, :] = XTXx_j / f_t
+        recvar[j] = f_t
+
+    return XTX_0, gain, recvar
+
+
+@try_jit(nopython=True)
+def _recresid_batch(X, Y, span):
+    nobs, nvars = X.shape
+    nseries = Y.shape[0]
+
+    XTX_0, gain, recvar = _recresid_gains(X, span)
+    recresid = np.nan * np.zeros((nseries, nobs))
+
+    # Initial fit of all series, as (n_features x n_series)
+    X0 = X[:span, :]
+    beta = np.dot(XTX_0, np.dot(X0.T, Y[:, :span].T))
+
+    for j in range(span - 1, nobs):
+        # Prediction with previous beta
+        resid_j = Y[:, j] - np.dot(X[j, :], beta)
+        recresid[:, j] = resid_j / np.sqrt(recvar[j])
+        if j >= span:
+            beta = beta + np.outer(gain[j, :], resid_j)  # eqn 5.5.14
+
+    return recresid
+
+
 def recresid(X, y, span=None):
     """ Return standardized recursive residuals for y ~ X
 
@@ -135,3 +192,31 @@ def recresid(X, y, span=None):
         rresid = pd.Series(data=rresid, index=index, name='recresid')
 
     return rresid
+
+
+def recresid_batch(X, Y, span=None):
+    """ Return standardized recursive residuals for many series of Y ~ X
+
+    The same as :func:`recresid`, but for all series of ``Y`` at once. The
+    sequence of updates to the inverse of X'X depends only on ``X``, so it
+    is computed once and applied to all series, leaving a rank one update
+    of the coefficients of all series for each observation.
+
+    Args:
+        X (np.ndarray): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray): 2D (n_series x n_obs) independent variables
+        span (int, optional): minimum number of observations for initial
+            regression. If ``span`` is None, use the number of features in
+            ``X``
+
+    Returns:
+        np.ndarray: 2D (n_series x n_obs - span) recursive residuals
+            standardized by prediction error variance
+
+    """
+    if not span:
+        span = X.shape[1]
+    _X = np.asarray(X, dtype=np.float64)
+    _Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+
+    return _recresid_batch(_X, _Y, span)[:, span:]
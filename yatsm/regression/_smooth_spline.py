@@ -0,0 +1,338 @@
+""" Cubic smoothing splines
+
+A NumPy/SciPy equivalent of ``smooth.spline`` from R's ``stats`` package
+for a given smoothing parameter, ``spar``. As in R:
+
+    1. Observations with (nearly) tied ``x`` are combined into their
+       weighted mean
+    2. ``x`` is scaled to [0, 1], and the knots are a subset of the unique
+       ``x`` (or all of them, if there are fewer than 50)
+    3. The coefficients ``c`` of the cubic B-spline basis ``B`` minimize the
+       penalized residual sum of squares, solving the banded system:
+
+       .. math::
+
+            (B^{\\prime}WB + \\lambda \\Omega) c = B^{\\prime}Wy
+
+       where :math:`\\Omega` is the integrated product of the second
+       derivatives of the basis, and
+       :math:`\\lambda = r 256^{3 spar - 1}` with
+       :math:`r = tr(B^{\\prime}WB) / tr(\\Omega)` (see ``?smooth.spline``)
+    4. Predictions outside of the range of ``x`` are linearly extrapolated
+
+Many series summarized on a shared grid of ``x`` may share the same knots
+and basis, and have their penalized systems solved together (see
+:func:`smooth_spline_grid`).
+"""
+from __future__ import division
+
+import numpy as np
+from scipy.linalg import solveh_banded
+
+#: int: Degree of the spline
+_DEGREE = 3
+
+
+def _nknots(n):
+    """ Number of knots used for ``n`` unique ``x`` (R's ``.nknots.smspl``)
+    """
+    if n < 50:
+        return n
+    a1, a2, a3, a4 = np.log2([50, 100, 140, 200])
+    if n < 200:
+        nk = 2 ** (a1 + (a2 - a1) * (n - 50) / 150)
+    elif n < 800:
+        nk = 2 ** (a2 + (a3 - a2) * (n - 200) / 600)
+    elif n < 3200:
+        nk = 2 ** (a3 + (a4 - a3) * (n - 800) / 2400)
+    else:
+        nk = 200 + (n - 3200) ** 0.2
+    return int(nk)
+
+
+def _knots(xbar, all_knots=False):
+    """ Return the knot sequence for sorted, unique ``xbar`` in [0, 1]
+    """
+    n = xbar.size
+    nknots = n if all_knots else _nknots(n)
+    if nknots < n:
+        # Same truncation of ``seq.int(1, n, length.out=nknots)`` as R
+        idx = (1 + np.arange(nknots) * ((n - 1) / (nknots - 1))).astype(int)
+        idx[-1] = n
+        inner = xbar[idx - 1]
+    else:
+        inner = xbar
+    return np.concatenate((np.repeat(xbar[0], _DEGREE), inner,
+                           np.repeat(xbar[-1], _DEGREE)))
+
+
+def _safe_divide(a, b):
+    """ Return ``a / b``, or 0 where ``b`` is 0 (i.e., repeated knots)
+    """
+    return np.where(b > 0, a / np.where(b > 0, b, 1), 0.)
+
+
+def _bspline_basis(t, x, deriv=0):
+    """ Evaluate all cubic B-spline basis functions (or derivatives)
+
+    Args:
+        t (np.ndarray): Knot sequence, with boundary knots repeated
+            ``_DEGREE + 1`` times
+        x (np.ndarray): 1D values within ``[t[0], t[-1]]`` to evaluate
+        deriv (int): Order of derivative
+
+    Returns:
+        np.ndarray: 2D (n_x x n_basis) basis functions evaluated at ``x``
+    """
+    x = np.asarray(x, dtype=np.float64)[:, None]
+    B = ((t[:-1] <= x) & (x < t[1:])).astype(np.float64)
+    # Include the right end of the last interval
+    last = np.flatnonzero(t[:-1] < t[1:])[-1]
+    B[x[:, 0] == t[last + 1], last] = 1.
+
+    # Cox-de Boor recursion, or differentiation, of one degree at a time
+    for p in range(1, _DEGREE + 1):
+        m = t.size - p - 1
+        d1 = t[p:p + m] - t[:m]
+        d2 = t[p + 1:] - t[1:m + 1]
+        if p <= _DEGREE - deriv:
+            B = (_safe_divide(x - t[:m], d1) * B[:, :-1] +
+                 _safe_divide(t[p + 1:] - x, d2) * B[:, 1:])
+        else:
+            B = p * (_safe_divide(1., d1) * B[:, :-1] -
+                     _safe_divide(1., d2) * B[:, 1:])
+    return B
+
+
+def _penalty(t):
+    """ Integrated products of the second derivatives of the basis
+
+    The second derivatives are linear between knots, ``fa + s * d`` for
+    ``s`` in [0, 1], so their products are integrated in closed form on each
+    interval. As in R's ``sgram``, the integral of ``s ** 2`` is taken as
+    0.333 rather than 1/3.
+
+    Args:
+        t (np.ndarray): Knot sequence
+
+    Returns:
+        np.ndarray: 2D (n_basis x n_basis) penalty matrix
+    """
+    a, b = t[:-1], t[1:]
+    a, b = a[b > a], b[b > a]
+    fa, fb = (_bspline_basis(t, _x, deriv=2) for _x in (a, b))
+    d = fb - fa
+    h = (b - a)[:, None]
+    cross = np.dot((h * fa).T, d)
+    return (np.dot((h * fa).T, fa) + (cross + cross.T) * 0.5 +
+            np.dot((h * d).T, d) * 0.333)
+
+
+def _to_banded(A, u=_DEGREE):
+    """ Return the upper diagonals of ``A`` in banded storage
+    """
+    ab = np.zeros((u + 1, A.shape[0]))
+    for d in range(u + 1):
+        ab[u - d, d:] = np.diagonal(A, d)
+    return ab
+
+
+def _predict_basis(t, xs):
+    """ Basis of predictions at scaled ``xs``
+
+    Outside of [0, 1], predictions are linear extrapolations from the value
+    and first derivative of the spline at the boundary.
+    """
+    xc = np.clip(xs, 0, 1)
+    B = _bspline_basis(t, xc)
+    extrap = xs != xc
+    if extrap.any():
+        B[extrap] += (_bspline_basis(t, xc[extrap], deriv=1) *
+                      (xs - xc)[extrap, None])
+    return B
+
+
+def _solveh_banded_batch(ab, b):
+    """ Solve many symmetric, positive definite, banded systems at once
+
+    A Cholesky decomposition, :math:`A = U^{\\prime}U`, and substitution
+    vectorized over the first dimension of ``ab`` and ``b``.
+
+    Args:
+        ab (np.ndarray): 3D (n_sys x u + 1 x n) upper diagonals of each
+            system, stored as for :func:`scipy.linalg.solveh_banded`
+        b (np.ndarray): 2D (n_sys x n) right hand side of each system
+
+    Returns:
+        np.ndarray: 2D (n_sys x n) solutions
+    """
+    u, n = ab.shape[1] - 1, ab.shape[2]
+
+    # ``U[:, d, j]`` is element ``(j, j + d)`` of each ``U``
+    U = np.zeros_like(ab)
+    for j in range(n):
+        for d in range(min(u, n - 1 - j) + 1):
+            i = j + d
+            s = ab[:, u - d, i].copy()
+            for k in range(max(0, i - u), j):
+                s -= U[:, j - k, k] * U[:, i - k, k]
+            if d == 0:
+                U[:, 0, j] = np.sqrt(s)
+            else:
+                U[:, d, j] = s / U[:, 0, j]
+
+    z = np.empty_like(b, dtype=np.float64)
+    for j in range(n):
+        s = b[:, j].copy()
+        for k in range(max(0, j - u), j):
+            s -= U[:, j - k, k] * z[:, k]
+        z[:, j] = s / U[:, 0, j]
+
+    c = np.empty_like(z)
+    for j in range(n - 1, -1, -1):
+        s = z[:, j].copy()
+        for i in range(j + 1, min(n, j + u + 1)):
+            s -= U[:, i - j, j] * c[:, i]
+        c[:, j] = s / U[:, 0, j]
+
+    return c
+
+
+def smooth_spline(x, y, w=None, spar=0.55, all_knots=False, lambda_=None):
+    """ Return a prediction function for a cubic smoothing spline
+
+    Equivalent to ``smooth.spline(x, y, w, spar=spar, all.knots=all_knots)``
+    (or ``lambda=lambda_``) in R, without requiring R. Many series sharing
+    the same ``x`` can be smoothed at once.
+
+    Args:
+        x (np.ndarray): 1D (n_obs) independent variable
+        y (np.ndarray): 1D (n_obs) or 2D (n_series x n_obs) dependent
+            variable
+        w (np.ndarray): 1D (n_obs) weights of observations. Defaults to 1
+        spar (float): smoothing parameter, typically (but not necessarily)
+            in (0, 1]
+        all_knots (bool): Use all unique ``x`` as knots instead of a subset
+        lambda_ (float): penalty of the spline, used instead of ``spar`` if
+            provided
+
+    Returns:
+        callable: prediction function of smoothing spline that provides
+            smoothed estimates of the dependent variable given an input
+            independent variable array, shaped as 1D (n) or 2D (n_series x
+            n) if ``y`` is 2D
+
+    Raises:
+        ValueError: if there are fewer than four unique ``x``, or ``w`` is
+            negative or entirely zero
+
+    Example:
+      Fit a smoothing spline for y ~ x and predict for days in year:
+
+        .. code-block:: python
+
+            pred_spl = smooth_spline(x, y)
+            y_smooth = pred_spl(np.arange(1, 366))
+
+    """
+    x = np.asarray(x, dtype=np.float64).ravel()
+    y = np.asarray(y, dtype=np.float64)
+    _y = np.atleast_2d(y)
+    if w is None:
+        w = np.ones_like(x)
+    else:
+        w = np.asarray(w, dtype=np.float64)
+        if (w < 0).any() or not (w > 0).any():
+            raise ValueError('Weights must be non-negative and some must '
+                             'be positive')
+        w = w * (w > 0).sum() / w.sum()
+
+    # Combine observations with ``x`` tied within tolerance
+    tol = 1e-6 * np.subtract(*np.percentile(x, [75, 25]))
+    if not tol > 0:
+        raise ValueError('Interquartile range of `x` must be positive')
+    _, first, inverse = np.unique(np.round((x - x.mean()) / tol),
+                                  return_index=True, return_inverse=True)
+    if first.size < 4:
+        raise ValueError('Need at least four unique `x` values')
+    ux = x[first]
+    wbar = np.bincount(inverse, weights=w)
+    wy = np.zeros((_y.shape[0], ux.size))
+    np.add.at(wy, (slice(None), inverse), w * _y)
+
+    x_min, x_range = ux[0], ux[-1] - ux[0]
+    t = _knots((ux - x_min) / x_range, all_knots=all_knots)
+
+    B = _bspline_basis(t, (ux - x_min) / x_range)
+    XTWX = np.dot(B.T * wbar, B)
+    omega = _penalty(t)
+
+    if lambda_ is None:
+        n_basis = B.shape[1]
+        ratio = (np.diagonal(XTWX)[2:n_basis - 3].sum() /
+                 np.diagonal(omega)[2:n_basis - 3].sum())
+        lambda_ = ratio * 256 ** (3 * spar - 1)
+
+    coef = solveh_banded(_to_banded(XTWX + lambda_ * omega),
+                         np.dot(B.T, wy.T))
+
+    def predict(_x):
+        xs = (np.asarray(_x, dtype=np.float64).ravel() - x_min) / x_range
+        pred = np.dot(coef.T, _predict_basis(t, xs).T)
+        return pred if y.ndim > 1 else pred[0]
+
+    return predict
+
+
+def smooth_spline_grid(x, w, wy, spar=0.55, all_knots=False):
+    """ Return a prediction function for smoothing splines of many series
+    observed on a shared grid
+
+    Each series is summarized by the total weight, ``w``, and the weighted
+    sum, ``wy``, of its observations at each ``x`` of the grid. The knots and
+    basis are chosen from the entire grid and shared by all series, so the
+    spline of each series is that of ``smooth.spline(x, wy / w, w=w)`` in R,
+    where ``x`` with zero weight still determine the knots. The penalized
+    systems of all series are solved at once.
+
+    Args:
+        x (np.ndarray): 1D (n_x) sorted and unique grid
+        w (np.ndarray): 2D (n_series x n_x) total weight of the
+            observations of each series at each ``x``
+        wy (np.ndarray): 2D (n_series x n_x) weighted sum of the
+            observations of each series at each ``x``
+        spar (float): smoothing parameter, typically (but not necessarily)
+            in (0, 1]
+        all_knots (bool): Use all ``x`` as knots instead of a subset
+
+    Returns:
+        callable: prediction function of the smoothing splines that provides
+            2D (n_series x n) smoothed estimates given an input independent
+            variable array
+
+    """
+    x = np.asarray(x, dtype=np.float64)
+    w, wy = np.atleast_2d(w), np.atleast_2d(wy)
+
+    x_min, x_range = x[0], x[-1] - x[0]
+    t = _knots((x - x_min) / x_range, all_knots=all_knots)
+    B = _bspline_basis(t, (x - x_min) / x_range)
+    omega = _penalty(t)
+
+    n_basis = B.shape[1]
+    ab = np.zeros((w.shape[0], _DEGREE + 1, n_basis))
+    for d in range(_DEGREE + 1):
+        ab[:, _DEGREE - d, d:] = np.dot(w, B[:, :n_basis - d] * B[:, d:])
+
+    ratio = (ab[:, _DEGREE, 2:n_basis - 3].sum(axis=1) /
+             np.diagonal(omega)[2:n_basis - 3].sum())
+    lambda_ = ratio * 256 ** (3 * spar - 1)
+    ab += lambda_[:, None, None] * _to_banded(omega)
+
+    coef = _solveh_banded_batch(ab, np.dot(wy, B))
+
+    def predict(_x):
+        xs = (np.asarray(_x, dtype=np.float64).ravel() - x_min) / x_range
+        return np.dot(coef, _predict_basis(t, xs).T)
+
+    return predict
@@ -0,0 +1,302 @@
+""" Locally weighted scatterplot smoothing (LOWESS)
+
+A port of :func:`statsmodels.nonparametric.smoothers_lowess.lowess` that
+Numba can compile entirely, and that smooths many series sharing the same
+``x`` in one call. The algorithm follows ``statsmodels`` step for step,
+including the definition of ``frac`` and ``delta``, the robustifying
+iterations, and returning NaN for fits whose neighborhood has no spread.
+
+Without Numba, the fits of every series are instead computed together with
+array operations, since the neighborhoods of each fit depend only on ``x``.
+"""
+from __future__ import division
+
+# Don't alias to ``np`` until fix is implemented
+# https://github.com/numba/numba/issues/1559
+import numpy
+
+from yatsm.accel import has_numba, try_jit
+from yatsm.regression.robust_fit import _select_median
+
+
+@try_jit(nopython=True)
+def _lowess(x, y, frac, it, delta, y_fit, weights, resid_weights):
+    """ LOWESS of ``y`` on sorted ``x``, storing results in ``y_fit``
+
+    Args:
+        x (np.ndarray): sorted independent variable
+        y (np.ndarray): dependent variable
+        frac (float): fraction of data used to estimate each value
+        it (int): number of robustifying iterations
+        delta (float): distance within which to linearly interpolate
+            instead of fitting a regression
+        y_fit (np.ndarray): output array for smoothed values
+        weights (np.ndarray): workspace for regression weights
+        resid_weights (np.ndarray): workspace for robustifying weights
+
+    """
+    n = x.size
+    k = int(frac * n + 1e-10)
+
+    for robiter in range(it + 1):
+        i = 0
+        last_fit_i = -1
+        left_end, right_end = 0, k
+        y_fit[:] = 0.0
+
+        while True:
+            # Shift neighborhood right until x[right_end] is further from
+            # x[i] than x[left_end]
+            while (right_end < n and
+                   x[i] > (x[left_end] + x[right_end]) / 2.0):
+                left_end += 1
+                right_end += 1
+            radius = max(x[i] - x[left_end], x[right_end - 1] - x[i])
+
+            # Tricube weights, times robustifying weights. Without spread,
+            # distances (and so the fit) are NaN
+            sum_weights = 0.0
+            if radius > 0:
+                for j in range(left_end, right_end):
+                    d = abs(x[j] - x[i]) / radius
+                    d = 1.0 - d * d * d
+                    weights[j] = d * d * d
+                    if robiter > 0:
+                        weights[j] *= resid_weights[j]
+                    sum_weights += weights[j]
+
+            # Weighted linear regression, which is NaN if all weight is on
+            # one value of x
+            y_fit[i] = numpy.nan
+            if sum_weights > 0.0:
+                sum_weighted_x = 0.0
+                for j in range(left_end, right_end):
+                    weights[j] /= sum_weights
+                    sum_weighted_x += weights[j] * x[j]
+                weighted_sqdev_x = 0.0
+                for j in range(left_end, right_end):
+                    weighted_sqdev_x += (weights[j] *
+                                         (x[j] - sum_weighted_x) ** 2)
+                if weighted_sqdev_x > 0.0:
+                    fit = 0.0
+                    for j in range(left_end, right_end):
+                        fit += (weights[j] *
+                                (1.0 + (x[i] - sum_weighted_x) *
+                                 (x[j] - sum_weighted_x) /
+                                 weighted_sqdev_x) *
+                                y[j])
+                    y_fit[i] = fit
+
+            # Linearly interpolate fits skipped within delta
+            if last_fit_i < i - 1:
+                b = x[i] - x[last_fit_i]
+                for j in range(last_fit_i + 1, i):
+                    a = (x[j] - x[last_fit_i]) / b
+                    y_fit[j] = a * y_fit[i] + (1.0 - a) * y_fit[last_fit_i]
+
+            # Skip to the last point within delta, copying fits of ties
+            last_fit_i = i
+            cutpoint = x[i] + delta
+            j = last_fit_i + 1
+            while j < n:
+                if x[j] > cutpoint:
+                    break
+                if x[j] == x[last_fit_i]:
+                    y_fit[j] = y_fit[last_fit_i]
+                    last_fit_i = j
+                j += 1
+            i = max(min(j, n - 1) - 1, last_fit_i + 1)
+
+            if last_fit_i >= n - 1:
+                break
+
+        if robiter < it:
+            # Bisquare weights of residuals scaled by 6 * their median
+            has_nan = False
+            for j in range(n):
+                resid_weights[j] = abs(y[j] - y_fit[j])
+                if numpy.isnan(resid_weights[j]):
+                    has_nan = True
+            if has_nan:
+                median = numpy.nan
+            else:
+                median = _select_median(resid_weights.copy())
+
+            for j in range(n):
+                r = resid_weights[j]
+                if median == 0:
+                    if r > 0:
+                        r = 1.0
+                else:
+                    r /= 6.0 * median
+                if r >= 1.0:
+                    r = 1.0
+                r = 1.0 - r * r
+                resid_weights[j] = r * r
+
+
+@try_jit(nopython=True)
+def _lowess_rows(x, Y, frac, it, delta):
+    """ LOWESS of each row of ``Y`` on sorted ``x``
+    """
+    n_series, n = Y.shape
+    out = numpy.empty((n_series, n))
+    weights = numpy.empty(n)
+    resid_weights = numpy.empty(n)
+    for s in range(n_series):
+        _lowess(x, Y[s], frac, it, delta, out[s], weights, resid_weights)
+    return out
+
+
+def _lowess_neighborhoods(x, k, delta):
+    """ Find the points of sorted ``x`` that LOWESS fits, and how the fits
+    of all points are found from them
+
+    Follows the same steps as :func:`_lowess`, which depend only on ``x``.
+
+    Args:
+        x (np.ndarray): sorted independent variable
+        k (int): number of observations in each neighborhood
+        delta (float): distance within which to linearly interpolate
+            instead of fitting a regression
+
+    Returns:
+        tuple (np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray):
+        Indices of ``x`` fit and the left end of their neighborhoods, and for
+        all points, the fits interpolated between (``lo`` and ``hi``) and the
+        weight given to ``hi``
+
+    """
+    n = x.size
+    fit_i, left = [], []
+    lo, hi = numpy.zeros(n, dtype=numpy.intp), numpy.zeros(n, dtype=numpy.intp)
+    a = numpy.zeros(n)
+
+    i, last_fit_i = 0, -1
+    left_end, right_end = 0, k
+    while True:
+        while (right_end < n and
+               x[i] > (x[left_end] + x[right_end]) / 2.0):
+            left_end += 1
+            right_end += 1
+        f = len(fit_i)
+        fit_i.append(i)
+        left.append(left_end)
+        lo[i] = hi[i] = f
+
+        # Interpolate between this fit and the last
+        if last_fit_i < i - 1:
+            lo[last_fit_i + 1:i], hi[last_fit_i + 1:i] = f - 1, f
+            a[last_fit_i + 1:i] = ((x[last_fit_i + 1:i] - x[last_fit_i]) /
+                                   (x[i] - x[last_fit_i]))
+
+        # Ties share the same fit
+        last_fit_i = i
+        cutpoint = x[i] + delta
+        j = last_fit_i + 1
+        while j < n:
+            if x[j] > cutpoint:
+                break
+            if x[j] == x[last_fit_i]:
+                lo[j] = hi[j] = f
+                last_fit_i = j
+            j += 1
+        i = max(min(j, n - 1) - 1, last_fit_i + 1)
+
+        if last_fit_i >= n - 1:
+            break
+
+    return (numpy.array(fit_i, dtype=numpy.intp),
+            numpy.array(left, dtype=numpy.intp), lo, hi, a)
+
+
+def _lowess_vectorized(x, Y, frac, it, delta):
+    """ LOWESS of each row of ``Y`` on sorted ``x``, fitting all series
+    together using array operations
+    """
+    n = x.size
+    k = int(frac * n + 1e-10)
+    fit_i, left, lo, hi, a = _lowess_neighborhoods(x, k, delta)
+    window = left[:, None] + numpy.arange(k)
+    xi, xw, Yw = x[fit_i, None], x[window], Y[:, window]
+
+    # Tricube weights, which are all zero without spread
+    radius = numpy.maximum(x[fit_i] - x[left], x[left + k - 1] - x[fit_i])
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        d = numpy.abs(xw - xi) / radius[:, None]
+        tricube = numpy.where(radius[:, None] > 0, (1.0 - d ** 3) ** 3, 0.0)
+
+    resid_weights = numpy.ones_like(Y)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        for robiter in range(it + 1):
+            # Weighted linear regression of each neighborhood
+            weights = tricube * resid_weights[:, window]
+            sum_weights = weights.sum(axis=2)
+            weights /= sum_weights[..., None]
+            sum_weighted_x = (weights * xw).sum(axis=2)[..., None]
+            weighted_sqdev_x = (weights * (xw - sum_weighted_x) ** 2).sum(2)
+            fit = (weights *
+                   (1.0 + (xi - sum_weighted_x) * (xw - sum_weighted_x) /
+                    weighted_sqdev_x[..., None]) *
+                   Yw).sum(axis=2)
+            fit = numpy.where((sum_weights > 0) & (weighted_sqdev_x > 0),
+                              fit, numpy.nan)
+            y_fit = (1.0 - a) * fit[:, lo] + a * fit[:, hi]
+
+            if robiter < it:
+                # Bisquare weights of residuals scaled by 6 * their median
+                resid = numpy.abs(Y - y_fit)
+                median = numpy.median(resid, axis=1)[:, None]
+                r = numpy.where(median == 0, (resid > 0).astype(float),
+                                resid / (6.0 * median))
+                r = numpy.minimum(r, 1.0)
+                resid_weights = (1.0 - r * r) ** 2
+
+    return y_fit
+
+
+def lowess(x, Y, frac=2.0 / 3.0, it=3, delta=0.0):
+    """ Locally weighted scatterplot smoothing (LOWESS) of one or more series
+
+    Equivalent to calling
+    :func:`statsmodels.nonparametric.smoothers_lowess.lowess` for each
+    series with ``return_sorted=False``, but compiled by Numba when
+    available. Observations with tied ``x`` are kept in their input
+    order.
+
+    Args:
+        x (np.ndarray): 1D (n_obs) independent variable (e.g., ordinal
+            dates) without NaN
+        Y (np.ndarray): 1D (n_obs) or 2D (n_series x n_obs) dependent
+            variable(s) without NaN
+        frac (float): fraction of data used to estimate each value
+            (default: 2/3)
+        it (int): number of robustifying iterations (default: 3)
+        delta (float): distance within which to linearly interpolate
+            instead of fitting a regression (default: 0.0)
+
+    Returns:
+        np.ndarray: smoothed values of ``Y``, in the same shape and order.
+        Values are NaN if a neighborhood has no spread in ``x``
+
+    """
+    x = numpy.asarray(x, dtype=numpy.float64)
+    Y = numpy.asarray(Y, dtype=numpy.float64)
+    _Y = numpy.atleast_2d(Y)
+
+    order = None
+    if numpy.any(x[1:] < x[:-1]):
+        order = numpy.argsort(x, kind='mergesort')
+        x, _Y = x[order], _Y[:, order]
+
+    if has_numba:
+        fit = _lowess_rows(x, numpy.ascontiguousarray(_Y), frac, it, delta)
+    else:
+        fit = _lowess_vectorized(x, _Y, frac, it, delta)
+
+    if order is not None:
+        _fit = numpy.empty_like(fit)
+        _fit[:, order] = fit
+        fit = _fit
+
+    return fit.reshape(Y.shape)
@@ -0,0 +1,164 @@
+""" Ordinary least squares from running sufficient statistics
+
+The least squares solution of ``Y ~ X`` only depends on the sufficient
+statistics :math:`X^{\\prime}X`, :math:`X^{\\prime}y`, :math:`y^{\\prime}y`,
+and, to estimate an intercept, the column sums of ``X`` and ``y`` and the
+number of observations. These statistics can be updated in
+:math:`O(p^2)` as observations are added to or removed from a regression,
+rather than refitting the entire regression in :math:`O(np^2)`.
+"""
+from __future__ import division
+
+import numpy as np
+
+
+class OLSStatistics(object):
+    """ Running sufficient statistics of an OLS regression of many series
+
+    All series share the same design matrix, so the statistics for each
+    series are stored together.
+
+    Args:
+        n_features (int): Number of features (columns) in the design matrix
+        n_series (int): Number of series to regress
+
+    Attributes:
+        n (int): Number of observations
+        XTX (np.ndarray): 2D (n_features x n_features) cross product of ``X``
+        XTY (np.ndarray): 2D (n_features x n_series) cross product of ``X``
+            and ``Y``
+        YTY (np.ndarray): 1D (n_series) sum of squares of ``Y``
+        sum_X (np.ndarray): 1D (n_features) column sums of ``X``
+        sum_Y (np.ndarray): 1D (n_series) sums of ``Y``
+
+    """
+    def __init__(self, n_features, n_series):
+        self.n = 0
+        self.XTX = np.zeros((n_features, n_features))
+        self.XTY = np.zeros((n_features, n_series))
+        self.YTY = np.zeros(n_series)
+        self.sum_X = np.zeros(n_features)
+        self.sum_Y = np.zeros(n_series)
+
+    @classmethod
+    def from_data(cls, X, Y):
+        """ Return statistics calculated from some data
+
+        Args:
+            X (np.ndarray): 2D (n_obs x n_features) design matrix
+            Y (np.ndarray): 2D (n_series x n_obs) dependent variables
+
+        Returns:
+            OLSStatistics: Sufficient statistics of ``Y ~ X``
+        """
+        stats = cls(X.shape[1], Y.shape[0])
+        return stats.update(X, Y)
+
+    def update(self, X, Y):
+        """ Add observations to the statistics
+
+        Args:
+            X (np.ndarray): 2D (n_obs x n_features) design matrix
+            Y (np.ndarray): 2D (n_series x n_obs) dependent variables
+
+        Returns:
+            OLSStatistics: ``self``, updated
+        """
+        return self._add(X, Y, 1)
+
+    def downdate(self, X, Y):
+        """ Remove observations from the statistics
+
+        Args:
+            X (np.ndarray): 2D (n_obs x n_features) design matrix
+            Y (np.ndarray): 2D (n_series x n_obs) dependent variables
+
+        Returns:
+            OLSStatistics: ``self``, updated
+        """
+        return self._add(X, Y, -1)
+
+    def __add__(self, other):
+        """ Return statistics of the observations in ``self`` and ``other``
+        """
+        stats = OLSStatistics(*self.XTY.shape)
+        for attr in ('n', 'XTX', 'XTY', 'YTY', 'sum_X', 'sum_Y'):
+            setattr(stats, attr, getattr(self, attr) + getattr(other, attr))
+        return stats
+
+    def _add(self, X, Y, sign):
+        # Accumulate in double precision, even from single precision data
+        X = np.asarray(X, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        self.n += sign * X.shape[0]
+        self.XTX += sign * np.dot(X.T, X)
+        self.XTY += sign * np.dot(X.T, Y.T)
+        self.YTY += sign * (Y ** 2).sum(axis=1)
+        self.sum_X += sign * X.sum(axis=0)
+        self.sum_Y += sign * Y.sum(axis=1)
+        return self
+
+    def solve(self, fit_intercept=False):
+        """ Return least squares estimates
+
+        Args:
+            fit_intercept (bool): Estimate an intercept in addition to the
+                coefficients of the design matrix (as in
+                :class:`sklearn.linear_model.LinearRegression`)
+
+        Returns:
+            tuple (np.ndarray, np.ndarray, np.ndarray): Coefficients (n_series
+            x n_features), intercepts (n_series), and RMSE (n_series)
+        """
+        return ols_solve(self.XTX, self.XTY, self.YTY, self.n,
+                         self.sum_X, self.sum_Y, fit_intercept=fit_intercept)
+
+
+def ols_solve(XTX, XTY, YTY, n, sum_X=None, sum_Y=None, fit_intercept=False):
+    """ Solve the normal equations of an OLS regression of many series
+
+    Columns are scaled to unit diagonal before solving to limit the loss of
+    precision for design matrices with columns of very different magnitudes
+    (e.g., an intercept and ordinal dates), and a pseudo-inverse is used so
+    rank deficient designs return the minimum norm solution, as with
+    :func:`numpy.linalg.lstsq`.
+
+    Args:
+        XTX (np.ndarray): 2D (n_features x n_features) cross product of ``X``
+        XTY (np.ndarray): 2D (n_features x n_series) cross product of ``X``
+            and ``Y``
+        YTY (np.ndarray): 1D (n_series) sum of squares of ``Y``
+        n (int): Number of observations
+        sum_X (np.ndarray): 1D (n_features) column sums of ``X``. Required if
+            ``fit_intercept``
+        sum_Y (np.ndarray): 1D (n_series) sums of ``Y``. Required if
+            ``fit_intercept``
+        fit_intercept (bool): Estimate an intercept in addition to the
+            coefficients of the design matrix
+
+    Returns:
+        tuple (np.ndarray, np.ndarray, np.ndarray): Coefficients (n_series
+        x n_features), intercepts (n_series), and RMSE (n_series)
+    """
+    if fit_intercept:
+        mean_X, mean_Y = sum_X / n, sum_Y / n
+        XTX = XTX - n * np.outer(mean_X, mean_X)
+        XTY = XTY - n * np.outer(mean_X, mean_Y)
+        YTY = YTY - n * mean_Y ** 2
+
+    scale = np.sqrt(np.diag(XTX))
+    scale[scale == 0] = 1.0
+    beta = (np.dot(np.linalg.pinv(XTX / np.outer(scale, scale)),
+                   XTY / scale[:, None]) /
+            scale[:, None])
+
+    rss = YTY - 2 * (beta * XTY).sum(axis=0) + (beta * np.dot(XTX, beta)
+                                                ).sum(axis=0)
+    rmse = np.sqrt(np.maximum(rss, 0) / n)
+
+    if fit_intercept:
+        intercept = mean_Y - np.dot(mean_X, beta)
+    else:
+        intercept = np.zeros(XTY.shape[1])
+
+    return beta.T, intercept, rmse
@@ -17,7 +17,7 @@ statsmodels and can reach ~4x faster if Numba is available to accelerate.
 import numpy
 import sklearn
 
-from yatsm.accel import try_jit
+from yatsm.accel import has_numba, try_jit
 
 EPS = numpy.finfo('float').eps
 
@@ -42,6 +42,95 @@ def bisquare(resid, c=4.685):
     return (numpy.abs(resid) < c) * (1 - (resid / c) ** 2) ** 2
 
 
+# Median by selection
+@try_jit(nopython=True)
+def _select_median(a):
+    """
+    Returns the median of some data, partially sorting it in place
+
+    Finds the middle value(s) with a quickselect using Hoare's partition and
+    a median of three pivot, which takes linear time on average instead of
+    the :math:`O(n \\log n)` of a full sort.
+
+    Args:
+        a (np.ndarray): 1D array of data (without NaN), which is reordered
+
+    Returns:
+        float: median of ``a``
+
+    """
+    n = a.size
+    if n == 0:
+        return numpy.nan
+    k = n // 2
+
+    lo, hi = 0, n - 1
+    while hi > lo:
+        mid = (lo + hi) // 2
+        if a[mid] < a[lo]:
+            a[mid], a[lo] = a[lo], a[mid]
+        if a[hi] < a[lo]:
+            a[hi], a[lo] = a[lo], a[hi]
+        if a[hi] < a[mid]:
+            a[hi], a[mid] = a[mid], a[hi]
+        pivot = a[mid]
+
+        i, j = lo, hi
+        while i <= j:
+            while a[i] < pivot:
+                i += 1
+            while a[j] > pivot:
+                j -= 1
+            if i <= j:
+                a[i], a[j] = a[j], a[i]
+                i += 1
+                j -= 1
+
+        if k <= j:
+            hi = j
+        elif k >= i:
+            lo = i
+        else:
+            break
+
+    median = a[k]
+    if n % 2 == 0:
+        # Lower middle value is the largest value before ``a[k]``
+        median = (median + a[:k].max()) / 2.0
+
+    return median
+
+
+@try_jit(nopython=True)
+def _select_median_rows(a):
+    """
+    Returns the median of each row of some data, partially sorting each row
+    in place
+
+    Args:
+        a (np.ndarray): 2D array of data (without NaN), which is reordered
+
+    Returns:
+        np.ndarray: median of each row of ``a``
+
+    """
+    out = numpy.empty(a.shape[0])
+    for i in range(a.shape[0]):
+        out[i] = _select_median(a[i])
+    return out
+
+
+# Without Numba, selecting in Python is far slower than sorting with NumPy
+if has_numba:
+    _median, _median_rows = _select_median, _select_median_rows
+else:
+    def _median(a):
+        return numpy.median(a)
+
+    def _median_rows(a):
+        return numpy.median(a, axis=1)
+
+
 @try_jit(nopython=True)
 def mad(x, c=0.6745):
     """
@@ -59,7 +148,7 @@ def mad(x, c=0.6745):
         http://en.wikipedia.org/wiki/Median_absolute_deviation
     """
     # Return median absolute deviation adjusted sigma
-    return numpy.median(numpy.fabs(x)) / c
+    return _median(numpy.fabs(x)) / c
 
 
 # UTILITY FUNCTIONS
@@ -68,9 +157,104 @@ def _check_converge(x0, x, tol=1e-8):
     return not numpy.any(numpy.fabs(x0 - x > tol))
 
 
-# Broadcast on sw prevents nopython
-# TODO: check implementation https://github.com/numba/numba/pull/1542
-@try_jit()
+#: float: Cholesky pivots smaller than this fraction of their diagonal element
+#         of the normal equations are ill-conditioned
+CHOL_TOL = 1e-10
+
+
+@try_jit(nopython=True)
+def _cholesky_fit_inplace(X, y, w, XTWX, beta, resid):
+    """
+    Apply a weighted OLS fit to data, storing results in a workspace
+
+    Solves the weighted normal equations by Cholesky factorization without
+    allocating any arrays, so iteratively reweighted fits can reuse the same
+    workspace. If the normal equations are ill-conditioned, the weighted
+    least squares problem is solved with ``lstsq`` instead.
+
+    Args:
+        X (ndarray): independent variables (n x p)
+        y (ndarray): dependent variable (n)
+        w (ndarray): observation weights (n)
+        XTWX (ndarray): workspace for the normal equations (p x p)
+        beta (ndarray): output array for coefficients (p)
+        resid (ndarray): output array for residuals (n)
+
+    """
+    n, p = X.shape
+
+    # Lower triangle of X'WX and X'Wy
+    XTWX[:, :] = 0.0
+    beta[:] = 0.0
+    for i in range(n):
+        if w[i] == 0:
+            continue
+        for j in range(p):
+            xw = X[i, j] * w[i]
+            beta[j] += xw * y[i]
+            for k in range(j + 1):
+                XTWX[j, k] += xw * X[i, k]
+
+    # Cholesky factorization, L, in place of the lower triangle
+    ok = True
+    for j in range(p):
+        d = XTWX[j, j]
+        for k in range(j):
+            d -= XTWX[j, k] ** 2
+        if d <= CHOL_TOL * XTWX[j, j]:
+            ok = False
+            break
+        XTWX[j, j] = numpy.sqrt(d)
+        for i in range(j + 1, p):
+            v = XTWX[i, j]
+            for k in range(j):
+                v -= XTWX[i, k] * XTWX[j, k]
+            XTWX[i, j] = v / XTWX[j, j]
+
+    if ok:
+        # Solve L z = X'Wy, then L' beta = z
+        for j in range(p):
+            for k in range(j):
+                beta[j] -= XTWX[j, k] * beta[k]
+            beta[j] /= XTWX[j, j]
+        for j in range(p - 1, -1, -1):
+            for k in range(j + 1, p):
+                beta[j] -= XTWX[k, j] * beta[k]
+            beta[j] /= XTWX[j, j]
+    else:
+        sw = numpy.sqrt(w)
+        Xw = numpy.empty((n, p))
+        yw = numpy.empty(n)
+        for i in range(n):
+            for j in range(p):
+                Xw[i, j] = X[i, j] * sw[i]
+            yw[i] = y[i] * sw[i]
+        beta[:] = numpy.linalg.lstsq(Xw, yw, -1.0)[0]
+
+    for i in range(n):
+        resid[i] = y[i]
+        for j in range(p):
+            resid[i] -= X[i, j] * beta[j]
+
+
+def _lstsq_fit_inplace(X, y, w, XTWX, beta, resid):
+    """
+    Apply a weighted OLS fit to data using ``lstsq``, storing results in a
+    workspace (see :func:`_cholesky_fit_inplace`)
+    """
+    sw = numpy.sqrt(w)
+    beta[:] = numpy.linalg.lstsq(X * sw[:, None], y * sw, -1.0)[0]
+    resid[:] = y - numpy.dot(X, beta)
+
+
+# Without Numba, looping in Python is far slower than NumPy's ``lstsq``
+if has_numba:
+    _weight_fit_inplace = _cholesky_fit_inplace
+else:
+    _weight_fit_inplace = _lstsq_fit_inplace
+
+
+@try_jit(nopython=True)
 def _weight_fit(X, y, w):
     """
     Apply a weighted OLS fit to data
@@ -84,18 +268,295 @@ def _weight_fit(X, y, w):
         tuple: coefficients and residual vector
 
     """
-    sw = numpy.sqrt(w)
+    n, p = X.shape
+    XTWX = numpy.empty((p, p))
+    beta = numpy.empty(p)
+    resid = numpy.empty(n)
+    _weight_fit_inplace(X, y, w, XTWX, beta, resid)
 
-    Xw = X * sw[:, None]
-    yw = y * sw
+    return beta, resid
 
-    beta, _, _, _ = numpy.linalg.lstsq(Xw, yw)
 
-    resid = y - numpy.dot(X, beta)
+def _weight_fit_batch(X, Y, W):
+    """
+    Apply a weighted OLS fit to many series sharing the same design matrix
+
+    Each series is solved from its weighted normal equations. If any system
+    is singular, all series are solved with :func:`_weight_fit` instead.
+
+    Args:
+        X (ndarray): 2D (n_obs x n_features) independent variables
+        Y (ndarray): 2D (n_series x n_obs) dependent variables
+        W (ndarray): 2D (n_series x n_obs) observation weights
+
+    Returns:
+        tuple: coefficients (n_series x n_features) and residuals
+            (n_series x n_obs)
+
+    """
+    XTW = X.T[None, :, :] * W[:, None, :]
+    XTWX = numpy.einsum('sfn,nk->sfk', XTW, X)
+    XTWY = numpy.einsum('sfn,sn->sf', XTW, Y)
+    try:
+        beta = numpy.linalg.solve(XTWX, XTWY[:, :, None])[:, :, 0]
+    except numpy.linalg.LinAlgError:
+        beta = numpy.array([_weight_fit(X, y, w)[0] for y, w in zip(Y, W)])
+
+    resid = Y - numpy.dot(beta, X.T)
 
     return beta, resid
 
 
+def _mad_rows(x, c=0.6745):
+    """
+    Returns Median-Absolute-Deviation (MAD) of each row of some data
+
+    Args:
+        x (np.ndarray): 2D array of observations (e.g., residuals)
+        c (float): scale factor to get to ~standard normal (default: 0.6745)
+
+    Returns:
+        np.ndarray: MAD 'robust' standard deviation estimate of each row
+
+    """
+    return _median_rows(numpy.fabs(x)) / c
+
+
+@try_jit(nopython=True)
+def _rlm_bisquare_rows(X, Y, tune, scale_constant, update_scale, maxiter,
+                       tol):
+    """ :func:`rlm_batch` with bisquare weights, fitting one series at a time
+    using the same workspace
+    """
+    n_series, n = Y.shape
+    p = X.shape[1]
+    coef = numpy.empty((n_series, p))
+    weights = numpy.ones((n_series, n))
+    scale = numpy.empty(n_series)
+    XTWX, resid, _coef = numpy.empty((p, p)), numpy.empty(n), numpy.empty(p)
+
+    for s in range(n_series):
+        y, beta, w = Y[s], coef[s], weights[s]
+        _weight_fit_inplace(X, y, w, XTWX, beta, resid)
+        scale[s] = mad(resid, scale_constant)
+        if scale[s] < EPS:
+            continue
+
+        iteration = 1
+        converged = False
+        while not converged and iteration < maxiter:
+            _coef[:] = beta
+            w[:] = bisquare(resid / scale[s], tune)
+            _weight_fit_inplace(X, y, w, XTWX, beta, resid)
+            if update_scale:
+                scale[s] = max(EPS, mad(resid, scale_constant))
+            iteration += 1
+            converged = _check_converge(beta, _coef, tol)
+
+    return coef, weights, scale
+
+
+def rlm_batch(X, Y, M=bisquare, tune=4.685, scale_constant=0.6745,
+              update_scale=True, maxiter=50, tol=1e-8):
+    """ Robust Linear Models of many series sharing a design matrix
+
+    Fits the same model as :class:`RLM` with a ``mad`` scale estimate for
+    every series in ``Y`` at once. With Numba and ``bisquare`` weights, a
+    compiled loop fits each series in turn, reusing one workspace.
+    Otherwise, series are iteratively reweighted together, each with its
+    own weights and scale, until each converges or ``maxiter`` iterations
+    are reached. Only series that have not converged are refit in each
+    iteration.
+
+    Args:
+        X (np.ndarray): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray): 2D (n_series x n_obs) independent variables
+        M (callable): function for scaling residuals
+        tune (float): tuning constant for scale estimate
+        scale_constant (float): normalization constant (default: 0.6745)
+        update_scale (bool, optional): update scale estimate for weights
+            across iterations (default: True)
+        maxiter (int, optional): maximum number of iterations (default: 50)
+        tol (float, optional): convergence tolerance of estimate
+            (default: 1e-8)
+
+    Returns:
+        tuple (np.ndarray, np.ndarray, np.ndarray): Coefficients
+            (n_series x n_features), weights (n_series x n_obs), and scale
+            (n_series) of each robust fit
+
+    """
+    Y = numpy.atleast_2d(Y)
+    if has_numba and M is bisquare:
+        return _rlm_bisquare_rows(numpy.asarray(X, dtype=numpy.float64),
+                                  numpy.asarray(Y, dtype=numpy.float64),
+                                  tune, scale_constant, update_scale,
+                                  maxiter, tol)
+
+    weights = numpy.ones_like(Y, dtype=numpy.float64)
+    coef, resid = _weight_fit_batch(X, Y, weights)
+    scale = _mad_rows(resid, c=scale_constant)
+
+    active = scale >= EPS
+    iteration = 1
+    while active.any() and iteration < maxiter:
+        idx = numpy.flatnonzero(active)
+        _coef = coef[idx]
+        weights[idx] = M(resid[idx] / scale[idx, None], c=tune)
+        coef[idx], resid[idx] = _weight_fit_batch(X, Y[idx], weights[idx])
+        if update_scale:
+            scale[idx] = numpy.maximum(
+                EPS, _mad_rows(resid[idx], c=scale_constant))
+        iteration += 1
+        active[idx] = numpy.any(numpy.fabs(coef[idx] - _coef > tol), axis=1)
+
+    return coef, weights, scale
+
+
+@try_jit(nopython=True)
+def _rlm_bisquare_stack(X, Y, n, tune, scale_constant, update_scale,
+                        maxiter, tol):
+    """ :func:`rlm_stack` with bisquare weights, fitting one set at a time
+    """
+    n_set, n_series, n_obs = Y.shape
+    coef = numpy.zeros((n_set, n_series, X.shape[2]))
+    weights = numpy.zeros((n_set, n_series, n_obs))
+    scale = numpy.zeros((n_set, n_series))
+
+    for i in range(n_set):
+        _coef, _weights, _scale = _rlm_bisquare_rows(
+            numpy.ascontiguousarray(X[i, :n[i], :]),
+            numpy.ascontiguousarray(Y[i, :, :n[i]]),
+            tune, scale_constant, update_scale, maxiter, tol)
+        coef[i, :, :] = _coef
+        weights[i, :, :n[i]] = _weights
+        scale[i, :] = _scale
+
+    return coef, weights, scale
+
+
+def _weight_fit_stack(X, Y, W):
+    """
+    Apply a weighted OLS fit to many series, each with its own design matrix
+
+    Each series is solved from its weighted normal equations. If any system
+    is singular, all series are solved with :func:`_weight_fit` instead.
+
+    Args:
+        X (ndarray): 3D (n_series x n_obs x n_features) independent variables
+        Y (ndarray): 2D (n_series x n_obs) dependent variables
+        W (ndarray): 2D (n_series x n_obs) observation weights
+
+    Returns:
+        tuple: coefficients (n_series x n_features) and residuals
+            (n_series x n_obs)
+
+    """
+    XW = X * W[:, :, None]
+    XTWX = numpy.einsum('snf,snk->sfk', XW, X)
+    XTWY = numpy.einsum('snf,sn->sf', XW, Y)
+    try:
+        beta = numpy.linalg.solve(XTWX, XTWY[:, :, None])[:, :, 0]
+    except numpy.linalg.LinAlgError:
+        beta = numpy.array([_weight_fit(x, y, w)[0]
+                            for x, y, w in zip(X, Y, W)])
+
+    resid = Y - numpy.einsum('snf,sf->sn', X, beta)
+
+    return beta, resid
+
+
+def _mad_stack(x, n, c=0.6745):
+    """
+    Returns Median-Absolute-Deviation (MAD) of the first ``n`` observations
+    of each row of some data
+
+    Args:
+        x (np.ndarray): 2D array of observations (e.g., residuals)
+        n (np.ndarray): 1D number of observations of each row
+        c (float): scale factor to get to ~standard normal (default: 0.6745)
+
+    Returns:
+        np.ndarray: MAD 'robust' standard deviation estimate of each row
+
+    """
+    valid = numpy.arange(x.shape[1]) < n[:, None]
+    a = numpy.sort(numpy.where(valid, numpy.fabs(x), numpy.inf), axis=1)
+    rows = numpy.arange(x.shape[0])
+    return (a[rows, (n - 1) // 2] + a[rows, n // 2]) / 2.0 / c
+
+
+def rlm_stack(X, Y, n=None, M=bisquare, tune=4.685, scale_constant=0.6745,
+              update_scale=True, maxiter=50, tol=1e-8):
+    """ Robust Linear Models of many sets of series, each set sharing a
+    design matrix
+
+    Fits the same models as :func:`rlm_batch` for each set of series (e.g.,
+    bands of pixels observed on different dates) at once. Sets may have
+    different numbers of observations, ``n``. Observations of a set beyond
+    its ``n`` are padding, and are ignored.
+
+    Args:
+        X (np.ndarray): 3D (n_set x n_obs x n_features) design matrix of each
+            set
+        Y (np.ndarray): 3D (n_set x n_series x n_obs) independent variables
+        n (np.ndarray): 1D (n_set) number of observations of each set
+            (default: all ``n_obs``)
+        M (callable): function for scaling residuals
+        tune (float): tuning constant for scale estimate
+        scale_constant (float): normalization constant (default: 0.6745)
+        update_scale (bool, optional): update scale estimate for weights
+            across iterations (default: True)
+        maxiter (int, optional): maximum number of iterations (default: 50)
+        tol (float, optional): convergence tolerance of estimate
+            (default: 1e-8)
+
+    Returns:
+        tuple (np.ndarray, np.ndarray, np.ndarray): Coefficients
+            (n_set x n_series x n_features), weights (n_set x n_series x
+            n_obs), and scale (n_set x n_series) of each robust fit
+
+    """
+    n_set, n_series, n_obs = Y.shape
+    n = (numpy.full(n_set, n_obs, dtype=numpy.intp) if n is None else
+         numpy.asarray(n, dtype=numpy.intp))
+    if has_numba and M is bisquare:
+        return _rlm_bisquare_stack(numpy.asarray(X, dtype=numpy.float64),
+                                   numpy.asarray(Y, dtype=numpy.float64),
+                                   n, tune, scale_constant, update_scale,
+                                   maxiter, tol)
+
+    # Solve each series of each set as a system with its own design matrix
+    valid = numpy.arange(n_obs) < n[:, None]
+    X = numpy.repeat(numpy.where(valid[:, :, None], X, 0), n_series, axis=0)
+    n = numpy.repeat(n, n_series)
+    valid = numpy.repeat(valid, n_series, axis=0)
+    Y = numpy.where(valid, Y.reshape(n_set * n_series, n_obs), 0)
+
+    weights = valid.astype(numpy.float64)
+    coef, resid = _weight_fit_stack(X, Y, weights)
+    scale = _mad_stack(resid, n, c=scale_constant)
+
+    active = scale >= EPS
+    iteration = 1
+    while active.any() and iteration < maxiter:
+        idx = numpy.flatnonzero(active)
+        _coef = coef[idx]
+        weights[idx] = numpy.where(
+            valid[idx], M(resid[idx] / scale[idx, None], c=tune), 0)
+        coef[idx], resid[idx] = _weight_fit_stack(X[idx], Y[idx],
+                                                  weights[idx])
+        if update_scale:
+            scale[idx] = numpy.maximum(
+                EPS, _mad_stack(resid[idx], n[idx], c=scale_constant))
+        iteration += 1
+        active[idx] = numpy.any(numpy.fabs(coef[idx] - _coef > tol), axis=1)
+
+    return (coef.reshape(n_set, n_series, -1),
+            weights.reshape(n_set, n_series, n_obs),
+            scale.reshape(n_set, n_series))
+
+
 # Robust regression
 class RLM(sklearn.base.BaseEstimator):
     """ Robust Linear Model using Iterative Reweighted Least Squares (RIRLS)
@@ -154,7 +615,11 @@ class RLM(sklearn.base.BaseEstimator):
                 chaining
 
         """
-        self.coef_, resid = _weight_fit(X, y, numpy.ones_like(y))
+        # Reuse the same workspace for each weighted fit
+        n, p = X.shape
+        XTWX, self.coef_, resid = (numpy.empty((p, p)), numpy.empty(p),
+                                   numpy.empty(n))
+        _weight_fit_inplace(X, y, numpy.ones(n), XTWX, self.coef_, resid)
         self.scale = self.scale_est(resid, c=self.scale_constant)
 
         if self.scale < EPS:
@@ -165,7 +630,7 @@ class RLM(sklearn.base.BaseEstimator):
         while not converged and iteration < self.maxiter:
             _coef = self.coef_.copy()
             self.weights = self.M(resid / self.scale, c=self.tune)
-            self.coef_, resid = _weight_fit(X, y, self.weights)
+            _weight_fit_inplace(X, y, self.weights, XTWX, self.coef_, resid)
             if self.update_scale:
                 self.scale = max(EPS,
                                  self.scale_est(resid, c=self.scale_constant))
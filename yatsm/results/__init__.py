@@ -1,12 +1,14 @@
 """ Module for handling result file storage
 """
-from yatsm.results._pytables import HDF5ResultsStore, dtype_to_table
+from yatsm.results._pytables import (HDF5ResultsStore, add_columns,
+                                     dtype_to_table)
 from yatsm.results.utils import result_filename
 
 
 __all__ = [
     'HDF5ResultsStore',
     'GEO_TAGS',
+    'add_columns',
     'dtype_to_table',
     'result_filename',
 ]
@@ -133,6 +133,48 @@ def create_table(h5file, where, name, result, attrs=None, georef=None,
     return table
 
 
+def add_columns(h5file, table, dtype, chunksize=10000):
+    """ Add zero filled columns to a table, replacing the table
+
+    PyTables cannot add columns to an existing table, so rows are copied in
+    chunks to a new table with the additional columns, which then replaces
+    ``table`` (including its attributes and indexes).
+
+    Args:
+        h5file (tables.file.File): PyTables HDF5 file
+        table (tables.table.Table): Table to add columns to
+        dtype (np.dtype): NumPy structured data type of new columns
+        chunksize (int): Number of rows to copy at once
+
+    Returns:
+        table.table.Table: HDF5 table with the additional columns
+    """
+    desc = dict(table.description._v_colobjects)
+    for name, col in dtype_to_table(dtype).items():
+        col._v_pos += len(table.colnames)
+        desc[name] = col
+
+    where, name = table._v_parent, table.name
+    new = h5file.create_table(where, name + '_tmp', description=desc,
+                              filters=table.filters,
+                              expectedrows=max(table.nrows, 1))
+    for start in range(0, table.nrows, chunksize):
+        rows = table.read(start, start + chunksize)
+        out = np.zeros(rows.size, dtype=new.dtype)
+        for col in rows.dtype.names:
+            out[col] = rows[col]
+        new.append(out)
+    new.flush()
+
+    table.attrs._f_copy(new)
+    for col in table.colindexes:
+        new.colinstances[col].create_index()
+    table.remove()
+    new.move(where, name)
+
+    return new
+
+
 def georeference(node, georef):
     """ Georeference a :class:`tables.File`
 
@@ -1,13 +1,19 @@
 """ Tests for structural breaks
 """
+from ._breakpoints import breakpoints
 from ._core import StructuralBreakResult
 from ._cusum import cusum_OLS, cusum_recursive
 from ._ewma import ewma
+from ._stack import cusum_OLS_stack, cusum_recursive_stack, ewma_stack
 
 
 __all__ = [
     'StructuralBreakResult',
+    'breakpoints',
     'cusum_OLS',
     'cusum_recursive',
-    'ewma'
+    'ewma',
+    'cusum_OLS_stack',
+    'cusum_recursive_stack',
+    'ewma_stack'
 ]
@@ -0,0 +1,192 @@
+""" Multiple structural breaks estimated by dynamic programming
+
+An equivalent of ``strucchange::breakpoints`` in R, following:
+
+    Bai, J, and P Perron. 2003. Computation and Analysis of Multiple
+        Structural Change Models. Journal of Applied Econometrics 18 (1):
+        1-22.
+
+The residual sum of squares (RSS) of every admissible segment is computed
+from recursive residuals, and the segmentation minimizing the total RSS
+is found for each number of breaks by dynamic programming. The number of
+breaks is selected using the BIC or the criterion of Liu, Wu, and Zidek
+(LWZ).
+"""
+from __future__ import division
+
+import numpy as np
+import pandas as pd
+import xarray as xr
+
+from ._core import StructuralBreakResult, pandas_like
+from ..accel import try_jit
+from ..regression._recresid import _recresid
+
+
+@try_jit(nopython=True, nogil=True)
+def _rss_triangle(X, y, h):
+    """ RSS of regressions of all segments at least ``h`` observations long
+
+    The RSS of a segment starting at observation ``i`` and ending at ``j``
+    is the cumulative sum of squared recursive residuals of the series
+    starting at ``i``.
+
+    Args:
+        X (np.ndarray): 2D (n_obs x n_features) design matrix
+        y (np.ndarray): 1D (n_obs) independent variable
+        h (int): Minimum segment size
+
+    Returns:
+        np.ndarray: 2D (n_obs x n_obs) RSS of segments from row to column
+            index, inclusive. Segments shorter than ``h`` are ``inf``
+    """
+    n, k = X.shape
+    rss = np.full((n, n), np.inf)
+
+    for i in range(n - h + 1):
+        w = _recresid(X[i:], y[i:], k)
+        ssr = 0.0
+        for j in range(i + k, n):
+            ssr += w[j - i] ** 2
+            if j - i + 1 >= h:
+                rss[i, j] = ssr
+
+    return rss
+
+
+@try_jit(nopython=True, nogil=True)
+def _breakpoints_dp(rss, h, breaks):
+    """ Optimal segmentations for up to ``breaks`` breaks
+
+    Args:
+        rss (np.ndarray): RSS of segments (see :func:`_rss_triangle`)
+        h (int): Minimum segment size
+        breaks (int): Maximum number of breaks
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): The minimum RSS of observations
+            ``0`` to ``j`` split by ``m`` breaks, and the last observation
+            before the final break of this segmentation, indexed as
+            ``[m, j]``
+    """
+    n = rss.shape[0]
+    opt = np.full((breaks + 1, n), np.inf)
+    pos = np.zeros((breaks + 1, n), dtype=np.int64)
+    opt[0, :] = rss[0, :]
+
+    for m in range(1, breaks + 1):
+        for j in range((m + 1) * h - 1, n):
+            for i in range(m * h - 1, j - h + 1):
+                ssr = opt[m - 1, i] + rss[i + 1, j]
+                if ssr < opt[m, j]:
+                    opt[m, j] = ssr
+                    pos[m, j] = i
+
+    return opt, pos
+
+
+def _backtrack(pos, m):
+    """ Return the ``m`` breakpoints of the optimal segmentation
+    """
+    idx = np.zeros(m, dtype=np.int64)
+    j = pos.shape[1] - 1
+    for _m in range(m, 0, -1):
+        j = pos[_m, j]
+        idx[_m - 1] = j
+    return idx
+
+
+def _bic(rss, n, k):
+    """ Bayesian Information Criterion of segmentations by number of breaks
+    """
+    m = np.arange(rss.size)
+    df = (k + 1) * (m + 1)
+    loglik = -0.5 * n * (np.log(rss) + 1 - np.log(n) + np.log(2 * np.pi))
+    return -2 * loglik + np.log(n) * df
+
+
+def _lwz(rss, n, k):
+    """ Criterion of Liu, Wu, and Zidek (1997) by number of breaks
+    """
+    m = np.arange(rss.size)
+    q = (m + 1) * k + m
+    return np.log(rss / (n - q)) + q / n * 0.299 * np.log(n) ** 2.1
+
+
+#: dict: Model selection criteria for the number of breaks
+BREAKPOINTS_CRITERIA = {
+    'BIC': _bic,
+    'LWZ': _lwz
+}
+
+
+def breakpoints(X, y, h=0.15, breaks=None, criterion='BIC'):
+    """ Estimate multiple structural breaks (Bai and Perron, 2003)
+
+    The RSS of all segments is calculated once from recursive residuals,
+    and the optimal segmentation for each number of breaks is found by
+    dynamic programming. Both steps are compiled by Numba when available.
+
+    Args:
+        X (array like): 2D (n_obs x n_features) design matrix
+        y (array like): 1D (n_obs) indepdent variable
+        h (int or float): Minimum segment size, given as a number of
+            observations or as a fraction of ``n_obs`` if less than 1. Must
+            be greater than ``n_features``
+        breaks (int): Maximum number of breaks. Defaults to as many as ``h``
+            allows
+        criterion (str): Criterion used to select the number of breaks
+            (``BIC`` or ``LWZ``)
+
+    Returns:
+        StructuralBreakResult: A named tuple include the the test name, the
+        breakpoints (indexes of ``y`` that are the last observation before
+        each break), the criterion ``score`` of the selected number of
+        breaks, the criterion for each number of breaks from zero to
+        ``breaks`` as the ``process``, and a boolean testing if any breaks
+        were selected
+
+    Raises:
+        ValueError: if ``h`` is too small or ``criterion`` is unknown
+
+    """
+    if criterion not in BREAKPOINTS_CRITERIA:
+        raise ValueError('Unknown criterion "{0}". Must be one of: {1}'
+                         .format(criterion, sorted(BREAKPOINTS_CRITERIA)))
+
+    _X = X.values if isinstance(X, pandas_like) else np.asarray(X)
+    _y = y.values.ravel() if isinstance(y, pandas_like) else y.ravel()
+    _X = np.ascontiguousarray(_X, dtype=np.float64)
+    _y = np.ascontiguousarray(_y, dtype=np.float64)
+    n, k = _X.shape
+
+    if h < 1:
+        h = int(np.floor(n * h))
+    h = int(h)
+    if h <= k:
+        raise ValueError('Minimum segment size ({0}) must be greater than '
+                         'the number of regressors ({1})'.format(h, k))
+
+    max_breaks = n // h - 1
+    breaks = max_breaks if breaks is None else min(int(breaks), max_breaks)
+
+    rss = _rss_triangle(_X, _y, h)
+    opt, pos = _breakpoints_dp(rss, h, max(breaks, 0))
+
+    score = BREAKPOINTS_CRITERIA[criterion](opt[:, -1], n, k)
+    m = int(np.argmin(score))
+    idx = _backtrack(pos, m)
+
+    if isinstance(y, pandas_like):
+        if isinstance(y, (pd.Series, pd.DataFrame)):
+            idx = y.index[idx]
+        elif isinstance(y, xr.DataArray):
+            idx = y.to_series().index[idx]
+
+    return StructuralBreakResult(method='Bai-Perron',
+                                 index=idx,
+                                 score=score[m],
+                                 process=score,
+                                 boundary=None,
+                                 pvalue=np.nan,
+                                 signif=m > 0)
@@ -9,7 +9,6 @@ import logging
 
 import numpy as np
 import pandas as pd
-from scipy.optimize import brentq
 from scipy import stats
 from scipy.stats import norm
 import xarray as xr
@@ -20,7 +19,51 @@ from ..regression._recresid import _recresid
 
 logger = logging.getLogger(__name__)
 
-pnorm = norm.cdf
+#: float: Spacing of test statistics in tables of p-values
+_TABLE_STEP = 0.0005
+#: float: Largest test statistic in tables of p-values. P-values of larger
+#         statistics are calculated from their distribution
+_TABLE_MAX = 6.0
+
+
+def _tabulate(sf, start):
+    """ Return a grid of test statistics and the log of their p-values
+
+    Args:
+        sf (callable): Vectorized survival function of the test statistic
+        start (float): Smallest test statistic in the table
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): Test statistics and log of p-values
+    """
+    grid = np.arange(start, _TABLE_MAX + _TABLE_STEP / 2, _TABLE_STEP)
+    return grid, np.log(sf(grid))
+
+
+def _lookup_pvalue(x, grid, log_pvalue, sf):
+    """ Interpolate p-values of test statistics ``x`` from a table
+
+    P-values are interpolated on a log scale to retain their precision as
+    they approach zero. Test statistics beyond the table are calculated
+    using ``sf``.
+
+    Args:
+        x (float or np.ndarray): Test statistic(s)
+        grid (np.ndarray): Test statistics in the table
+        log_pvalue (np.ndarray): Log of p-values of ``grid``
+        sf (callable): Vectorized survival function of the test statistic
+
+    Returns:
+        np.ndarray: P-values of ``x``
+    """
+    x = np.asarray(x, dtype=np.float64)
+    p = np.exp(np.interp(x, grid, log_pvalue))
+    tail = x > grid[-1]
+    if tail.any():
+        p = np.atleast_1d(p)
+        p[np.atleast_1d(tail)] = sf(x[tail])
+        p = p.reshape(x.shape)
+    return p
 
 
 # OLS-CUSUM
@@ -32,6 +75,30 @@ CUSUM_OLS_CRIT = {
 }
 
 
+def _kstwobign_sf_tail(x):
+    """ Asymptotic p-value of large Kolmogorov test statistics
+    """
+    return 2 * np.exp(-2 * x ** 2)
+
+
+_KSTWOBIGN_GRID, _KSTWOBIGN_LOG_PVALUE = _tabulate(stats.kstwobign.sf, 0.0)
+
+
+def _kstwobign_sf(x):
+    """ Return p-values of the limiting Kolmogorov distribution
+
+    Equivalent to ``scipy.stats.kstwobign.sf``, interpolated from a table.
+
+    Args:
+        x (float or np.ndarray): Test statistic(s)
+
+    Returns:
+        float or np.ndarray: P-values of ``x``
+    """
+    return _lookup_pvalue(x, _KSTWOBIGN_GRID, _KSTWOBIGN_LOG_PVALUE,
+                          _kstwobign_sf_tail)[()]
+
+
 @try_jit(nopython=True, nogil=True)
 def _cusum(resid, ddof):
     n = resid.size
@@ -99,7 +166,7 @@ def cusum_OLS(X, y, alpha=0.05):
 
     # crit = stats.kstwobign.isf(alpha)  ~70usec
     crit = CUSUM_OLS_CRIT[alpha]
-    pval = stats.kstwobign.sf(score)
+    pval = _kstwobign_sf(score)
 
     return StructuralBreakResult(method='OLS-CUSUM',
                                  index=idx,
@@ -111,25 +178,38 @@ def cusum_OLS(X, y, alpha=0.05):
 
 
 # REC-CUSUM
+def _brownian_motion_sf(x):
+    """ P-value of test statistics ``x`` of at least 0.3 (for ``k=1``)
+    """
+    return 2 * (norm.sf(3 * x) +
+                np.exp(-4 * x ** 2) * (1 - norm.sf(x) - norm.sf(5 * x)) -
+                np.exp(-16 * x ** 2) * norm.sf(x))
+
+
+_BM_GRID, _BM_LOG_PVALUE = _tabulate(_brownian_motion_sf, 0.3)
+
+
 def _brownian_motion_pvalue(x, k):
-    """ Return pvalue for some given test statistic """
+    """ Return pvalue for some given test statistic(s), interpolated from a
+    table
+    """
     # TODO: Make generic, add "type='Brownian Motion'"?
-    if x < 0.3:
-        p = 1 - 0.1464 * x
-    else:
-        p = 2 * (1 -
-                 pnorm(3 * x) +
-                 np.exp(-4 * x ** 2) * (pnorm(x) + pnorm(5 * x) - 1) -
-                 np.exp(-16 * x ** 2) * (1 - pnorm(x)))
-    return 1 - (1 - p) ** k
+    x = np.asarray(x, dtype=np.float64)
+    p = np.where(x < 0.3,
+                 1 - 0.1464 * x,
+                 _lookup_pvalue(x, _BM_GRID, _BM_LOG_PVALUE,
+                                _brownian_motion_sf))
+    return (1 - (1 - p) ** k)[()]
 
 
 def _cusum_rec_test_crit(alpha):
     """ Return critical test statistic value for some alpha """
-    return brentq(lambda _x: _brownian_motion_pvalue(_x, 1) - alpha, 0, 20)
+    log_alpha = np.log(alpha)
+    if log_alpha > _BM_LOG_PVALUE[0]:
+        return (1 - alpha) / 0.1464
+    return np.interp(log_alpha, _BM_LOG_PVALUE[::-1], _BM_GRID[::-1])
 
 
-@try_jit(nopython=True, nogil=True)
 def _cusum_rec_boundary(x, alpha=0.05):
     """ Equivalent to ``strucchange::boundary.efp``` for Rec-CUSUM """
     n = x.ravel().size
@@ -189,22 +269,29 @@ def cusum_recursive(X, y, alpha=0.05):
         StructuralBreakResult: A named tuple include the the test name,
         change point (index of ``y``), the test ``score`` and ``pvalue``,
         and a boolean testing if the CUSUM score is
-        significant at the given ``alpha``
+        significant at the given ``alpha`` (i.e., if ``pvalue < alpha``).
+        The change point is the first observation where the ``process``
+        crosses its ``boundary`` if significant, or otherwise where the
+        magnitude of the ``process`` is largest. The ``process`` and
+        ``boundary`` start at the last observation of the initial
+        regression
 
     """
     _X = X.values if isinstance(X, pandas_like) else X
     _y = y.values.ravel() if isinstance(y, pandas_like) else y.ravel()
+    k = _X.shape[1]
 
     process = _cusum_rec_efp(_X, _y)
     stat = _cusum_rec_sctest(process)
     stat_pvalue = _brownian_motion_pvalue(stat, 1)
+    signif = stat_pvalue < alpha
 
-    pvalue_crit = _cusum_rec_test_crit(alpha)
-    if stat_pvalue < alpha:
-        boundary = _cusum_rec_boundary(process, alpha)
-        idx = np.where(np.abs(process) > boundary)[0].min()
+    boundary = _cusum_rec_boundary(process, alpha)
+    violation = np.abs(process) > boundary
+    if signif and violation.any():
+        idx = violation.argmax() + k - 1
     else:
-        idx = np.abs(process).max()
+        idx = np.abs(process).argmax() + k - 1
 
     if isinstance(y, pandas_like):
         if isinstance(y, (pd.Series, pd.DataFrame)):
@@ -213,8 +300,10 @@ def cusum_recursive(X, y, alpha=0.05):
         elif isinstance(y, xr.DataArray):
             index = y.to_series().index
             idx = index[idx]
-        process = pd.Series(data=process, index=index, name='REC-CUSUM')
-        boundary = pd.Series(data=boundary, index=index, name='Boundary')
+        process = pd.Series(data=process, index=index[k - 1:],
+                            name='REC-CUSUM')
+        boundary = pd.Series(data=boundary, index=index[k - 1:],
+                             name='Boundary')
 
     return StructuralBreakResult(method='REC-CUSUM',
                                  process=process,
@@ -222,4 +311,4 @@ def cusum_recursive(X, y, alpha=0.05):
                                  index=idx,
                                  pvalue=stat_pvalue,
                                  score=stat,
-                                 signif=stat_pvalue < pvalue_crit)
+                                 signif=signif)
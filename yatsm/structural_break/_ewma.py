@@ -96,18 +96,47 @@ def _ewma_boundary(x, stddev, crit=3.0, lambda_=0.2):
 
 @try_jit(nopython=True, nogil=True)
 def _ewma_smooth(y, start, lambda_=0.2):
+    """ Exponentially weighted moving average of ``y`` starting at ``start``
+
+    Calculated recursively as
+    :math:`z_t = \\lambda y_t + (1 - \\lambda) z_{t - 1}`, with
+    :math:`z_{-1}` = ``start``, in linear time and memory
+    """
     n = y.shape[0]
+    z = np.empty(n)
 
-    S1 = np.eye(n)
-    for i in range(n - 1):
-        for j in range(i, n):
-            S1[j, i] = (1 - lambda_) ** (j - i)
-    S2 = (1 - lambda_) ** np.arange(1, n + 1)
-    z = lambda_ * np.dot(S1, y) + S2 * start
+    z_t = start
+    for t in range(n):
+        z_t = lambda_ * y[t] + (1 - lambda_) * z_t
+        z[t] = z_t
 
     return z
 
 
+@try_jit(nopython=True, nogil=True)
+def _ewma_smooth_batch(Y, start, lambda_=0.2):
+    """ Exponentially weighted moving average of each series in ``Y``
+
+    Args:
+        Y (np.ndarray): 2D (n_series x n_obs) observations
+        start (np.ndarray): 1D (n_series) starting value of each average
+        lambda_ (float): "Memory" parameter, bound [0, 1]
+
+    Returns:
+        np.ndarray: 2D (n_series x n_obs) moving average of each series
+    """
+    n_series, n = Y.shape
+    Z = np.empty((n_series, n))
+
+    for s in range(n_series):
+        z_t = start[s]
+        for t in range(n):
+            z_t = lambda_ * Y[s, t] + (1 - lambda_) * z_t
+            Z[s, t] = z_t
+
+    return Z
+
+
 @try_jit
 def _ewma(y, lambda_=0.2, crit=3.0, center=True, std_type='SD'):
     if center:
@@ -0,0 +1,221 @@
+""" Structural break tests of many series at once
+
+Each test accepts a 2D (n_series x n_obs) NumPy array, or an
+``xarray.DataArray`` with a ``time`` dimension (e.g., ``(time, y, x)``),
+and returns a :class:`StructuralBreakResult` whose fields are arrays with one
+value per series. Series share the same dates (and design matrix, for the
+CUSUM tests) so that each test is computed with array operations instead of
+a Python call per series. Series must not contain NaN.
+"""
+from __future__ import division
+
+import numpy as np
+import xarray as xr
+
+from ._core import StructuralBreakResult, pandas_like
+from ._cusum import (CUSUM_OLS_CRIT, _brownian_motion_pvalue,
+                     _cusum_rec_test_crit, _kstwobign_sf)
+from ._ewma import _c4, _d2_n, _ewma_smooth_batch, _rolling_window
+from ..regression._recresid import recresid_batch
+from ..regression.robust_fit import _mad_rows
+
+
+def _unstack(Y):
+    """ Return 2D (n_series x n_obs) data and a function to reshape results
+    """
+    if not isinstance(Y, xr.DataArray):
+        Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+        return Y, lambda result: result
+
+    dims = [d for d in Y.dims if d != 'time']
+    Y = Y.transpose(*(dims + ['time']))
+    coords = [Y[d] for d in dims]
+    shape = Y.shape[:-1]
+    time = Y['time']
+
+    def restack(result):
+        def _wrap(a, name):
+            if a.ndim == 2:
+                return xr.DataArray(a.reshape(shape + (time.size, )),
+                                    coords + [time], dims + ['time'],
+                                    name=name)
+            return xr.DataArray(a.reshape(shape), coords, dims, name=name)
+
+        return result._replace(
+            index=_wrap(time.values[result.index], 'index'),
+            score=_wrap(result.score, 'score'),
+            process=_wrap(result.process, 'process'),
+            boundary=_wrap(result.boundary, 'boundary'),
+            pvalue=_wrap(result.pvalue, 'pvalue'),
+            signif=_wrap(result.signif, 'signif'))
+
+    return Y.values.reshape(-1, time.size).astype(np.float64), restack
+
+
+def _first_or_argmax(violation, process):
+    """ Index of first violation of each row, or of the largest magnitude
+    """
+    return np.where(violation.any(axis=1), violation.argmax(axis=1),
+                    np.abs(process).argmax(axis=1))
+
+
+def cusum_OLS_stack(X, Y, alpha=0.05):
+    """ OLS-CUSUM test for structural breaks of many series
+
+    The same test as :func:`yatsm.structural_break.cusum_OLS`, fit for all
+    series with one least squares solve.
+
+    Args:
+        X (array like): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray or xarray.DataArray): 2D (n_series x n_obs) array, or
+            a ``DataArray`` with a ``time`` dimension
+        alpha (float): Test threshold (either 0.01, 0.05, or 0.10) from
+            Ploberger and Krämer (1992)
+
+    Returns:
+        StructuralBreakResult: A named tuple of the test name and, for each
+        series, the change point index, the test ``score`` and ``pvalue``,
+        and a boolean testing if the CUSUM score is significant at the
+        given ``alpha``. The ``process`` of each series is stacked along the
+        time dimension
+
+    """
+    _X = X.values if isinstance(X, pandas_like) else np.asarray(X)
+    _Y, restack = _unstack(Y)
+    n, p = _X.shape
+
+    beta = np.linalg.lstsq(_X, _Y.T, -1)[0]
+    resid = np.dot(beta.T, _X.T) - _Y
+
+    sigma = ((resid ** 2).sum(axis=1) / (n - p) * n) ** 0.5
+    process = resid.cumsum(axis=1) / sigma[:, None]
+    idx = np.abs(process).argmax(axis=1)
+    score = np.abs(process[np.arange(idx.size), idx])
+
+    crit = CUSUM_OLS_CRIT[alpha]
+    return restack(StructuralBreakResult(
+        method='OLS-CUSUM',
+        index=idx,
+        score=score,
+        process=process,
+        boundary=np.full(idx.size, crit),
+        pvalue=_kstwobign_sf(score),
+        signif=score > crit))
+
+
+def cusum_recursive_stack(X, Y, alpha=0.05):
+    """ Rec-CUSUM test for structural breaks of many series
+
+    The same test as :func:`yatsm.structural_break.cusum_recursive`, using
+    :func:`yatsm.regression.recresid_batch` to compute the recursive
+    residuals of all series at once. A series is significant if the
+    ``pvalue`` of its test statistic is less than ``alpha``.
+
+    Args:
+        X (array like): 2D (n_obs x n_features) design matrix
+        Y (np.ndarray or xarray.DataArray): 2D (n_series x n_obs) array, or
+            a ``DataArray`` with a ``time`` dimension
+        alpha (float): Test threshold
+
+    Returns:
+        StructuralBreakResult: A named tuple of the test name and, for each
+        series, the change point index (of the observation in ``Y``), the
+        test ``score`` and ``pvalue``, and a boolean testing if the CUSUM
+        score is significant at the given ``alpha``. The ``process`` and
+        ``boundary`` of each series, which start at the last observation of
+        the initial regression, are stacked along the time dimension and
+        padded with NaN
+
+    """
+    _X = X.values if isinstance(X, pandas_like) else np.asarray(X)
+    _Y, restack = _unstack(Y)
+    n, k = _X.shape
+
+    w = recresid_batch(_X, _Y, k)
+    sigma = w.std(axis=1, ddof=1)
+    _process = (np.concatenate((np.zeros((w.shape[0], 1)), w), axis=1)
+                .cumsum(axis=1) / (sigma[:, None] * (n - k) ** 0.5))
+
+    m = _process.shape[1] - 1
+    j = np.linspace(0, 1, m + 1)[1:]
+    score = np.abs(_process[:, 1:] / (1 + 2 * j)).max(axis=1)
+    pvalue = _brownian_motion_pvalue(score, 1)
+    signif = pvalue < alpha
+
+    bound = _cusum_rec_test_crit(alpha)
+    _boundary = bound + (2 * bound * np.arange(0, m + 1) / m)
+    violation = (np.abs(_process) > _boundary) & signif[:, None]
+    idx = _first_or_argmax(violation, _process) + k - 1
+
+    # Pad process and boundary to align with observations
+    process = np.full(_Y.shape, np.nan)
+    process[:, k - 1:] = _process
+    boundary = np.full(_Y.shape, np.nan)
+    boundary[:, k - 1:] = _boundary
+
+    return restack(StructuralBreakResult(
+        method='REC-CUSUM',
+        index=idx,
+        score=score,
+        process=process,
+        boundary=boundary,
+        pvalue=pvalue,
+        signif=signif))
+
+
+def ewma_stack(Y, lambda_=0.2, crit=3.0, center=True, std_type='SD'):
+    """ Exponentially Weighted Moving Average test of many series
+
+    The same test as :func:`yatsm.structural_break.ewma`, computing the
+    moving averages of all series at once.
+
+    Args:
+        Y (np.ndarray or xarray.DataArray): 2D (n_series x n_obs) array, or
+            a ``DataArray`` with a ``time`` dimension. Should be sorted
+            chronologically
+        lambda_ (float): "Memory" parameter, bound [0, 1]
+        crit (float): Critical threshold for boundary, given as a scalar
+            multiplier of the standard deviation
+        center (bool): Center time series before calculating EWMA
+        std_type (str): Method for calculating process standard deviation
+            (``MR``, ``SD``, or ``MAD``). See
+            :func:`yatsm.structural_break.ewma`
+
+    Returns:
+        StructuralBreakResult: A named tuple of the test name and, for each
+        series, the change point index, the test ``score``, and a boolean
+        testing if the EWMA score is significant at the given ``crit``. The
+        ``process`` and ``boundary`` of each series are stacked along the
+        time dimension. The ``pvalue`` is NaN
+
+    """
+    _Y, restack = _unstack(Y)
+    n_series, n = _Y.shape
+
+    _center = _Y.mean(axis=1) if center else np.zeros(n_series)
+    if std_type == 'SD':
+        sd = _Y.std(axis=1, ddof=1) / _c4(n)
+    elif std_type == 'MAD':
+        sd = _mad_rows(_Y)
+    elif isinstance(std_type, (int, float)):
+        sd = np.full(n_series, std_type, dtype=np.float64)
+    else:
+        sd = (np.ptp(_rolling_window(_Y, 2), axis=-1).sum(axis=1) /
+              (n - 1) / _d2_n[2])
+
+    process = _ewma_smooth_batch(_Y, _center, lambda_=lambda_)
+    t = np.arange(1, n + 1)
+    boundary = np.outer(crit * sd, np.sqrt(
+        (lambda_ / (2 - lambda_)) * (1 - (1 - lambda_) ** (2 * t))))
+
+    violation = np.abs(process - _center[:, None]) > boundary
+    idx = _first_or_argmax(violation, process)
+
+    return restack(StructuralBreakResult(
+        method='EWMA',
+        index=idx,
+        score=process[np.arange(n_series), idx],
+        process=process,
+        boundary=boundary,
+        pvalue=np.full(n_series, np.nan),
+        signif=violation.any(axis=1)))